@@ -0,0 +1,660 @@
+"""Performance benchmarks for the showcase database.
+
+Each benchmark builds a synthetic database (see insert_synthetic_data) and
+prints its measurements. Run e.g.:
+
+    python benchmark.py --persons 100000 --notes-per-person 10 rows
+"""
+import argparse
+import io
+import json
+import os
+import random
+import shutil
+from datetime import datetime, timedelta
+import sqlite3
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+from demo_db import (
+    VISIBLE_COLUMNS,
+    get_connection,
+    create_schema,
+    insert_synthetic_data,
+    execute_visible_query,
+    fetch_visible_persons_notes,
+    fetch_visible_persons_with_notes,
+    export_visible_data,
+    archive_notes,
+    reporting_snapshot,
+    create_person_search,
+    search_persons,
+    enable_content_compression,
+    fetch_note_contents,
+    ChangeFeed,
+    LatencyHistogram,
+    create_change_log,
+    enable_tenants,
+    get_users_with_access,
+    assign_person,
+    print_user_tables,
+    explain_visible_query,
+    fetch_activity_feed,
+    get_note,
+    offboard_user,
+    run_maintenance,
+    update_note_content,
+    VersionConflictError,
+    WriteQueue,
+    REPORT_MMAP_SIZE,
+)
+
+
+def build_database(path, persons, notes_per_person, users=100, **kwargs):
+    """Create a synthetic benchmark database at path and return a connection."""
+    if path != ':memory:' and os.path.exists(path):
+        os.remove(path)
+    conn = get_connection(path)
+    create_schema(conn)
+    start = time.perf_counter()
+    insert_synthetic_data(conn, users=users, persons=persons,
+                          notes_per_person=notes_per_person, **kwargs)
+    print(f"Built database: {persons} persons, {persons * notes_per_person} notes "
+          f"in {time.perf_counter() - start:.1f}s")
+    return conn
+
+
+def measure(label, func, *args, **kwargs):
+    """Run func, printing wall time and peak traced memory.
+    
+    Time and memory are measured in separate runs because tracemalloc slows
+    down allocation-heavy code considerably.
+    """
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    del result
+    tracemalloc.start()
+    result = func(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = len(result) if hasattr(result, '__len__') else 0
+    rate = count / elapsed if elapsed else 0
+    print(f"{label:<28} {elapsed * 1000:10.1f} ms  {peak / 2**20:9.1f} MiB peak"
+          f"  {rate:12,.0f} items/s")
+    return result
+
+
+def _fetch_as_dicts(conn, user_id):
+    """Previous row representation: sqlite3.Row converted to one dict per row."""
+    cursor = execute_visible_query(conn, user_id)
+    cursor.row_factory = sqlite3.Row
+    return [dict(zip(VISIBLE_COLUMNS, row)) for row in cursor.fetchall()]
+
+
+def bench_rows(args):
+    """Compare dict-per-row results against the compact VisibleRow type."""
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = build_database(os.path.join(tmp, 'bench.db'), args.persons,
+                              args.notes_per_person)
+        measure('dict per row', _fetch_as_dicts, conn, 1)
+        measure('VisibleRow', fetch_visible_persons_notes, conn, 1)
+        conn.close()
+
+
+def bench_nested(args):
+    """Compare the flat joined query with the person-grouped nested API."""
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = build_database(os.path.join(tmp, 'bench.db'), args.persons,
+                              args.notes_per_person, grants_per_user=2000)
+        for user_id in (1, 2):
+            measure(f'flat rows (user {user_id})', fetch_visible_persons_notes, conn, user_id)
+            measure(f'nested (user {user_id})', fetch_visible_persons_with_notes,
+                    conn, user_id)
+        conn.close()
+
+
+def bench_export(args):
+    """Measure streaming export throughput and file sizes for the admin user."""
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = build_database(os.path.join(tmp, 'bench.db'), args.persons,
+                              args.notes_per_person)
+        for name in ('export.jsonl', 'export.jsonl.gz', 'export.csv.gz'):
+            path = os.path.join(tmp, name)
+            result = export_visible_data(conn, [1], path)
+            print(f"{name:<28} {result['seconds'] * 1000:10.1f} ms"
+                  f"  {result['rows_per_sec']:12,.0f} rows/s"
+                  f"  {os.path.getsize(path) / 2**20:8.1f} MiB file")
+        # Memory is traced in a separate run; tracemalloc distorts the timing
+        tracemalloc.start()
+        export_visible_data(conn, [1], os.path.join(tmp, 'export.jsonl.gz'))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"peak traced memory during export: {peak / 2**20:.1f} MiB")
+        conn.close()
+
+
+def bench_archive(args):
+    """Measure "last 30 days" queries before and after archiving old notes."""
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = build_database(os.path.join(tmp, 'bench.db'), args.persons,
+                              args.notes_per_person)
+        newest = conn.execute('SELECT MAX(created_at) FROM note').fetchone()[0]
+        newest = datetime.strptime(newest, '%Y-%m-%d %H:%M:%S')
+        since = newest - timedelta(days=30)
+        for user_id in (1, 2):
+            measure(f'full table (user {user_id})', fetch_visible_persons_notes,
+                    conn, user_id, since=since)
+        start = time.perf_counter()
+        moved = archive_notes(conn, newest - timedelta(days=90),
+                              os.path.join(tmp, 'archive.db'), chunk_size=50000)
+        print(f"Archived {moved} notes in {time.perf_counter() - start:.1f}s")
+        for user_id in (1, 2):
+            measure(f'live partition (user {user_id})', fetch_visible_persons_notes,
+                    conn, user_id, since=since)
+        conn.close()
+
+
+def bench_snapshot(args):
+    """Compare the admin-wide report on live, read-only mmap and snapshot connections."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        build_database(path, args.persons, args.notes_per_person).close()
+        conn = get_connection(path)
+        measure('read-write connection', fetch_visible_persons_notes, conn, 1)
+        conn.close()
+        conn = get_connection(path, mode='immutable', mmap_size=REPORT_MMAP_SIZE)
+        measure('immutable + mmap', fetch_visible_persons_notes, conn, 1)
+        conn.close()
+        for in_memory in (False, True):
+            label = 'memory' if in_memory else 'file'
+            start = time.perf_counter()
+            with reporting_snapshot(path, in_memory=in_memory) as snapshot:
+                print(f"{'snapshot copy (' + label + ')':<28} "
+                      f"{(time.perf_counter() - start) * 1000:10.1f} ms")
+                measure(f'snapshot report ({label})', fetch_visible_persons_notes, snapshot, 1)
+
+
+def bench_search(args):
+    """Measure person search latency for an admin and a restricted user."""
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = build_database(os.path.join(tmp, 'bench.db'), args.persons,
+                              args.notes_per_person, grants_per_user=2000)
+        start = time.perf_counter()
+        create_person_search(conn)
+        print(f"Built search index in {time.perf_counter() - start:.1f}s")
+        for user_id in (1, 2):
+            for query in ('Na', 'vorname12', 'nachname99', 'person4242@', 'no such person'):
+                timings = []
+                for _ in range(20):
+                    start = time.perf_counter()
+                    result = search_persons(conn, user_id, query)
+                    timings.append(time.perf_counter() - start)
+                timings.sort()
+                print(f"user {user_id} {query!r:<18} {timings[len(timings) // 2] * 1000:8.2f} ms "
+                      f"median  {timings[-1] * 1000:8.2f} ms max  {len(result):3} hits")
+        conn.close()
+
+
+def bench_content(args):
+    """Compare list mode and compressed note contents on large notes."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        conn = build_database(path, args.persons, args.notes_per_person,
+                              content_size=args.content_size)
+        for compressed in (False, True):
+            if compressed:
+                start = time.perf_counter()
+                count = enable_content_compression(conn)
+                conn.execute('VACUUM')
+                print(f"Compressed {count} notes and vacuumed in "
+                      f"{time.perf_counter() - start:.1f}s")
+            label = 'compressed' if compressed else 'plain'
+            print(f"{label} database file: {os.path.getsize(path) / 2**20:.1f} MiB")
+            for user_id in (1, 2):
+                measure(f'{label} full rows (user {user_id})',
+                        fetch_visible_persons_notes, conn, user_id)
+                rows = measure(f'{label} list mode (user {user_id})',
+                               fetch_visible_persons_notes, conn, user_id, with_content=False)
+                page = [row.note_id for row in rows[:100] if row.note_id is not None]
+                measure(f'{label} 100 contents (user {user_id})', fetch_note_contents, conn, page)
+        conn.close()
+
+
+def _run_writers(threads, writes, write):
+    """Run write(note_id, content) writes/threads times per thread.
+    
+    Returns:
+        tuple: (successful writes/sec, number of failed writes)
+    """
+    per_thread = writes // threads
+    
+    errors = []
+    
+    def producer(seed):
+        rng = random.Random(seed)
+        for i in range(per_thread):
+            try:
+                write(rng.randint(1, 1000), f'Benchmark update {seed}-{i}')
+            except sqlite3.Error as e:
+                errors.append(e)
+    
+    workers = [threading.Thread(target=producer, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    seconds = time.perf_counter() - start
+    return (per_thread * threads - len(errors)) / seconds, len(errors)
+
+
+def bench_writes(args):
+    """Compare commit-per-write note updates with the group-commit WriteQueue."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        build_database(path, args.persons, args.notes_per_person).close()
+        for threads in args.threads:
+            local = threading.local()
+            connections = []
+            
+            def direct(note_id, content):
+                if not hasattr(local, 'conn'):
+                    local.conn = get_connection(path, check_same_thread=False)
+                    connections.append(local.conn)
+                try:
+                    update_note_content(local.conn, note_id, content)
+                    local.conn.commit()
+                except sqlite3.Error:
+                    local.conn.rollback()
+                    raise
+            
+            rate, errors = _run_writers(threads, args.writes, direct)
+            for conn in connections:
+                conn.close()
+            print(f"{threads:3} threads  commit per write  {rate:10,.0f} writes/s"
+                  f"  {errors:5} failed")
+            
+            with WriteQueue(path, max_delay=args.max_delay) as writes:
+                rate, errors = _run_writers(
+                    threads, args.writes,
+                    lambda note_id, content: writes.submit(
+                        update_note_content, note_id, content).result())
+            print(f"{threads:3} threads  group commit      {rate:10,.0f} writes/s"
+                  f"  {errors:5} failed  ({writes.requests / writes.batches:.1f} writes per commit)")
+
+
+CONTENTION_MODES = ('blind', 'compare-and-swap', 'locking')
+
+
+def _edit_counter(conn, note_id, mode):
+    """Increment the counter stored in a note; returns the number of conflicts hit."""
+    conflicts = 0
+    while True:
+        if mode == 'locking':
+            conn.execute('BEGIN IMMEDIATE')
+        note = get_note(conn, note_id)
+        content = str(int(note['content']) + 1)
+        if mode == 'blind':
+            # Baseline: an unconditional write of what was read, which loses
+            # concurrent increments (update_note_content always checks the
+            # version it read, so it cannot serve as the blind baseline)
+            conn.execute('UPDATE note SET content = ?, version = version + 1 WHERE id = ?',
+                         (content, note_id))
+            conn.commit()
+            return conflicts
+        try:
+            update_note_content(conn, note_id, content, expected_version=note['version'])
+        except VersionConflictError:
+            conn.rollback()
+            conflicts += 1
+            continue
+        conn.commit()
+        return conflicts
+
+
+def bench_contention(args):
+    """Compare blind, compare-and-swap and locking note edits on a few hot notes."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        build_database(path, args.persons, args.notes_per_person).close()
+        hot_notes = list(range(1, args.hot_notes + 1))
+        for editors in args.editors:
+            for mode in CONTENTION_MODES:
+                conn = get_connection(path)
+                conn.executemany("UPDATE note SET content = '0' WHERE id = ?",
+                                 [(note_id,) for note_id in hot_notes])
+                conn.commit()
+                stats = {'edits': 0, 'conflicts': 0, 'errors': 0}
+                lock = threading.Lock()
+                
+                def editor(seed):
+                    rng = random.Random(seed)
+                    editor_conn = get_connection(path)
+                    try:
+                        for _ in range(args.edits):
+                            try:
+                                conflicts = _edit_counter(editor_conn, rng.choice(hot_notes), mode)
+                            except (sqlite3.Error, VersionConflictError):
+                                editor_conn.rollback()
+                                with lock:
+                                    stats['errors'] += 1
+                                continue
+                            with lock:
+                                stats['edits'] += 1
+                                stats['conflicts'] += conflicts
+                    finally:
+                        editor_conn.close()
+                
+                workers = [threading.Thread(target=editor, args=(n,)) for n in range(editors)]
+                start = time.perf_counter()
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+                seconds = time.perf_counter() - start
+                counted = conn.execute(
+                    'SELECT SUM(CAST(content AS INTEGER)) FROM note WHERE id <= ?',
+                    (args.hot_notes,)
+                ).fetchone()[0]
+                conn.close()
+                attempts = stats['edits'] + stats['conflicts']
+                print(f"{editors:3} editors  {mode:<17} {stats['edits'] / seconds:8,.0f} edits/s"
+                      f"  {stats['conflicts'] / attempts if attempts else 0:6.1%} conflicts"
+                      f"  {stats['edits'] - counted:6} lost  {stats['errors']:5} errors")
+
+
+def bench_offboard(args):
+    """Measure concurrent write latency while a heavy user is offboarded."""
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, 'template.db')
+        build_database(template, args.persons, args.notes_per_person, users=args.users).close()
+        settings = (('unchunked', 10 ** 9, None, 0.0),
+                    ('chunked', 1000, args.lock_budget, 0.005))
+        for label, chunk_size, lock_budget, pause in settings:
+            path = os.path.join(tmp, 'bench.db')
+            shutil.copyfile(template, path)
+            latency = LatencyHistogram()
+            done = threading.Event()
+            
+            def writer():
+                # Edits notes of user 3 (synthetic notes are owned round-robin)
+                conn = get_connection(path)
+                note_ids = [row[0] for row in conn.execute(
+                    'SELECT id FROM note WHERE created_by = 3 LIMIT 1000')]
+                rng = random.Random(0)
+                while not done.is_set():
+                    with latency.time():
+                        update_note_content(conn, rng.choice(note_ids), f'Edit {rng.random()}')
+                        conn.commit()
+                    time.sleep(0.001)
+                conn.close()
+            
+            thread = threading.Thread(target=writer)
+            thread.start()
+            time.sleep(0.2)
+            conn = get_connection(path)
+            result = offboard_user(conn, 2, 1, chunk_size=chunk_size,
+                                   lock_budget=lock_budget, pause=pause)
+            conn.close()
+            done.set()
+            thread.join()
+            summary = latency.summary()
+            print(f"{label:<16} {result['notes']:8} notes  {result['chunks']:5} chunks"
+                  f"  {result['seconds']:6.2f}s  longest lock {result['max_lock_seconds'] * 1000:8.1f} ms"
+                  f"  writer p99 {summary['p99_ms']:8.1f} ms  max {summary['max_ms']:8.1f} ms")
+
+
+def _add_hot_persons(conn, count, notes_per_person):
+    """Add persons with many notes each (the skew seen in real deployments)."""
+    first = conn.execute('SELECT MAX(id) FROM person').fetchone()[0] + 1
+    next_note = conn.execute('SELECT MAX(id) FROM note').fetchone()[0] + 1
+    users = conn.execute('SELECT COUNT(*) FROM user').fetchone()[0]
+    for person_id in range(first, first + count):
+        conn.execute('INSERT INTO person (id, vorname, nachname, email, created_by) '
+                     "VALUES (?, 'Hot', 'Person', 'hot@example.com', 2)", (person_id,))
+        conn.executemany(
+            'INSERT INTO note (id, content, created_by, person_id) VALUES (?, ?, ?, ?)',
+            [(next_note + i, f'Hot note {i}', i % users + 1, person_id)
+             for i in range(notes_per_person)]
+        )
+        next_note += notes_per_person
+    conn.commit()
+
+
+def bench_maintenance(args):
+    """Measure visibility query plans and latency before and after maintenance."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        conn = build_database(path, args.persons, args.notes_per_person)
+        _add_hot_persons(conn, args.hot_persons, args.hot_notes)
+        # Deleting the oldest fifth of the notes leaves whole pages free
+        conn.execute('DELETE FROM note WHERE id <= ?', (args.persons * args.notes_per_person // 5,))
+        conn.commit()
+        conn.close()
+        for label in ('before', 'after'):
+            conn = get_connection(path)
+            if label == 'after':
+                result = run_maintenance(conn)
+                print(f"maintenance: analyzed={result['analyzed']} freed "
+                      f"{result['freed_pages']} pages in {result['seconds']:.2f}s")
+            print(f"{label}: {os.path.getsize(path) / 2**20:.1f} MiB file, "
+                  f"{conn.execute('PRAGMA freelist_count').fetchone()[0]} free pages")
+            for user_id in (1, 2):
+                for line in explain_visible_query(conn, user_id):
+                    print(f"    {line}")
+                fetch_visible_persons_notes(conn, user_id)  # Warm the page cache
+                measure(f'{label} (user {user_id})', fetch_visible_persons_notes, conn, user_id)
+            conn.close()
+
+
+def bench_feed(args):
+    """Compare the activity feed with sorting the full visibility result."""
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = build_database(os.path.join(tmp, 'bench.db'), args.persons,
+                              args.notes_per_person, grants_per_user=2000)
+        
+        def newest_from_full_result(user_id):
+            rows = [row for row in fetch_visible_persons_notes(conn, user_id)
+                    if row.note_id is not None]
+            rows.sort(key=lambda row: (row.created_at, row.note_id), reverse=True)
+            return rows[:args.page_size]
+        
+        def nth_page(user_id, pages):
+            before = None
+            for _ in range(pages):
+                rows, before = fetch_activity_feed(conn, user_id, args.page_size, before)
+            return rows
+        
+        for user_id in (1, 2):
+            measure(f'full result sorted (user {user_id})', newest_from_full_result, user_id)
+            measure(f'feed page 1 (user {user_id})', nth_page, user_id, 1)
+            measure(f'feed pages 1-10 (user {user_id})', nth_page, user_id, 10)
+        conn.close()
+
+
+def bench_changes(args):
+    """Measure change log write overhead and push latency against polling cost."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        conn = build_database(path, args.persons, args.notes_per_person,
+                              grants_per_user=2000)
+        note_ids = [row[0] for row in conn.execute(
+            'SELECT note_id FROM note_assignment WHERE user_id = 2 LIMIT 200')]
+        
+        def write_all(label):
+            start = time.perf_counter()
+            for i, note_id in enumerate(note_ids):
+                update_note_content(conn, note_id, f'{label} {i}')
+                conn.commit()
+            return (time.perf_counter() - start) / len(note_ids)
+        
+        print(f"note update without change log {write_all('plain') * 1000:8.3f} ms")
+        create_change_log(conn)
+        conn.commit()
+        print(f"note update with change log    {write_all('logged') * 1000:8.3f} ms")
+        
+        for notify in (False, True):
+            latency = LatencyHistogram()
+            with ChangeFeed(path, poll_interval=args.poll_interval) as feed:
+                subscription = feed.subscribe(2)
+                for i, note_id in enumerate(note_ids):
+                    start = time.perf_counter()
+                    update_note_content(conn, note_id, f'pushed {i}')
+                    conn.commit()
+                    if notify:
+                        feed.notify()
+                    while subscription.get(timeout=5).note_id != note_id:
+                        pass
+                    latency.record(time.perf_counter() - start)
+            summary = latency.summary()
+            label = 'with notify()' if notify else f'poll {args.poll_interval * 1000:.0f} ms'
+            print(f"push latency ({label}): "
+                  f"p50 {summary['p50_ms']:.1f} ms  p99 {summary['p99_ms']:.1f} ms")
+        
+        start = time.perf_counter()
+        fetch_visible_persons_notes(conn, 2)
+        poll = time.perf_counter() - start
+        print(f"one client poll of the visibility query: {poll * 1000:.1f} ms, i.e. "
+              f"{poll / args.poll_interval:.0%} of a core per client polling as often")
+        conn.close()
+
+
+def _median_ms(func, *args, repeat=20, **kwargs):
+    func(*args, **kwargs)  # Warm the page cache
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+
+def bench_tenants(args):
+    """Show per-tenant query latency as more tenants share one database."""
+    print(f"{'tenants':>7} {'persons':>9} {'admin rows':>11} {'user rows':>10} "
+          f"{'access':>8} {'shared db user rows':>20}")
+    for tenants in args.tenants:
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = get_connection(os.path.join(tmp, 'tenants.db'))
+            create_schema(conn)
+            enable_tenants(conn)
+            for tenant_id in range(1, tenants + 1):
+                insert_synthetic_data(conn, users=args.users, persons=args.tenant_persons,
+                                      notes_per_person=args.notes_per_person,
+                                      grants_per_user=200, seed=tenant_id, tenant_id=tenant_id)
+            # Measure the last tenant: its users and persons have the highest IDs
+            admin_id = (tenants - 1) * args.users + 1
+            note_id = conn.execute('SELECT MAX(id) FROM note').fetchone()[0]
+            admin = _median_ms(fetch_visible_persons_notes, conn, admin_id, tenant_id=tenants)
+            user = _median_ms(fetch_visible_persons_notes, conn, admin_id + 1, tenant_id=tenants)
+            access = _median_ms(get_users_with_access, conn, 'note', note_id,
+                                tenant_id=tenants, repeat=200)
+            conn.close()
+            # The same data in one database without tenants: no index narrows the scan
+            conn = get_connection(os.path.join(tmp, 'shared.db'))
+            create_schema(conn)
+            for tenant_id in range(1, tenants + 1):
+                insert_synthetic_data(conn, users=args.users, persons=args.tenant_persons,
+                                      notes_per_person=args.notes_per_person,
+                                      grants_per_user=200, seed=tenant_id)
+            shared = _median_ms(fetch_visible_persons_notes, conn, admin_id + 1, repeat=3)
+            conn.close()
+        print(f"{tenants:>7} {tenants * args.tenant_persons:>9,} {admin:>8.2f} ms "
+              f"{user:>7.2f} ms {access:>5.3f} ms {shared:>17.2f} ms")
+
+
+def bench_render(args):
+    """Compare re-rendering the user tables with and without the render cache."""
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = build_database(os.path.join(tmp, 'bench.db'), args.persons,
+                              args.notes_per_person, grants_per_user=2000)
+        note_ids = [row[0] for row in conn.execute(
+            'SELECT note_id FROM note_assignment WHERE user_id = 2 LIMIT 5')]
+        person_ids = [row[0] for row in conn.execute(
+            'SELECT id FROM person WHERE id NOT IN '
+            '(SELECT person_id FROM user_person WHERE user_id = 2) LIMIT 5')]
+        
+        def render():
+            start = time.perf_counter()
+            with redirect_stdout(io.StringIO()):
+                print_user_tables(conn, 2, 'user2')
+            return (time.perf_counter() - start) * 1000
+        
+        for cached in (False, True):
+            conn.render_cache = None
+            print(f"{'with' if cached else 'without'} render cache:")
+            for step, note_id, person_id in zip(range(1, 6), note_ids, person_ids):
+                if not cached:
+                    conn.render_cache = None
+                misses = conn.render_cache.misses if conn.render_cache else 0
+                update_note_content(conn, note_id, f'Edit {step} (cached={cached})')
+                assign_person(conn, 2, person_id)
+                conn.commit()
+                elapsed = render()
+                print(f"  use case {step}: {elapsed:8.1f} ms, "
+                      f"{conn.render_cache.misses - misses:6} cache misses")
+            conn.execute('DELETE FROM user_person WHERE user_id = 2 AND person_id IN '
+                         '(SELECT value FROM json_each(?))', (json.dumps(person_ids),))
+            conn.commit()
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--persons', type=int, default=100000)
+    parser.add_argument('--notes-per-person', type=int, default=10)
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+    subparsers.add_parser('rows', help=bench_rows.__doc__).set_defaults(func=bench_rows)
+    subparsers.add_parser('nested', help=bench_nested.__doc__).set_defaults(func=bench_nested)
+    subparsers.add_parser('export', help=bench_export.__doc__).set_defaults(func=bench_export)
+    subparsers.add_parser('archive', help=bench_archive.__doc__).set_defaults(func=bench_archive)
+    subparsers.add_parser('snapshot', help=bench_snapshot.__doc__).set_defaults(func=bench_snapshot)
+    subparsers.add_parser('search', help=bench_search.__doc__).set_defaults(func=bench_search)
+    content_parser = subparsers.add_parser('content', help=bench_content.__doc__)
+    content_parser.add_argument('--content-size', type=int, default=4096)
+    content_parser.set_defaults(func=bench_content)
+    writes_parser = subparsers.add_parser('writes', help=bench_writes.__doc__)
+    writes_parser.add_argument('--writes', type=int, default=2000,
+                               help="Note updates per measurement")
+    writes_parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    writes_parser.add_argument('--max-delay', type=float, default=0.0,
+                               help="Group commit window in seconds")
+    writes_parser.set_defaults(func=bench_writes)
+    contention_parser = subparsers.add_parser('contention', help=bench_contention.__doc__)
+    contention_parser.add_argument('--editors', type=int, nargs='+', default=[1, 4, 16])
+    contention_parser.add_argument('--edits', type=int, default=200, help="Edits per editor")
+    contention_parser.add_argument('--hot-notes', type=int, default=4)
+    contention_parser.set_defaults(func=bench_contention)
+    offboard_parser = subparsers.add_parser('offboard', help=bench_offboard.__doc__)
+    offboard_parser.add_argument('--users', type=int, default=4)
+    offboard_parser.add_argument('--lock-budget', type=float, default=0.05)
+    offboard_parser.set_defaults(func=bench_offboard)
+    maintenance_parser = subparsers.add_parser('maintenance', help=bench_maintenance.__doc__)
+    maintenance_parser.add_argument('--hot-persons', type=int, default=5)
+    maintenance_parser.add_argument('--hot-notes', type=int, default=5000,
+                                    help="Notes per hot person")
+    maintenance_parser.set_defaults(func=bench_maintenance)
+    feed_parser = subparsers.add_parser('feed', help=bench_feed.__doc__)
+    feed_parser.add_argument('--page-size', type=int, default=50)
+    feed_parser.set_defaults(func=bench_feed)
+    changes_parser = subparsers.add_parser('changes', help=bench_changes.__doc__)
+    changes_parser.add_argument('--poll-interval', type=float, default=0.05)
+    changes_parser.set_defaults(func=bench_changes)
+    tenants_parser = subparsers.add_parser('tenants', help=bench_tenants.__doc__)
+    tenants_parser.add_argument('--tenants', type=int, nargs='+', default=[1, 10, 100])
+    tenants_parser.add_argument('--tenant-persons', type=int, default=1000,
+                                help="Persons per tenant")
+    tenants_parser.add_argument('--users', type=int, default=20, help="Users per tenant")
+    tenants_parser.set_defaults(func=bench_tenants)
+    subparsers.add_parser('render', help=bench_render.__doc__).set_defaults(func=bench_render)
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,33 @@
 import sqlite3
 import os
+import argparse
+import asyncio
+import cProfile
+import csv
+import difflib
+import gzip
+import heapq
+import io
+import itertools
+import json
+import math
+import pstats
+import queue
+import random
+import re
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime, timedelta, timezone
 from enum import Enum
 from tabulate import tabulate
 import textwrap
+from urllib.request import pathname2url
 
 # Configuration
 MAX_TABLE_WIDTH = 100  # Maximum width for tables in characters
@@ -13,6 +38,22 @@ class Role(str, Enum):
     EDITOR = 'Editor'
     VIEWER = 'Viewer'
 
+    @property
+    def code(self):
+        """Integer code used when roles are stored as integers."""
+        return ROLE_CODES[self]
+
+    @classmethod
+    def from_db(cls, value):
+        """Convert a stored role value (name or integer code) to a Role."""
+        if isinstance(value, int):
+            return ROLE_BY_CODE[value]
+        return cls(value)
+
+
+ROLE_CODES = {Role.ADMIN: 1, Role.EDITOR: 2, Role.VIEWER: 3}
+ROLE_BY_CODE = {code: role for role, code in ROLE_CODES.items()}
+
 
 def is_admin(role):
     """Check if the given role is an admin role."""
@@ -37,33 +78,593 @@ def can_write(role, creator_id, user_id):
     return False
 
 
-def get_connection(path="showcase.db"):
+# Connection identities for get_data_version; unlike id() never reused
+_connection_tokens = itertools.count(1)
+
+
+class ShowcaseConnection(sqlite3.Connection):
+    """SQLite connection that can hold per-connection cached lookups."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_token = next(_connection_tokens)
+        self.admin_usernames = None  # (data version, {tenant_id: usernames})
+        self.render_cache = None  # See print_user_tables
+
+
+# Memory-map up to this many bytes of read-only databases (zero-copy reads)
+REPORT_MMAP_SIZE = 1 << 30
+
+CONNECTION_MODES = ('rw', 'ro', 'immutable')
+
+
+def get_connection(path="showcase.db", check_same_thread=True, mode='rw', mmap_size=None):
     """Get a database connection with foreign key constraints enabled.
     
     Args:
         path: Path to the SQLite database file. Defaults to 'showcase.db'.
+        check_same_thread: Set to False for connections handed between
+            threads (e.g. by a ConnectionPool).
+        mode: 'rw' (default), 'ro' to open the file read-only, or
+            'immutable' to also skip all locking and change detection. Only
+            use 'immutable' on files nobody writes to, such as snapshots.
+        mmap_size: Bytes of the file to memory-map (PRAGMA mmap_size).
+        
+    A note archive recorded in db_meta (see attach_archive) is attached
+    automatically, so archived notes stay visible to every connection.
         
     Returns:
-        sqlite3.Connection: A connection to the SQLite database.
+        ShowcaseConnection: A connection to the SQLite database.
     """
+    if mode not in CONNECTION_MODES:
+        raise ValueError(f"Unknown connection mode: {mode}")
     try:
-        conn = sqlite3.connect(path)
+        if mode == 'rw':
+            conn = sqlite3.connect(path, factory=ShowcaseConnection,
+                                   check_same_thread=check_same_thread)
+        else:
+            if path == ':memory:':
+                raise ValueError("Read-only modes need a database file")
+            uri = f"file:{pathname2url(os.path.abspath(path))}?mode=ro"
+            if mode == 'immutable':
+                uri += '&immutable=1'
+            conn = sqlite3.connect(uri, uri=True, factory=ShowcaseConnection,
+                                   check_same_thread=check_same_thread)
         conn.execute("PRAGMA foreign_keys = ON")
+        conn.create_function('note_text', 1, decode_note_content, deterministic=True)
+        if mmap_size is not None:
+            conn.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
         conn.row_factory = sqlite3.Row  # Enable dictionary-style access to columns
+        _reattach_archive(conn)
         return conn
     except sqlite3.Error as e:
         print(f"Error connecting to database: {e}")
         raise
 
 
-def create_schema(conn):
-    conn.execute('''
-    CREATE TABLE IF NOT EXISTS user (
-        id INTEGER PRIMARY KEY,
-        username TEXT NOT NULL UNIQUE,
-        role TEXT CHECK(role IN ('Admin', 'Editor', 'Viewer')) NOT NULL
-    );
-    ''')
+@contextmanager
+def reporting_snapshot(path, in_memory=False, mmap_size=REPORT_MMAP_SIZE):
+    """Yield a read-only connection to a point-in-time copy of a database.
+    
+    The live database is read once with the backup API; the report then
+    runs against the copy and holds no locks on the live file. By default
+    the copy is a temporary file opened immutable and memory-mapped; with
+    in_memory=True it is an in-memory database instead.
+    """
+    source = get_connection(path, mode='ro')
+    tmp_dir = None
+    try:
+        if in_memory:
+            conn = get_connection(':memory:')
+            source.backup(conn)
+            conn.execute('PRAGMA query_only = ON')
+        else:
+            tmp_dir = tempfile.TemporaryDirectory(prefix='showcase-snapshot-')
+            snapshot_path = os.path.join(tmp_dir.name, 'snapshot.db')
+            target = sqlite3.connect(snapshot_path)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+            conn = get_connection(snapshot_path, mode='immutable', mmap_size=mmap_size)
+    finally:
+        source.close()
+    try:
+        yield conn
+    finally:
+        conn.close()
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+
+def clone_database(source, target=':memory:'):
+    """Copy a database with the backup API and return a connection to the copy.
+    
+    Args:
+        source: Connection or path of the database to copy.
+        target: Path of the copy; an in-memory database by default.
+    """
+    source_conn = get_connection(source) if isinstance(source, (str, os.PathLike)) else source
+    try:
+        conn = get_connection(target)
+        source_conn.backup(conn)
+        return conn
+    finally:
+        if source_conn is not source:
+            source_conn.close()
+
+
+def backup_database(path, dest_path, pages=1024, sleep=0.01, progress=None):
+    """Copy a live database file to dest_path without blocking writers.
+    
+    The backup copies `pages` pages per step and releases the read lock
+    for `sleep` seconds in between, so other connections can keep
+    committing. SQLite restarts the copy when another connection modifies
+    the source mid-backup, so the result is always a consistent snapshot.
+    
+    Returns:
+        dict: pages copied and seconds taken.
+    """
+    def report(status, remaining, total):
+        if progress:
+            progress(total - remaining, total)
+    
+    start = time.perf_counter()
+    # Read-only, so a mistyped path fails instead of creating an empty database
+    source = get_connection(path, mode='ro')
+    try:
+        target = sqlite3.connect(dest_path)
+        try:
+            source.backup(target, pages=pages, sleep=sleep, progress=report)
+            total = target.execute('PRAGMA page_count').fetchone()[0]
+        finally:
+            target.close()
+    finally:
+        source.close()
+    return {'pages': total, 'seconds': time.perf_counter() - start}
+
+
+# Rows ANALYZE samples per index (PRAGMA analysis_limit); keeps the cost of
+# refreshing statistics bounded on large databases
+ANALYSIS_LIMIT = 1000
+
+
+def has_statistics(conn):
+    """Check whether ANALYZE has collected planner statistics (sqlite_stat1)."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+    ).fetchone()
+    return bool(exists and conn.execute('SELECT 1 FROM sqlite_stat1 LIMIT 1').fetchone())
+
+
+def analyze_database(conn, analysis_limit=ANALYSIS_LIMIT):
+    """Collect planner statistics for all tables and indexes.
+    
+    With skewed data (a few persons with thousands of notes) the planner
+    needs sqlite_stat1 to pick good plans for the visibility joins.
+    analysis_limit bounds the rows sampled per index (0: no limit).
+    """
+    conn.execute(f'PRAGMA analysis_limit = {int(analysis_limit)}')
+    conn.execute('ANALYZE')
+    conn.commit()
+
+
+def enable_incremental_vacuum(conn):
+    """Switch an existing database to auto_vacuum=INCREMENTAL.
+    
+    Databases created by create_schema already use it. Older files are
+    rewritten once with VACUUM, which needs exclusive access and time
+    proportional to the file size.
+    
+    Returns:
+        bool: True if the database was converted.
+    """
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+        return False
+    conn.commit()  # VACUUM is not allowed inside a transaction
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    conn.execute('VACUUM')
+    return True
+
+
+def incremental_vacuum(conn, pages=256, pause=0.0, max_pages=None):
+    """Return free pages to the file system, `pages` pages per transaction.
+    
+    Each step only holds the write lock briefly, unlike a full VACUUM. Does
+    nothing unless the database uses auto_vacuum=INCREMENTAL.
+    
+    Returns:
+        int: Number of pages freed.
+    """
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+        return 0
+    conn.commit()
+    freed = 0
+    while max_pages is None or freed < max_pages:
+        free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        step = min(pages, free) if max_pages is None else min(pages, free, max_pages - freed)
+        if step <= 0:
+            break
+        conn.execute(f'PRAGMA incremental_vacuum({step})').fetchall()
+        conn.commit()
+        after = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        if after >= free:
+            break
+        freed += free - after
+        if pause:
+            time.sleep(pause)
+    return freed
+
+
+def run_maintenance(conn, analyze=None, vacuum_pages=256, max_vacuum_pages=None,
+                    analysis_limit=ANALYSIS_LIMIT):
+    """Refresh planner statistics and reclaim free pages.
+    
+    Args:
+        analyze: True to run ANALYZE, False to skip it, None to analyze
+            only if no statistics exist yet.
+        vacuum_pages: Pages freed per incremental vacuum step.
+        max_vacuum_pages: Upper bound of pages freed in this run.
+    
+    Returns:
+        dict: analyzed (bool), freed_pages and seconds.
+    """
+    start = time.perf_counter()
+    if analyze is None:
+        analyze = not has_statistics(conn)
+    if analyze:
+        analyze_database(conn, analysis_limit)
+    freed = incremental_vacuum(conn, vacuum_pages, max_pages=max_vacuum_pages)
+    return {'analyzed': analyze, 'freed_pages': freed,
+            'seconds': time.perf_counter() - start}
+
+
+class MaintenanceScheduler:
+    """Background thread that runs run_maintenance on its own connection.
+    
+    Maintenance runs every `interval` seconds, and early once writers have
+    reported `writes_threshold` writes through note_writes (WriteQueue does
+    this when given the scheduler). ANALYZE is re-run once that many writes
+    have accumulated, or if the database has no statistics; every run
+    reclaims up to max_vacuum_pages free pages. If the database is locked
+    the run is retried at the next interval. Results are kept in `history`.
+    
+    PRAGMA optimize only considers tables the connection itself queried,
+    so it is run when the long-lived ConnectionPool and WriteQueue
+    connections are closed instead of here.
+    """
+
+    def __init__(self, path, interval=3600.0, writes_threshold=10000, vacuum_pages=256,
+                 max_vacuum_pages=4096, analysis_limit=ANALYSIS_LIMIT, busy_timeout=1.0):
+        self.interval = interval
+        self.writes_threshold = writes_threshold
+        self.vacuum_pages = vacuum_pages
+        self.max_vacuum_pages = max_vacuum_pages
+        self.analysis_limit = analysis_limit
+        self.history = []
+        self.errors = []
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._conn = get_connection(path, check_same_thread=False)
+        self._conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout * 1000)}")
+        self._thread = threading.Thread(target=self._run, name='maintenance', daemon=True)
+        self._thread.start()
+
+    def note_writes(self, count=1):
+        """Report writes; maintenance runs early once writes_threshold is reached."""
+        with self._lock:
+            self._writes += count
+            if self._writes >= self.writes_threshold:
+                self._wake.set()
+
+    def run_now(self):
+        """Wake the thread to run maintenance (with ANALYZE) immediately."""
+        with self._lock:
+            self._writes = max(self._writes, self.writes_threshold)
+        self._wake.set()
+
+    def close(self):
+        """Stop the thread and close its connection."""
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            with self._lock:
+                writes, self._writes = self._writes, 0
+            analyze = True if writes >= self.writes_threshold else None
+            try:
+                result = run_maintenance(self._conn, analyze, self.vacuum_pages,
+                                         self.max_vacuum_pages, self.analysis_limit)
+            except sqlite3.OperationalError as e:
+                if self._conn.in_transaction:
+                    self._conn.rollback()
+                self.errors.append(str(e))
+                with self._lock:
+                    self._writes += writes  # Count them again at the next attempt
+                continue
+            result.update(writes=writes, finished_at=time.time())
+            self.history.append(result)
+
+
+USER_TABLE_TEXT_ROLES = '''
+CREATE TABLE IF NOT EXISTS {name} (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL UNIQUE,
+    role TEXT CHECK(role IN ('Admin', 'Editor', 'Viewer')) NOT NULL
+);
+'''
+
+USER_TABLE_INT_ROLES = '''
+CREATE TABLE IF NOT EXISTS {name} (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL UNIQUE,
+    role INTEGER NOT NULL REFERENCES role(code)
+);
+'''
+
+
+class ConnectionPool:
+    """Thread-safe pool of connections to one database file.
+    
+    Each connection is used by one thread at a time. Note that every
+    connection to ':memory:' opens a separate, empty database.
+    """
+
+    def __init__(self, path, size=4):
+        self.path = path
+        self._connections = queue.LifoQueue()
+        for _ in range(size):
+            self._connections.put(get_connection(path, check_same_thread=False))
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Borrow a connection; uncommitted changes are rolled back on return."""
+        conn = self._connections.get(timeout=timeout)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._connections.put(conn)
+
+    def close(self):
+        while not self._connections.empty():
+            conn = self._connections.get_nowait()
+            conn.execute('PRAGMA optimize')  # Refresh statistics this connection found stale
+            conn.close()
+
+
+class WriteQueue:
+    """Single writer thread that group-commits queued write operations.
+    
+    Producers submit callables that take the writer's connection (e.g.
+    update_note_content or create_note) and get a Future back. The writer
+    runs all queued requests in one transaction, so concurrent writes that
+    arrive while the previous batch is being committed share the next
+    commit (and disk sync). With max_delay > 0 it also waits up to that
+    many seconds after the first request for more to arrive, which pays
+    off when a disk sync costs much more than the window. Each request runs inside its own
+    savepoint: a failing request is rolled back and its future gets the
+    exception without affecting the rest of the batch. Futures are resolved
+    only after the batch has been committed.
+    
+    Committed writes are reported to `maintenance` (a MaintenanceScheduler)
+    if given, so statistics are refreshed after bulk changes.
+    
+    Lock conflicts with other connections are first absorbed by
+    busy_timeout; if the database is still locked, taking the write lock
+    or committing is retried up to `retries` times with exponential backoff
+    before the whole batch fails with the OperationalError.
+    """
+
+    def __init__(self, path, max_batch=256, max_delay=0.0, busy_timeout=5.0,
+                 retries=5, backoff=0.01, maintenance=None):
+        self.path = path
+        self.maintenance = maintenance
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.retries = retries
+        self.backoff = backoff
+        self.batches = 0
+        self.requests = 0
+        self._conn = get_connection(path, check_same_thread=False)
+        self._conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout * 1000)}")
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._submit_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='write-queue', daemon=True)
+        self._thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        """Queue func(conn, *args, **kwargs); returns a Future for its result."""
+        future = Future()
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("WriteQueue is closed")
+            self._queue.put((future, func, args, kwargs))
+        return future
+
+    def close(self):
+        """Commit the queued requests, stop the writer and close its connection."""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+        self._conn.execute('PRAGMA optimize')
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _next_batch(self):
+        """Block for the first request, then gather what is queued or arrives in the window."""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 \
+                    else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Put the sentinel back so the loop stops after this batch
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _retry_busy(self, statement):
+        for attempt in range(self.retries + 1):
+            try:
+                return self._conn.execute(statement)
+            except sqlite3.OperationalError as e:
+                if 'locked' not in str(e) and 'busy' not in str(e):
+                    raise
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            live = [item for item in batch if item[0].set_running_or_notify_cancel()]
+            if live:
+                self._write_batch(live)
+
+    def _write_batch(self, batch):
+        conn = self._conn
+        results = []
+        try:
+            self._retry_busy('BEGIN IMMEDIATE')
+            for future, func, args, kwargs in batch:
+                conn.execute('SAVEPOINT write_request')
+                try:
+                    result = func(conn, *args, **kwargs)
+                except Exception as e:
+                    conn.execute('ROLLBACK TO write_request')
+                    results.append((future, None, e))
+                else:
+                    results.append((future, result, None))
+                conn.execute('RELEASE write_request')
+            self._retry_busy('COMMIT')
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.rollback()
+            for future, *_ in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.requests += len(batch)
+        if self.maintenance is not None:
+            self.maintenance.note_writes(len(batch))
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+class LatencyHistogram:
+    """Thread-safe latency histogram with logarithmic buckets.
+    
+    Buckets are 1/8 octave wide (about 9% resolution), so memory stays
+    constant no matter how many samples are recorded.
+    """
+    BUCKETS_PER_OCTAVE = 8
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        micros = max(seconds * 1e6, 1.0)
+        bucket = int(math.log2(micros) * self.BUCKETS_PER_OCTAVE)
+        with self._lock:
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    @contextmanager
+    def time(self):
+        """Record the duration of a with-block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(time.perf_counter() - start)
+
+    def percentile(self, fraction):
+        """Return the upper bound (seconds) of the bucket holding the given fraction."""
+        with self._lock:
+            threshold = fraction * self.count
+            seen = 0
+            for bucket in sorted(self.buckets):
+                seen += self.buckets[bucket]
+                if seen >= threshold:
+                    return min(2 ** ((bucket + 1) / self.BUCKETS_PER_OCTAVE) / 1e6, self.max)
+        return 0.0
+
+    def summary(self):
+        """Return count, mean, percentiles and maximum (milliseconds) as a dict."""
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(0.50) * 1000, 3),
+            'p90_ms': round(self.percentile(0.90) * 1000, 3),
+            'p99_ms': round(self.percentile(0.99) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+        }
+
+
+def create_schema(conn, role_storage='text'):
+    """Create all tables and indexes if they do not exist yet.
+    
+    Args:
+        conn: Database connection.
+        role_storage: 'text' stores user roles as names checked by a CHECK
+            constraint; 'int' stores integer codes referencing a role table.
+    """
+    if not conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone():
+        # Must be set before the first table is created (see incremental_vacuum)
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    if role_storage == 'int':
+        _create_role_table(conn)
+        conn.execute(USER_TABLE_INT_ROLES.format(name='user'))
+    elif role_storage == 'text':
+        conn.execute(USER_TABLE_TEXT_ROLES.format(name='user'))
+    else:
+        raise ValueError(f"Unknown role storage: {role_storage}")
+    _create_admin_index(conn)
     conn.execute('''
     CREATE TABLE IF NOT EXISTS person (
         id INTEGER PRIMARY KEY,
@@ -72,6 +673,7 @@ def create_schema(conn):
         email TEXT NOT NULL,
         telefon TEXT,
         created_by INTEGER NOT NULL,
+        version INTEGER NOT NULL DEFAULT 1,
         FOREIGN KEY(created_by) REFERENCES user(id)
     );
     ''')
@@ -82,10 +684,33 @@ def create_schema(conn):
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         created_by INTEGER NOT NULL,
         person_id INTEGER NOT NULL,
+        version INTEGER NOT NULL DEFAULT 1,
         FOREIGN KEY(created_by) REFERENCES user(id),
         FOREIGN KEY(person_id) REFERENCES person(id)
     );
     ''')
+    # Revision history of note contents (see update_note_content). No foreign
+    # key, because archive_notes moves the history of archived notes along
+    # with them. The note_revision_purge trigger deletes it with its note,
+    # so a later note that reuses the ID does not inherit it.
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS note_revision (
+        note_id INTEGER NOT NULL,
+        revision INTEGER NOT NULL,
+        kind TEXT NOT NULL CHECK(kind IN ('full', 'delta')),
+        data NOT NULL,
+        checksum INTEGER NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        edited_by INTEGER,
+        PRIMARY KEY(note_id, revision)
+    );
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS note_revision_purge AFTER DELETE ON note
+    BEGIN
+        DELETE FROM note_revision WHERE note_id = OLD.id;
+    END;
+    ''')
     conn.execute('''
     CREATE TABLE IF NOT EXISTS user_person (
         user_id INTEGER,
@@ -104,6 +729,310 @@ def create_schema(conn):
         FOREIGN KEY(user_id) REFERENCES user(id) ON DELETE CASCADE
     );
     ''')
+    # Indexes for the per-user access paths (creator, person and note grants)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_person_created_by ON person(created_by)')
+    # Lookups by exact name (UC-4, UC-5) and by email
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_person_name ON person(nachname, vorname)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_person_email ON person(email)')
+    # Creator lookups, newest first for the activity feed (replaces the older
+    # single-column idx_note_created_by)
+    conn.execute('DROP INDEX IF EXISTS idx_note_created_by')
+    conn.execute(
+        'CREATE INDEX IF NOT EXISTS idx_note_created_by_at ON note(created_by, created_at)'
+    )
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_note_person ON note(person_id, created_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_note_created_at ON note(created_at)')
+    conn.execute(
+        'CREATE INDEX IF NOT EXISTS idx_note_assignment_user ON note_assignment(user_id, note_id)'
+    )
+    # Who has been granted a person (change feed recipients, visibility joins)
+    conn.execute(
+        'CREATE INDEX IF NOT EXISTS idx_user_person_person ON user_person(person_id, user_id)'
+    )
+    _add_version_columns(conn)
+
+
+VERSIONED_ROW_TABLES = ('person', 'note')
+
+
+def _add_version_columns(conn):
+    """Add the optimistic locking version column to databases created without it.
+    
+    Adding a column with a constant default only changes the schema; existing
+    rows read as version 1 without being rewritten.
+    """
+    for table in VERSIONED_ROW_TABLES:
+        columns = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+        if 'version' not in columns:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1')
+
+
+def _create_role_table(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS role (
+        code INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    );
+    ''')
+    conn.executemany(
+        'INSERT OR IGNORE INTO role (code, name) VALUES (?, ?)',
+        [(code, role.value) for role, code in ROLE_CODES.items()]
+    )
+
+
+def _create_admin_index(conn):
+    # Partial index: admin lookups only touch the (few) admin entries
+    conn.execute(
+        f'CREATE INDEX IF NOT EXISTS idx_user_admin ON user(username) '
+        f'WHERE role = {_admin_role_literal(conn)}'
+    )
+
+
+def get_role_storage(conn):
+    """Return 'int' if user roles are stored as integer codes, else 'text'."""
+    for column in conn.execute('PRAGMA table_info(user)'):
+        if column[1] == 'role':
+            return 'int' if column[2].upper() == 'INTEGER' else 'text'
+    return 'text'
+
+
+def role_to_db(conn, role):
+    """Convert a role to the value stored in the user table of this database."""
+    role = Role.from_db(role)
+    return role.code if get_role_storage(conn) == 'int' else role.value
+
+
+def _admin_role_literal(conn):
+    # Must match the partial index predicate literally for it to be usable
+    return Role.ADMIN.code if get_role_storage(conn) == 'int' else f"'{Role.ADMIN.value}'"
+
+
+def get_admin_usernames(conn, tenant_id=None):
+    """Return the sorted usernames of all admins, or of one tenant's admins.
+    
+    The result is cached on ShowcaseConnection objects and revalidated
+    against the data version, so repeated access checks do not re-query the
+    user table.
+    """
+    version = get_data_version(conn)
+    cached = getattr(conn, 'admin_usernames', None)
+    if cached is None or version is None or cached[0] != version:
+        cached = (version, {})
+    if tenant_id in cached[1]:
+        return cached[1][tenant_id]
+    
+    query = f'SELECT username FROM user WHERE role = {_admin_role_literal(conn)}'
+    params = ()
+    if tenant_id is not None:
+        query += ' AND tenant_id = ?'
+        params = (tenant_id,)
+    cursor = conn.execute(query + ' ORDER BY username', params)
+    usernames = [row[0] for row in cursor.fetchall()]
+    if hasattr(conn, 'admin_usernames'):
+        cached[1][tenant_id] = usernames
+        conn.admin_usernames = cached
+    return usernames
+
+
+def migrate_role_codes(conn):
+    """Migrate an existing database from text roles to integer role codes.
+    
+    SQLite cannot change a column type in place, so the user table is
+    rebuilt with foreign key enforcement temporarily disabled. Other tables
+    keep referencing user(id) unchanged.
+    """
+    if get_role_storage(conn) == 'int':
+        return
+    
+    conn.commit()
+    conn.execute('PRAGMA foreign_keys = OFF')
+    try:
+        conn.execute('BEGIN')
+        _create_role_table(conn)
+        conn.execute(USER_TABLE_INT_ROLES.format(name='user_migrated'))
+        tenants = has_tenants(conn)
+        if tenants:
+            # They reference the user table, which is about to be dropped
+            _drop_tenant_triggers(conn)
+            conn.execute(
+                f'ALTER TABLE user_migrated ADD COLUMN tenant_id INTEGER NOT NULL '
+                f'DEFAULT {DEFAULT_TENANT}'
+            )
+        tenant_column = ', tenant_id' if tenants else ''
+        conn.execute(f'''
+            INSERT INTO user_migrated (id, username, role{tenant_column})
+            SELECT u.id, u.username, r.code{tenant_column}
+            FROM user u
+            JOIN role r ON r.name = u.role
+        ''')
+        conn.execute('DROP TABLE user')
+        conn.execute('ALTER TABLE user_migrated RENAME TO user')
+        _create_admin_index(conn)
+        if tenants:
+            _create_tenant_objects(conn)
+        if conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'data_version'"
+        ).fetchone():
+            create_version_tracking(conn)  # The user triggers were dropped with the table
+        if conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'visibility_counts'"
+        ).fetchone():
+            for statement in VISIBILITY_COUNTER_DDL:
+                conn.execute(statement)
+        violations = conn.execute('PRAGMA foreign_key_check').fetchall()
+        if violations:
+            raise sqlite3.IntegrityError(f"Foreign key violations after migration: {violations}")
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute('PRAGMA foreign_keys = ON')
+
+# Multi-tenant mode (see enable_tenants). Every user belongs to one tenant;
+# persons, notes and grants inherit the tenant of the row they depend on.
+DEFAULT_TENANT = 1
+
+TENANT_TABLES = ('user', 'person', 'note', 'user_person', 'note_assignment')
+
+# Per dependent table: the columns referencing other tables. The tenant of a
+# new row is copied from the first parent; all parents must share it.
+TENANT_PARENTS = {
+    'person': (('created_by', 'user'),),
+    'note': (('person_id', 'person'), ('created_by', 'user')),
+    'user_person': (('person_id', 'person'), ('user_id', 'user')),
+    'note_assignment': (('note_id', 'note'), ('user_id', 'user')),
+}
+
+TENANT_KEYS = {
+    'person': ('id',),
+    'note': ('id',),
+    'user_person': ('user_id', 'person_id'),
+    'note_assignment': ('note_id', 'user_id'),
+}
+
+# Tenant-leading indexes: a tenant-scoped query reads one contiguous index
+# range whose size does not depend on the other tenants. Grants need none,
+# they are always looked up by user, person or note.
+TENANT_INDEXES = (
+    # Tenant admins (get_admin_usernames), covering
+    'CREATE INDEX IF NOT EXISTS idx_user_tenant ON user(tenant_id, role, username)',
+    # Drives the visibility query in its output order
+    'CREATE INDEX IF NOT EXISTS idx_person_tenant ON person(tenant_id, nachname, vorname)',
+    # The admin activity feed of a tenant, newest first
+    'CREATE INDEX IF NOT EXISTS idx_note_tenant ON note(tenant_id, created_at)',
+)
+
+
+def _tenant_triggers(table):
+    """Return the DDL of the triggers that fill and guard table.tenant_id."""
+    parents = TENANT_PARENTS[table]
+    column, parent = parents[0]
+    inherited = f'(SELECT tenant_id FROM {parent} WHERE id = NEW.{column})'
+    tenant = f'COALESCE(NEW.tenant_id, {inherited})'
+    mismatch = ' OR '.join(
+        f'(SELECT tenant_id FROM {parent} WHERE id = NEW.{column}) IS NOT {tenant}'
+        for column, parent in parents
+    )
+    key = ' AND '.join(f'{name} = NEW.{name}' for name in TENANT_KEYS[table])
+    guard = f'''
+    CREATE TRIGGER IF NOT EXISTS tenant_{table}_{{action}}
+    BEFORE {{event}} ON {table}
+    WHEN {mismatch}
+    BEGIN
+        SELECT RAISE(ABORT, 'Rows of different tenants cannot reference each other');
+    END
+    '''
+    columns = ', '.join(['tenant_id'] + [column for column, _ in parents])
+    return (
+        guard.format(action='insert', event='INSERT'),
+        guard.format(action='update', event=f'UPDATE OF {columns}'),
+        f'''
+        CREATE TRIGGER IF NOT EXISTS tenant_{table}_fill
+        AFTER INSERT ON {table}
+        WHEN NEW.tenant_id IS NULL
+        BEGIN
+            UPDATE {table} SET tenant_id = {inherited} WHERE {key};
+        END
+        ''',
+    )
+
+
+def has_tenants(conn):
+    """Return True if the database is in multi-tenant mode."""
+    return any(row[1] == 'tenant_id' for row in conn.execute('PRAGMA table_info(user)'))
+
+
+def _drop_tenant_triggers(conn):
+    conn.execute('DROP TRIGGER IF EXISTS tenant_user_update')
+    for table in TENANT_PARENTS:
+        for action in ('insert', 'update', 'fill'):
+            conn.execute(f'DROP TRIGGER IF EXISTS tenant_{table}_{action}')
+
+
+def _create_tenant_objects(conn):
+    for statement in TENANT_INDEXES:
+        conn.execute(statement)
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS tenant_user_update
+    BEFORE UPDATE OF tenant_id ON user
+    WHEN NEW.tenant_id IS NOT OLD.tenant_id
+    BEGIN
+        SELECT RAISE(ABORT, 'The tenant of a user cannot be changed');
+    END
+    ''')
+    for table in TENANT_PARENTS:
+        for statement in _tenant_triggers(table):
+            conn.execute(statement)
+
+
+def enable_tenants(conn, default_tenant=DEFAULT_TENANT):
+    """Add the optional tenant dimension to an existing database (idempotent).
+    
+    All five tables get a tenant_id column; existing rows are assigned to
+    default_tenant. New users belong to DEFAULT_TENANT unless tenant_id is
+    given. Persons, notes and grants inserted without tenant_id take the
+    tenant of the user, person or note they reference, so the existing
+    write functions work unchanged. Triggers reject rows that would
+    reference another tenant's rows. The caller commits.
+    
+    Enabling rewrites every row once, so it takes a while on large databases.
+    """
+    for table in TENANT_TABLES:
+        if any(row[1] == 'tenant_id' for row in conn.execute(f'PRAGMA table_info({table})')):
+            continue
+        if table == 'user':
+            conn.execute(
+                f'ALTER TABLE user ADD COLUMN tenant_id INTEGER NOT NULL DEFAULT {DEFAULT_TENANT}'
+            )
+            if default_tenant != DEFAULT_TENANT:
+                conn.execute('UPDATE user SET tenant_id = ?', (default_tenant,))
+        else:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN tenant_id INTEGER')
+            conn.execute(f'UPDATE {table} SET tenant_id = ?', (default_tenant,))
+    _create_tenant_objects(conn)
+
+
+def get_user_tenant(conn, user_id):
+    """Return the tenant of a user, or None if the user does not exist.
+    
+    Without multi-tenant mode every existing user belongs to DEFAULT_TENANT.
+    """
+    if not has_tenants(conn):
+        exists = conn.execute('SELECT 1 FROM user WHERE id = ?', (user_id,)).fetchone()
+        return DEFAULT_TENANT if exists else None
+    row = conn.execute('SELECT tenant_id FROM user WHERE id = ?', (user_id,)).fetchone()
+    return row[0] if row else None
+
+
+def _outside_tenant(conn, user_id, tenant_id):
+    """Return True if tenant_id is given and the user does not belong to it."""
+    if tenant_id is None:
+        return False
+    if not has_tenants(conn):
+        raise ValueError("Multi-tenant mode is not enabled (see enable_tenants)")
+    return get_user_tenant(conn, user_id) != tenant_id
+
 
 SELECT_VISIBLE_DATA = '''
 SELECT DISTINCT p.id AS person_id, p.name AS person_name, 
@@ -117,37 +1046,127 @@ WHERE ? = 1  -- Admin sees everything
    OR na.user_id = ?    -- User is assigned to the note
 '''  # noqa: E501
 
-def fetch_visible_persons_notes(conn, user_id):
-    cursor = conn.cursor()
+VISIBLE_COLUMNS = (
+    'person_id', 'vorname', 'nachname', 'email',
+    'note_id', 'content', 'created_at', 'created_by_username'
+)
+
+
+class VisibleRow(namedtuple('_VisibleRowBase', VISIBLE_COLUMNS)):
+    """Compact result row of fetch_visible_persons_notes.
     
-    # Check if the user exists and get their role
-    cursor.execute('SELECT role, username FROM user WHERE id = ?', (user_id,))
-    result = cursor.fetchone()
+    A tuple subclass without a per-row dict. Like sqlite3.Row it supports
+    access by column name (row['vorname']), keys() and iteration over the
+    values, plus attribute access (row.vorname). Membership tests and JSON
+    serialization see the values, as for any tuple; use as_dict() where a
+    mapping is needed.
+    """
+    __slots__ = ()
+    _index = {name: i for i, name in enumerate(VISIBLE_COLUMNS)}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                key = self._index[key]
+            except KeyError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+    def keys(self):
+        return list(VISIBLE_COLUMNS)
+
+    def items(self):
+        return list(zip(VISIBLE_COLUMNS, self))
+
+    def get(self, key, default=None):
+        index = self._index.get(key)
+        return default if index is None else tuple.__getitem__(self, index)
+
+    def as_dict(self):
+        """Return the row as a plain dict."""
+        return dict(zip(VISIBLE_COLUMNS, self))
+
+
+def _visible_row_factory(cursor, row):
+    return tuple.__new__(VisibleRow, row)
+
+
+def execute_visible_query(conn, user_id, limit=None, offset=0, since=None, with_content=True,
+                          tenant_id=None):
+    """Execute the visibility query for a user and return the open cursor.
     
-    if not result:
-        print(f"Error: User with ID {user_id} not found")
+    Rows are produced as VisibleRow objects, so callers can stream large
+    results with fetchmany() instead of materializing them. With
+    with_content=False the content column is None (list mode); load the
+    contents that are actually shown with fetch_note_contents.
+    
+    If an archive database is attached (see attach_archive), archived notes
+    are included unless since lies after the archive watermark, in which
+    case only the live note table is read.
+    
+    In multi-tenant mode (see enable_tenants) only the user's own tenant is
+    read, admins included. If tenant_id is given, users of other tenants
+    are treated as unknown.
+    
+    Returns:
+        sqlite3.Cursor: The executed cursor, or None if the user does not exist.
+    """
+    built = _build_visible_query(conn, user_id, limit, offset, since, with_content, tenant_id)
+    if built is None:
+        return None
+    cursor = conn.cursor()
+    cursor.row_factory = _visible_row_factory
+    cursor.execute(*built)
+    return cursor
+
+
+def explain_visible_query(conn, user_id, **kwargs):
+    """Return the query plan of execute_visible_query as a list of plan lines.
+    
+    Keyword arguments are passed on like to execute_visible_query. Useful
+    to check how planner statistics (see analyze_database) change the plan.
+    """
+    built = _build_visible_query(conn, user_id, **kwargs)
+    if built is None:
         return []
-        
-    role, username = result
-    is_admin = role == 'Admin'
+    query, params = built
+    return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + query, params)]
+
+
+def _build_visible_query(conn, user_id, limit=None, offset=0, since=None, with_content=True,
+                         tenant_id=None):
+    """Return (query, params) of the visibility query, or None for unknown users."""
+    tenants = has_tenants(conn)
+    if tenant_id is not None and not tenants:
+        raise ValueError("Multi-tenant mode is not enabled (see enable_tenants)")
+    result = conn.execute(
+        f"SELECT role, {'tenant_id' if tenants else 'NULL'} FROM user WHERE id = ?", (user_id,)
+    ).fetchone()
+    if not result or (tenant_id is not None and result[1] != tenant_id):
+        return None
+    role, user_tenant = result
+    admin = is_admin(Role.from_db(role))
+    
+    since = _timestamp(since)
+    note_table, assignment_table = _note_sources(conn, since)
     
     # Query to fetch visible data
-    query = '''
+    query = f'''
     SELECT DISTINCT 
         p.id AS person_id, 
         p.vorname, 
         p.nachname,
         p.email,
         n.id AS note_id, 
-        n.content,
+        {'note_text(n.content)' if with_content else 'NULL'} AS content,
         n.created_at,
         u.username AS created_by_username
     FROM person p
-    LEFT JOIN note n ON p.id = n.person_id
+    LEFT JOIN {note_table} n ON p.id = n.person_id
     LEFT JOIN user u ON n.created_by = u.id
     LEFT JOIN user_person up ON p.id = up.person_id
-    LEFT JOIN note_assignment na ON n.id = na.note_id
-    WHERE ? = 1  -- Admin sees everything
+    LEFT JOIN {assignment_table} na ON n.id = na.note_id
+    WHERE (? = 1  -- Admin sees everything
        OR (
            -- User created the person or note
            (p.created_by = ? OR n.created_by = ?)
@@ -155,84 +1174,2117 @@ def fetch_visible_persons_notes(conn, user_id):
            OR up.user_id = ?
            -- User is assigned to the note
            OR na.user_id = ?
-       )
-    ORDER BY p.nachname, p.vorname, n.created_at
+       ))
     '''
     
-    if is_admin:
-        cursor.execute(query, (1, 0, 0, 0, 0))  # Only the first parameter matters for admin
+    if admin:
+        params = (1, 0, 0, 0, 0)  # Only the first parameter matters for admin
     else:
-        cursor.execute(query, (0, user_id, user_id, user_id, user_id))
-        
-    columns = [column[0] for column in cursor.description]
-    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        params = (0, user_id, user_id, user_id, user_id)
+    
+    if tenants:
+        # Grants never cross tenants, so only persons need the filter
+        query += ' AND p.tenant_id = ?'
+        params += (user_tenant,)
+    if since is not None:
+        # Only rows with notes created since the given time
+        query += ' AND n.created_at >= ?'
+        params += (since,)
+    query += ' ORDER BY p.nachname, p.vorname, n.created_at'
+    if limit is not None:
+        query += ' LIMIT ? OFFSET ?'
+        params += (limit, offset)
+    return query, params
 
 
-def insert_sample_data(conn):
-    # Insert users
-    users = [
-        (1, 'anna.schmitt', 'Admin'),
-        (2, 'bernd.mueller', 'Editor'),
-        (3, 'clara.schulz', 'Viewer')
-    ]
-    conn.executemany('INSERT INTO user (id, username, role) VALUES (?, ?, ?);', users)
+def fetch_visible_persons_notes(conn, user_id, limit=None, offset=0, since=None,
+                                with_content=True, tenant_id=None):
+    """Fetch all person/note rows visible to a user.
 
-    # Insert persons
-    persons = [
-        (1, 'Max', 'Beispiel', 'max.beispiel@example.com', '+4912345678', 1),
-        (2, 'Eva', 'Team', 'eva.team@example.com', '+4912345679', 1),
-        (3, 'Karl', 'Offen', 'karl.offen@example.com', '+4912345680', 2),
-        (4, 'Lisa', 'Privat', 'lisa.privat@example.com', '+4912345681', 2),
-        (5, 'Olaf', 'Gemein', 'olaf.gemein@example.com', '+4912345682', 3)
-    ]
+    Args:
+        conn: Database connection.
+        user_id: ID of the user whose visibility is applied.
+        limit: Optional maximum number of rows to return (for paging).
+        offset: Number of rows to skip before returning rows.
+        since: Optional datetime or timestamp string; only rows with notes
+            created at or after it are returned.
+        with_content: Set to False to leave out note contents (list mode).
+        tenant_id: Optional tenant the request is made for; users of other
+            tenants get no rows. Requires multi-tenant mode.
+
+    Returns:
+        list: One VisibleRow per visible person/note combination.
+    """
+    cursor = execute_visible_query(conn, user_id, limit, offset, since, with_content,
+                                   tenant_id)
+    if cursor is None:
+        return []
+    return cursor.fetchall()
+
+
+def _timestamp(value):
+    """Convert a datetime to the timestamp format stored in note.created_at."""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+
+def get_meta(conn, key, default=None):
+    """Read a value from the db_meta key/value table."""
+    try:
+        row = conn.execute('SELECT value FROM db_meta WHERE key = ?', (key,)).fetchone()
+    except sqlite3.OperationalError:
+        return default  # No meta table yet
+    return row[0] if row else default
+
+
+def set_meta(conn, key, value):
+    """Store a value in the db_meta key/value table."""
+    conn.execute('CREATE TABLE IF NOT EXISTS db_meta (key TEXT PRIMARY KEY, value)')
+    conn.execute(
+        'INSERT INTO db_meta (key, value) VALUES (?, ?) '
+        'ON CONFLICT(key) DO UPDATE SET value = excluded.value',
+        (key, value)
+    )
+
+
+# zlib level for compressed note contents (see enable_content_compression)
+CONTENT_COMPRESSION_LEVEL = 6
+
+
+def decode_note_content(value):
+    """Return note content as text, decompressing contents stored as BLOB."""
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode('utf-8')
+    return value
+
+
+def encode_note_content(content, min_size):
+    """Compress content of at least min_size UTF-8 bytes; None disables compression."""
+    if min_size is None:
+        return content
+    data = content.encode('utf-8')
+    if len(data) < min_size:
+        return content
+    compressed = zlib.compress(data, CONTENT_COMPRESSION_LEVEL)
+    return compressed if len(compressed) < len(data) else content
+
+
+def content_compression_min_size(conn):
+    """Return the size from which new note contents are compressed, or None."""
+    value = get_meta(conn, 'compress_min_size')
+    return None if value is None else int(value)
+
+
+def enable_content_compression(conn, min_size=512, chunk_size=5000):
+    """Store note contents of min_size bytes or more zlib-compressed.
+    
+    Compressed contents are kept as BLOBs in the content column; queries
+    decode them with the note_text() SQL function that get_connection
+    registers, so callers always see text. Existing notes are converted in
+    chunks, each committed separately. Run VACUUM afterwards to shrink the
+    database file.
+    
+    Returns:
+        int: Number of existing notes that were compressed.
+    """
+    set_meta(conn, 'compress_min_size', min_size)
+    conn.commit()
+    compressed = 0
+    last_id = 0
+    while True:
+        rows = conn.execute('''
+            SELECT id, content FROM note
+            WHERE id > ? AND typeof(content) = 'text' AND length(CAST(content AS BLOB)) >= ?
+            ORDER BY id LIMIT ?
+        ''', (last_id, min_size, chunk_size)).fetchall()
+        if not rows:
+            break
+        updates = []
+        for note_id, content in rows:
+            value = encode_note_content(content, min_size)
+            if isinstance(value, bytes):
+                updates.append((value, note_id))
+        conn.executemany('UPDATE note SET content = ? WHERE id = ?', updates)
+        conn.commit()
+        compressed += len(updates)
+        last_id = rows[-1][0]
+    return compressed
+
+
+def fetch_note_contents(conn, note_ids, batch_size=500):
+    """Load the contents of the given notes, e.g. the rows a list view shows.
+    
+    Use with rows fetched in list mode (with_content=False); the IDs should
+    come from a visibility query, this function does not check access.
+    
+    Returns:
+        dict: note_id -> content text for every note that exists.
+    """
+    note_ids = list(note_ids)
+    table = 'note_all' if _archive_attached(conn) else 'note'
+    contents = {}
+    for start in range(0, len(note_ids), batch_size):
+        batch = json.dumps(note_ids[start:start + batch_size])
+        contents.update(conn.execute(
+            f'SELECT id, note_text(content) FROM {table} '
+            f'WHERE id IN (SELECT value FROM json_each(?))',
+            (batch,)
+        ).fetchall())
+    return contents
+
+
+def _archive_attached(conn):
+    return any(row[1] == 'archive' for row in conn.execute('PRAGMA database_list'))
+
+
+def _note_sources(conn, since):
+    """Choose the note tables to read: live only, or live plus archive.
+    
+    Partition pruning: the archive is skipped when every note it holds is
+    older than the requested since timestamp.
+    """
+    if not _archive_attached(conn):
+        return 'note', 'note_assignment'
+    watermark = get_meta(conn, 'archive_before')
+    if since is not None and watermark is not None and since >= watermark:
+        return 'note', 'note_assignment'
+    return 'note_all', 'note_assignment_all'
+
+
+def attach_archive(conn, path=None):
+    """Attach the note archive database and create the unified views.
+    
+    The temporary views note_all and note_assignment_all combine live and
+    archived rows. The archive path is remembered in db_meta, and
+    get_connection attaches it again for every later connection.
+    """
+    if path is None:
+        path = get_meta(conn, 'archive_path')
+        if path is None:
+            raise ValueError("No archive path given or configured")
+    if not _archive_attached(conn):
+        conn.commit()  # ATTACH is not allowed inside a transaction
+        conn.execute('ATTACH DATABASE ? AS archive', (str(path),))
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS archive.note (
+        id INTEGER PRIMARY KEY,
+        content TEXT NOT NULL,
+        created_at TIMESTAMP,
+        created_by INTEGER NOT NULL,
+        person_id INTEGER NOT NULL
+    );
+    ''')
+    conn.execute(
+        'CREATE INDEX IF NOT EXISTS archive.idx_archive_note_person ON note(person_id, created_at)'
+    )
+    conn.execute(
+        'CREATE INDEX IF NOT EXISTS archive.idx_archive_note_created_by ON note(created_by)'
+    )
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS archive.note_assignment (
+        note_id INTEGER,
+        user_id INTEGER,
+        PRIMARY KEY(note_id, user_id)
+    );
+    ''')
+    conn.execute(
+        'CREATE INDEX IF NOT EXISTS archive.idx_archive_note_assignment_user '
+        'ON note_assignment(user_id)'
+    )
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS archive.note_revision (
+        note_id INTEGER NOT NULL,
+        revision INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        data NOT NULL,
+        checksum INTEGER NOT NULL,
+        created_at TIMESTAMP,
+        edited_by INTEGER,
+        PRIMARY KEY(note_id, revision)
+    );
+    ''')
+    _create_archive_views(conn)
+    set_meta(conn, 'archive_path', str(path))
+    conn.commit()
+
+
+def _create_archive_views(conn):
+    conn.execute('''
+    CREATE TEMP VIEW IF NOT EXISTS note_all AS
+    SELECT id, content, created_at, created_by, person_id FROM main.note
+    UNION ALL
+    SELECT id, content, created_at, created_by, person_id FROM archive.note
+    ''')
+    conn.execute('''
+    CREATE TEMP VIEW IF NOT EXISTS note_assignment_all AS
+    SELECT note_id, user_id FROM main.note_assignment
+    UNION ALL
+    SELECT note_id, user_id FROM archive.note_assignment
+    ''')
+    conn.execute('''
+    CREATE TEMP VIEW IF NOT EXISTS note_revision_all AS
+    SELECT note_id, revision, kind, data, checksum, created_at, edited_by
+    FROM main.note_revision
+    UNION ALL
+    SELECT note_id, revision, kind, data, checksum, created_at, edited_by
+    FROM archive.note_revision
+    ''')
+
+
+def _reattach_archive(conn):
+    """Attach the archive configured in db_meta, if there is one (see attach_archive)."""
+    path = get_meta(conn, 'archive_path')
+    if path is None or not os.path.exists(path):
+        return
+    conn.execute('ATTACH DATABASE ? AS archive', (path,))
+    _create_archive_views(conn)
+
+
+def archive_notes(conn, before, archive_path=None, chunk_size=5000):
+    """Move notes created before a point in time into the archive database.
+    
+    Notes, their assignments and their revision history are copied and
+    deleted in chunks, one transaction per chunk, so the live database is
+    never locked for long.
+    Afterwards the archive watermark is raised to before.
+    
+    Returns:
+        int: Number of archived notes.
+    """
+    attach_archive(conn, archive_path)
+    before = _timestamp(before)
+    moved = 0
+    while True:
+        ids = [row[0] for row in conn.execute(
+            'SELECT id FROM main.note WHERE created_at < ? LIMIT ?', (before, chunk_size)
+        )]
+        if not ids:
+            break
+        id_list = json.dumps(ids)
+        conn.execute('''
+            INSERT INTO archive.note (id, content, created_at, created_by, person_id)
+            SELECT id, content, created_at, created_by, person_id FROM main.note
+            WHERE id IN (SELECT value FROM json_each(?))
+        ''', (id_list,))
+        conn.execute('''
+            INSERT INTO archive.note_assignment (note_id, user_id)
+            SELECT note_id, user_id FROM main.note_assignment
+            WHERE note_id IN (SELECT value FROM json_each(?))
+        ''', (id_list,))
+        conn.execute('''
+            INSERT INTO archive.note_revision
+                (note_id, revision, kind, data, checksum, created_at, edited_by)
+            SELECT note_id, revision, kind, data, checksum, created_at, edited_by
+            FROM main.note_revision
+            WHERE note_id IN (SELECT value FROM json_each(?))
+        ''', (id_list,))
+        # The delete triggers remove the live assignments and revisions
+        conn.execute('DELETE FROM main.note WHERE id IN (SELECT value FROM json_each(?))',
+                     (id_list,))
+        conn.commit()
+        moved += len(ids)
+    
+    watermark = get_meta(conn, 'archive_before')
+    if watermark is None or before > watermark:
+        set_meta(conn, 'archive_before', before)
+    conn.commit()
+    return moved
+
+
+VISIBLE_PERSONS_QUERY = '''
+WITH access(person_id, all_notes) AS (
+    SELECT id, 1 FROM person WHERE created_by = :user_id
+    UNION ALL
+    SELECT person_id, 1 FROM user_person WHERE user_id = :user_id
+    UNION ALL
+    SELECT person_id, 0 FROM {note} WHERE created_by = :user_id
+    UNION ALL
+    SELECT n.person_id, 0
+    FROM {note_assignment} na
+    JOIN {note} n ON n.id = na.note_id
+    WHERE na.user_id = :user_id
+)
+SELECT p.id AS person_id, p.vorname, p.nachname, p.email,
+       MAX(a.all_notes) AS all_notes
+FROM access a
+JOIN person p ON p.id = a.person_id
+GROUP BY p.id
+ORDER BY p.nachname, p.vorname
+'''
+
+VISIBLE_NOTES_QUERY = '''
+SELECT n.id AS note_id, n.person_id, {content} AS content, n.created_at,
+       u.username AS created_by_username
+FROM {note} n
+LEFT JOIN user u ON n.created_by = u.id
+WHERE n.person_id IN (SELECT value FROM json_each(:all_notes_persons))
+   OR n.id IN (
+       SELECT id FROM {note} WHERE created_by = :user_id
+       UNION
+       SELECT note_id FROM {note_assignment} WHERE user_id = :user_id
+   )
+ORDER BY n.person_id, n.created_at
+'''
+
+
+def fetch_visible_persons_with_notes(conn, user_id, with_content=True, tenant_id=None):
+    """Fetch visible persons, each once, together with their visible notes.
+    
+    Same visibility rules as fetch_visible_persons_notes, but instead of one
+    joined row per note it runs two index-driven queries (persons, then notes
+    of those persons) so person columns are transferred only once. If
+    tenant_id is given, users of other tenants get no persons.
+    
+    Returns:
+        list: One dict per person (person_id, vorname, nachname, email) with
+        a 'notes' list of dicts (note_id, content, created_at,
+        created_by_username), ordered like the flat query. content is None
+        if with_content is False.
+    """
+    content = 'note_text(n.content)' if with_content else 'NULL'
+    tables = dict(zip(('note', 'note_assignment'), _note_sources(conn, None)))
+    cursor = conn.cursor()
+    cursor.execute('SELECT role FROM user WHERE id = ?', (user_id,))
+    result = cursor.fetchone()
+    
+    if not result or _outside_tenant(conn, user_id, tenant_id):
+        return []
+    
+    if is_admin(Role.from_db(result[0])):
+        # Admins of a tenant see everything in their tenant only
+        tenant_id = get_user_tenant(conn, user_id) if has_tenants(conn) else None
+        person_where = note_where = ''
+        if tenant_id is not None:
+            person_where = 'WHERE tenant_id = :tenant_id'
+            # Archived notes carry no tenant_id; they inherit their person's
+            note_where = ('WHERE n.tenant_id = :tenant_id' if tables['note'] == 'note' else
+                          'WHERE n.person_id IN (SELECT id FROM person WHERE tenant_id = :tenant_id)')
+        cursor.execute(f'''
+            SELECT id AS person_id, vorname, nachname, email, 1 AS all_notes
+            FROM person {person_where} ORDER BY nachname, vorname
+        ''', {'tenant_id': tenant_id})
+        person_rows = cursor.fetchall()
+        cursor.execute(f'''
+            SELECT n.id AS note_id, n.person_id, {content} AS content, n.created_at,
+                   u.username AS created_by_username
+            FROM {tables['note']} n
+            LEFT JOIN user u ON n.created_by = u.id
+            {note_where}
+            ORDER BY n.person_id, n.created_at
+        ''', {'tenant_id': tenant_id})
+    else:
+        cursor.execute(VISIBLE_PERSONS_QUERY.format(**tables), {'user_id': user_id})
+        person_rows = cursor.fetchall()
+        all_notes_persons = [row['person_id'] for row in person_rows if row['all_notes']]
+        cursor.execute(VISIBLE_NOTES_QUERY.format(content=content, **tables), {
+            'user_id': user_id,
+            'all_notes_persons': json.dumps(all_notes_persons)
+        })
+    
+    persons = {}
+    for row in person_rows:
+        persons[row['person_id']] = {
+            'person_id': row['person_id'],
+            'vorname': row['vorname'],
+            'nachname': row['nachname'],
+            'email': row['email'],
+            'notes': []
+        }
+    for row in cursor:
+        person = persons.get(row['person_id'])
+        if person is not None:
+            person['notes'].append({
+                'note_id': row['note_id'],
+                'content': row['content'],
+                'created_at': row['created_at'],
+                'created_by_username': row['created_by_username']
+            })
+    return list(persons.values())
+
+
+# Newest notes visible to a user. Every access path contributes at most
+# :limit candidates, read from covering indexes: the user's own notes come
+# newest-first from idx_note_created_by_at, the notes of visible persons are
+# top-N sorted from idx_note_person without touching the note table, and
+# assigned notes are top-N sorted after one note lookup each. Only the final
+# page is joined with person and user. {keyset} and {keyset_n} restrict all
+# paths to notes older than the continuation point.
+ACTIVITY_FEED_QUERY = '''
+WITH visible_person(person_id) AS (
+    SELECT id FROM person WHERE created_by = :user_id
+    UNION
+    SELECT person_id FROM user_person WHERE user_id = :user_id
+),
+candidate(note_id) AS (
+    SELECT id FROM (
+        SELECT id FROM note WHERE created_by = :user_id {keyset}
+        ORDER BY created_at DESC, id DESC LIMIT :limit
+    )
+    UNION
+    SELECT id FROM (
+        SELECT id FROM note
+        WHERE person_id IN (SELECT person_id FROM visible_person) {keyset}
+        ORDER BY created_at DESC, id DESC LIMIT :limit
+    )
+    UNION
+    SELECT id FROM (
+        SELECT n.id FROM note_assignment na JOIN note n ON n.id = na.note_id
+        WHERE na.user_id = :user_id {keyset_n}
+        ORDER BY n.created_at DESC, n.id DESC LIMIT :limit
+    )
+)
+SELECT p.id AS person_id, p.vorname, p.nachname, p.email,
+       n.id AS note_id, {content} AS content, n.created_at,
+       u.username AS created_by_username
+FROM candidate c
+JOIN note n ON n.id = c.note_id
+JOIN person p ON p.id = n.person_id
+LEFT JOIN user u ON u.id = n.created_by
+WHERE true {keyset_n}
+ORDER BY n.created_at DESC, n.id DESC
+LIMIT :limit
+'''
+
+ADMIN_ACTIVITY_FEED_QUERY = '''
+SELECT p.id AS person_id, p.vorname, p.nachname, p.email,
+       n.id AS note_id, {content} AS content, n.created_at,
+       u.username AS created_by_username
+FROM note n
+JOIN person p ON p.id = n.person_id
+LEFT JOIN user u ON u.id = n.created_by
+WHERE true {tenant} {keyset_n}
+ORDER BY n.created_at DESC, n.id DESC
+LIMIT :limit
+'''
+
+ACTIVITY_KEYSET = 'AND ({prefix}created_at, {prefix}id) < (:before_at, :before_id)'
+
+
+def fetch_activity_feed(conn, user_id, limit=50, before=None, with_content=True,
+                        tenant_id=None):
+    """Fetch the newest notes visible to a user, newest first.
+    
+    Same visibility rules as fetch_visible_persons_notes, restricted to the
+    live note table. Pages are continued by keyset rather than offset, so
+    later pages cost the same as the first.
+    
+    Args:
+        limit: Maximum number of notes to return (at least 1).
+        before: Continuation token from a previous call: only notes older
+            than that point are returned.
+        with_content: Set to False to leave out note contents.
+        tenant_id: Optional tenant the request is made for; users of other
+            tenants get an empty feed. Requires multi-tenant mode.
+    
+    Returns:
+        tuple: (rows, next_before). rows is a list of VisibleRow;
+        next_before is the token for the next page, or None after the
+        last page.
+    """
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    role = get_user_role(conn, user_id)
+    if role is None or _outside_tenant(conn, user_id, tenant_id):
+        return [], None
+    params = {'user_id': user_id, 'limit': limit}
+    keyset = keyset_n = ''
+    if before is not None:
+        params['before_at'], params['before_id'] = before
+        keyset = ACTIVITY_KEYSET.format(prefix='')
+        keyset_n = ACTIVITY_KEYSET.format(prefix='n.')
+    query = ADMIN_ACTIVITY_FEED_QUERY if is_admin(role) else ACTIVITY_FEED_QUERY
+    tenant = ''
+    if is_admin(role) and has_tenants(conn):
+        # Read from idx_note_tenant: a tenant admin sees the own tenant only
+        tenant = 'AND n.tenant_id = :tenant_id'
+        params['tenant_id'] = get_user_tenant(conn, user_id)
+    cursor = conn.cursor()
+    cursor.row_factory = _visible_row_factory
+    rows = cursor.execute(query.format(
+        content='note_text(n.content)' if with_content else 'NULL',
+        keyset=keyset, keyset_n=keyset_n, tenant=tenant
+    ), params).fetchall()
+    next_before = (rows[-1].created_at, rows[-1].note_id) if rows and len(rows) == limit else None
+    return rows, next_before
+
+
+# FTS5 trigram index over the searchable person columns, kept in sync with
+# the person table by triggers (external content, so text is stored once)
+PERSON_SEARCH_DDL = (
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS person_search USING fts5(
+        vorname, nachname, email,
+        content='person', content_rowid='id', tokenize='trigram'
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS person_search_insert AFTER INSERT ON person
+    BEGIN
+        INSERT INTO person_search (rowid, vorname, nachname, email)
+        VALUES (NEW.id, NEW.vorname, NEW.nachname, NEW.email);
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS person_search_delete AFTER DELETE ON person
+    BEGIN
+        INSERT INTO person_search (person_search, rowid, vorname, nachname, email)
+        VALUES ('delete', OLD.id, OLD.vorname, OLD.nachname, OLD.email);
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS person_search_update AFTER UPDATE OF vorname, nachname, email ON person
+    BEGIN
+        INSERT INTO person_search (person_search, rowid, vorname, nachname, email)
+        VALUES ('delete', OLD.id, OLD.vorname, OLD.nachname, OLD.email);
+        INSERT INTO person_search (rowid, vorname, nachname, email)
+        VALUES (NEW.id, NEW.vorname, NEW.nachname, NEW.email);
+    END;
+    ''',
+)
+
+# Persons a non-admin user can see (same rules as VISIBLE_PERSONS_QUERY)
+VISIBLE_PERSON_IDS_QUERY = '''
+SELECT id FROM person WHERE created_by = :user_id
+UNION
+SELECT person_id FROM user_person WHERE user_id = :user_id
+UNION
+SELECT person_id FROM note WHERE created_by = :user_id
+UNION
+SELECT n.person_id
+FROM note_assignment na
+JOIN note n ON n.id = na.note_id
+WHERE na.user_id = :user_id
+'''
+
+SEARCH_LIKE_FILTER = (
+    "(p.vorname LIKE :pattern ESCAPE '\\' OR p.nachname LIKE :pattern ESCAPE '\\' "
+    "OR p.email LIKE :pattern ESCAPE '\\')"
+)
+
+
+def create_person_search(conn):
+    """Create and fill the trigram search index over person names and emails.
+    
+    Returns:
+        bool: False if this SQLite build lacks FTS5 trigram support;
+        search_persons then falls back to scanning with LIKE.
+    """
+    exists = _has_person_search(conn)
+    try:
+        for statement in PERSON_SEARCH_DDL:
+            conn.execute(statement)
+    except sqlite3.OperationalError:
+        return False
+    if not exists:
+        conn.execute("INSERT INTO person_search (person_search) VALUES ('rebuild')")
+    conn.commit()
+    return True
+
+
+def _has_person_search(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'person_search'"
+    ).fetchone() is not None
+
+
+# Matches a restricted user's search checks for visibility one by one before
+# falling back to scanning all persons visible to them
+SEARCH_CANDIDATE_LIMIT = 2000
+
+SEARCH_CANDIDATES_QUERY = '''
+SELECT p.id AS person_id, p.vorname, p.nachname, p.email
+FROM ({candidates}) c
+JOIN person p ON p.id = c.id
+WHERE :all_visible{tenant}
+   OR p.created_by = :user_id
+   OR EXISTS (SELECT 1 FROM user_person WHERE user_id = :user_id AND person_id = p.id)
+   -- Unary + keeps the planner on idx_note_person instead of idx_note_created_by_at
+   OR EXISTS (SELECT 1 FROM note WHERE person_id = p.id AND +created_by = :user_id)
+   OR EXISTS (
+       SELECT 1 FROM note n
+       JOIN note_assignment na ON na.note_id = n.id AND na.user_id = :user_id
+       WHERE n.person_id = p.id
+   )
+LIMIT :limit
+'''
+
+
+def search_persons(conn, user_id, query, limit=10, tenant_id=None):
+    """Find the first `limit` visible persons whose name or email contains query.
+    
+    Matching is a case-insensitive substring match on vorname, nachname and
+    email. Candidates come from the trigram index (queries of three or more
+    characters, see create_person_search) or a LIKE scan, in person ID
+    order, and are checked against the user's visibility until `limit`
+    are found. If a frequent term has fewer than `limit` visible persons
+    among its first SEARCH_CANDIDATE_LIMIT candidates, the persons visible
+    to the user are scanned instead. In multi-tenant mode admins only find
+    persons of their own tenant; if tenant_id is given, users of other
+    tenants find nothing.
+    
+    This is not a top-k by name: with more than `limit` matches, the
+    result holds the first matches in person ID order, which need not be
+    the alphabetically first. Stopping early keeps frequent terms cheap;
+    ranking all matches would cost a sort of every candidate.
+    
+    Returns:
+        list: Up to `limit` dicts with person_id, vorname, nachname and
+        email, the first matches by person ID, sorted by name for display.
+    """
+    query = query.strip()
+    role = get_user_role(conn, user_id)
+    if role is None or _outside_tenant(conn, user_id, tenant_id) or not query:
+        return []
+    
+    pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    # Tenant admins see their tenant's persons; grants never cross tenants
+    tenant_id = get_user_tenant(conn, user_id) if is_admin(role) and has_tenants(conn) else None
+    all_visible = is_admin(role) and tenant_id is None
+    params = {
+        'user_id': user_id,
+        'pattern': pattern,
+        'match': '"' + query.replace('"', '""') + '"',
+        'limit': limit,
+        'all_visible': all_visible,
+        'tenant_id': tenant_id,
+        'candidates': limit if all_visible else SEARCH_CANDIDATE_LIMIT + 1,
+    }
+    tenant = '' if tenant_id is None else ' OR p.tenant_id = :tenant_id'
+    if len(query) >= 3 and _has_person_search(conn):
+        candidates_sql = (
+            'SELECT rowid AS id FROM person_search WHERE person_search MATCH :match '
+            'LIMIT :candidates'
+        )
+    else:
+        # Too short for trigrams; frequent short queries stop early
+        candidates_sql = (
+            f'SELECT p.id FROM person p WHERE {SEARCH_LIKE_FILTER} LIMIT :candidates'
+        )
+    rows = conn.execute(
+        SEARCH_CANDIDATES_QUERY.format(candidates=candidates_sql, tenant=tenant), params
+    ).fetchall()
+    
+    if len(rows) < limit and not all_visible:
+        truncated = conn.execute(
+            f'SELECT COUNT(*) FROM ({candidates_sql})', params
+        ).fetchone()[0] > SEARCH_CANDIDATE_LIMIT
+        if truncated:
+            visible = ('p.tenant_id = :tenant_id' if tenant_id is not None else
+                       f'p.id IN ({VISIBLE_PERSON_IDS_QUERY})')
+            rows = conn.execute(f'''
+                SELECT p.id AS person_id, p.vorname, p.nachname, p.email
+                FROM person p
+                WHERE {visible} AND {SEARCH_LIKE_FILTER}
+                LIMIT :limit
+            ''', params).fetchall()
+    rows = [dict(row) for row in rows]
+    rows.sort(key=lambda row: (row['nachname'], row['vorname'], row['person_id']))
+    return rows
+
+
+# Tables whose changes invalidate cached query results
+VERSIONED_TABLES = ('user', 'person', 'note', 'user_person', 'note_assignment')
+
+
+def create_version_tracking(conn):
+    """Create a data version counter that triggers bump on every data change.
+
+    Caches can validate their entries against this counter with a single
+    one-row query instead of re-running the visibility query.
+    """
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS data_version (
+        id INTEGER PRIMARY KEY CHECK(id = 1),
+        version INTEGER NOT NULL
+    );
+    ''')
+    conn.execute('INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)')
+    for table in VERSIONED_TABLES:
+        for action in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_{action.lower()}_version
+            AFTER {action} ON {table}
+            BEGIN
+                UPDATE data_version SET version = version + 1 WHERE id = 1;
+            END;
+            ''')
+
+
+def get_data_version(conn):
+    """Return a stamp that changes whenever the visible data may have changed.
+
+    Uses the trigger-maintained counter if version tracking is enabled.
+    Otherwise falls back to SQLite's data_version pragma (changes made by
+    other connections) combined with the connection's own change counter.
+    Both only mean something per connection, so the fallback is tied to the
+    ShowcaseConnection's unique cache_token; for other connections it
+    returns None, meaning "do not cache".
+    """
+    try:
+        row = conn.execute('SELECT version FROM data_version WHERE id = 1').fetchone()
+        if row is not None:
+            return row[0]
+    except sqlite3.OperationalError:
+        pass  # Version tracking not enabled
+    token = getattr(conn, 'cache_token', None)
+    if token is None:
+        return None
+    pragma_version = conn.execute('PRAGMA data_version').fetchone()[0]
+    return (token, pragma_version, conn.total_changes)
+
+
+class VisibleDataCache:
+    """Read-through cache for fetch_visible_persons_notes result pages.
+
+    Entries are keyed by user, page and filter arguments and stored as
+    serialized JSON, so memory use can be bounded in bytes. Every entry is
+    stamped with the data version it was read at; a cache hit costs one
+    version lookup. Least recently used entries are evicted first.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (version, payload)
+        self._lock = threading.Lock()
+
+    def fetch(self, conn, user_id, page=None, page_size=100, **filters):
+        """Return visible rows for a user, served from the cache when valid.
+
+        Args:
+            conn: Database connection.
+            user_id: ID of the user whose visibility is applied.
+            page: Zero-based page number, or None for the full result.
+            page_size: Number of rows per page.
+            **filters: Extra keyword arguments for fetch_visible_persons_notes.
+        """
+        key = (user_id, page, page_size if page is not None else None,
+               tuple(sorted(filters.items())))
+        version = get_data_version(conn)
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if version is not None and entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return [tuple.__new__(VisibleRow, row) for row in json.loads(entry[1])]
+            self.misses += 1
+        
+        if page is None:
+            rows = fetch_visible_persons_notes(conn, user_id, **filters)
+        else:
+            rows = fetch_visible_persons_notes(
+                conn, user_id, limit=page_size, offset=page * page_size, **filters
+            )
+        if version is not None:
+            self._store(key, version, json.dumps(rows).encode())
+        return rows
+
+    def _store(self, key, version, payload):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= len(old[1])
+            if len(payload) > self.max_bytes:
+                return  # Too large to cache at all
+            self._entries[key] = (version, payload)
+            self.current_bytes += len(payload)
+            while (len(self._entries) > self.max_entries
+                   or self.current_bytes > self.max_bytes):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+                self.evictions += 1
+
+    def invalidate(self, user_id=None):
+        """Drop cached entries for one user, or all entries if user_id is None."""
+        with self._lock:
+            for key in list(self._entries):
+                if user_id is None or key[0] == user_id:
+                    _, payload = self._entries.pop(key)
+                    self.current_bytes -= len(payload)
+
+
+# Trigger-fed log of changes that affect what users see (see ChangeFeed).
+# note_* events carry the note's person and creator; grant events carry the
+# grantee as user_id; person_updated carries the previous creator.
+CHANGE_LOG_DDL = (
+    '''
+    CREATE TABLE IF NOT EXISTS change_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        user_id INTEGER,
+        person_id INTEGER,
+        note_id INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS cl_note_insert AFTER INSERT ON note BEGIN
+        INSERT INTO change_log (kind, user_id, person_id, note_id)
+        VALUES ('note_created', NEW.created_by, NEW.person_id, NEW.id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS cl_note_update
+    AFTER UPDATE OF content, person_id, created_by ON note BEGIN
+        INSERT INTO change_log (kind, user_id, person_id, note_id)
+        VALUES ('note_updated', NEW.created_by, NEW.person_id, NEW.id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS cl_note_delete AFTER DELETE ON note BEGIN
+        INSERT INTO change_log (kind, user_id, person_id, note_id)
+        VALUES ('note_deleted', OLD.created_by, OLD.person_id, OLD.id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS cl_person_update
+    AFTER UPDATE OF vorname, nachname, email, telefon, created_by ON person BEGIN
+        INSERT INTO change_log (kind, user_id, person_id)
+        VALUES ('person_updated', OLD.created_by, NEW.id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS cl_user_person_insert AFTER INSERT ON user_person BEGIN
+        INSERT INTO change_log (kind, user_id, person_id)
+        VALUES ('person_granted', NEW.user_id, NEW.person_id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS cl_user_person_delete AFTER DELETE ON user_person BEGIN
+        INSERT INTO change_log (kind, user_id, person_id)
+        VALUES ('person_revoked', OLD.user_id, OLD.person_id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS cl_note_assignment_insert AFTER INSERT ON note_assignment BEGIN
+        INSERT INTO change_log (kind, user_id, note_id)
+        VALUES ('note_granted', NEW.user_id, NEW.note_id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS cl_note_assignment_delete AFTER DELETE ON note_assignment BEGIN
+        INSERT INTO change_log (kind, user_id, note_id)
+        VALUES ('note_revoked', OLD.user_id, OLD.note_id);
+    END
+    ''',
+)
+
+GRANT_EVENTS = ('person_granted', 'person_revoked', 'note_granted', 'note_revoked')
+
+# Users who can see a note or person when an event is delivered; {tenant}
+# limits the admins to the person's tenant in multi-tenant mode
+EVENT_RECIPIENTS_QUERY = '''
+SELECT id FROM user WHERE role = {admin}{tenant}
+UNION SELECT :user_id WHERE :user_id IS NOT NULL
+UNION SELECT created_by FROM person WHERE id = :person_id
+UNION SELECT user_id FROM user_person WHERE person_id = :person_id
+UNION SELECT user_id FROM note_assignment WHERE note_id = :note_id
+'''
+
+ChangeEvent = namedtuple('ChangeEvent', 'seq kind user_id person_id note_id created_at')
+
+
+def create_change_log(conn):
+    """Create the change_log table and the triggers that fill it (idempotent)."""
+    # Replace the earlier version that logged every person update, including
+    # the tenant_id fills of enable_tenants and of every person insert
+    conn.execute('DROP TRIGGER IF EXISTS cl_person_update')
+    for statement in CHANGE_LOG_DDL:
+        conn.execute(statement)
+
+
+def prune_change_log(conn, before_seq):
+    """Delete change_log entries with seq < before_seq. The caller commits.
+    
+    Returns:
+        int: Number of deleted entries.
+    """
+    return conn.execute('DELETE FROM change_log WHERE seq < ?', (before_seq,)).rowcount
+
+
+class ChangeFeedError(Exception):
+    """Raised to subscribers when the ChangeFeed could not read the change log.
+    
+    The feed retries at the next poll; events are not lost, so subscribers
+    may keep reading after handling the error.
+    """
+
+
+class Subscription:
+    """Events for one user from a ChangeFeed.
+    
+    Read them with get(), or with `async for` if created by
+    ChangeFeed.subscribe_async. Both raise ChangeFeedError when the feed
+    starts failing (see ChangeFeed).
+    """
+
+    def __init__(self, feed, user_id, loop=None):
+        self.user_id = user_id
+        self._feed = feed
+        self._loop = loop
+        self._queue = asyncio.Queue() if loop is not None else queue.SimpleQueue()
+
+    def _deliver(self, event):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+        else:
+            self._queue.put(event)
+
+    def get(self, timeout=None):
+        """Return the next event; raises queue.Empty after timeout seconds."""
+        return self._unwrap(self._queue.get(timeout=timeout))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return self._unwrap(await self._queue.get())
+
+    @staticmethod
+    def _unwrap(item):
+        if isinstance(item, ChangeFeedError):
+            raise item
+        return item
+
+    def close(self):
+        """Stop receiving events."""
+        self._feed._unsubscribe(self)
+
+
+class ChangeFeed:
+    """Push visibility changes from change_log to subscribed users.
+    
+    One background thread per process follows the change_log (see
+    create_change_log) on its own connection and routes each event to the
+    subscriptions of the users it concerns: the grantee for grant events,
+    and everyone who can see the note or person at delivery time for the
+    other events. The thread only queries the log after PRAGMA
+    data_version reports a commit by another connection, checked every
+    poll_interval seconds; notify() wakes it at once, e.g. after an
+    in-process write.
+    
+    Subscribers receive events committed after the feed started. If reading
+    or routing fails, the error is kept in `errors`, every subscriber
+    receives a ChangeFeedError once, and the thread retries at the next
+    poll from the first undelivered event.
+    """
+
+    def __init__(self, path, poll_interval=0.05, batch_size=1000):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.delivered = 0
+        self.errors = []
+        self._failing = False
+        self._subscriptions = {}  # user_id -> list of Subscription
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._conn = get_connection(path, check_same_thread=False)
+        self.last_seq = self._conn.execute(
+            'SELECT COALESCE(MAX(seq), 0) FROM change_log').fetchone()[0]
+        self._data_version = None
+        self._thread = threading.Thread(target=self._run, name='change-feed', daemon=True)
+        self._thread.start()
+
+    def subscribe(self, user_id):
+        """Register for the events of a user; returns a Subscription."""
+        return self._add(Subscription(self, user_id))
+
+    def subscribe_async(self, user_id):
+        """Like subscribe, for use with `async for` in the running event loop."""
+        return self._add(Subscription(self, user_id, asyncio.get_running_loop()))
+
+    def notify(self):
+        """Check the change log now instead of at the next poll."""
+        self._wake.set()
+
+    def close(self):
+        """Stop the thread and close its connection."""
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _add(self, subscription):
+        with self._lock:
+            self._subscriptions.setdefault(subscription.user_id, []).append(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id, [])
+            if subscription in subscriptions:
+                subscriptions.remove(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.user_id, None)
+
+    def _run(self):
+        while not self._stop.is_set():
+            notified = self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+                if not notified and data_version == self._data_version and not self._failing:
+                    continue
+                self._data_version = data_version
+                while self._dispatch_batch():
+                    pass
+            except Exception as e:
+                if self._conn.in_transaction:
+                    self._conn.rollback()
+                self.errors.append(str(e))
+                if not self._failing:
+                    self._failing = True
+                    self._broadcast(ChangeFeedError(f"Change feed failed: {e}"))
+                continue
+            self._failing = False
+
+    def _broadcast(self, item):
+        with self._lock:
+            subscriptions = [s for group in self._subscriptions.values() for s in group]
+        for subscription in subscriptions:
+            subscription._deliver(item)
+
+    def _recipients_query(self):
+        # Built per batch: tenant mode or the role storage may change while running
+        tenant = ''
+        if has_tenants(self._conn):
+            tenant = ' AND tenant_id IS (SELECT tenant_id FROM person WHERE id = :person_id)'
+        return EVENT_RECIPIENTS_QUERY.format(admin=_admin_role_literal(self._conn),
+                                             tenant=tenant)
+
+    def _dispatch_batch(self):
+        """Route the next batch of logged events; returns False when caught up."""
+        recipients_query = None
+        rows = self._conn.execute(
+            'SELECT seq, kind, user_id, person_id, note_id, created_at FROM change_log '
+            'WHERE seq > ? ORDER BY seq LIMIT ?', (self.last_seq, self.batch_size)
+        ).fetchall()
+        for row in rows:
+            event = ChangeEvent(*row)
+            with self._lock:
+                subscribed = set(self._subscriptions)
+            if not subscribed:
+                self.last_seq = event.seq
+                continue
+            if event.kind in GRANT_EVENTS:
+                recipients = {event.user_id}
+            else:
+                if recipients_query is None:
+                    recipients_query = self._recipients_query()
+                recipients = {user_id for (user_id,) in self._conn.execute(
+                    recipients_query, event._asdict())}
+            for user_id in recipients & subscribed:
+                with self._lock:
+                    subscriptions = list(self._subscriptions.get(user_id, ()))
+                for subscription in subscriptions:
+                    subscription._deliver(event)
+                    self.delivered += 1
+            # Only now: if routing failed, the retry starts at this event
+            self.last_seq = event.seq
+        return len(rows) == self.batch_size
+
+
+def insert_sample_data(conn):
+    # Insert users
+    users = [
+        (1, 'anna.schmitt', 'Admin'),
+        (2, 'bernd.mueller', 'Editor'),
+        (3, 'clara.schulz', 'Viewer')
+    ]
+    users = [(user_id, name, role_to_db(conn, role)) for user_id, name, role in users]
+    conn.executemany('INSERT INTO user (id, username, role) VALUES (?, ?, ?);', users)
+
+    # Insert persons
+    persons = [
+        (1, 'Max', 'Beispiel', 'max.beispiel@example.com', '+4912345678', 1),
+        (2, 'Eva', 'Team', 'eva.team@example.com', '+4912345679', 1),
+        (3, 'Karl', 'Offen', 'karl.offen@example.com', '+4912345680', 2),
+        (4, 'Lisa', 'Privat', 'lisa.privat@example.com', '+4912345681', 2),
+        (5, 'Olaf', 'Gemein', 'olaf.gemein@example.com', '+4912345682', 3)
+    ]
     conn.executemany('''
         INSERT INTO person (id, vorname, nachname, email, telefon, created_by) 
         VALUES (?, ?, ?, ?, ?, ?);
     ''', persons)
 
-    # Insert notes
-    notes = []
-    note_id = 1
-    for person_id in range(1, 6):
-        for i in range(4):
-            # Assign notes to different users: first 2 persons to admin, next 2 to editor, last to viewer
-            created_by = 1 if person_id < 3 else (2 if person_id < 5 else 3)
-            notes.append((note_id, f'Note {note_id} for person {person_id}', created_by, person_id))
-            note_id += 1
-    conn.executemany('''
-        INSERT INTO note (id, content, created_by, person_id) 
-        VALUES (?, ?, ?, ?);
-    ''', notes)
+    # Insert notes
+    notes = []
+    note_id = 1
+    for person_id in range(1, 6):
+        for i in range(4):
+            # Assign notes to different users: first 2 persons to admin, next 2 to editor, last to viewer
+            created_by = 1 if person_id < 3 else (2 if person_id < 5 else 3)
+            notes.append((note_id, f'Note {note_id} for person {person_id}', created_by, person_id))
+            note_id += 1
+    conn.executemany('''
+        INSERT INTO note (id, content, created_by, person_id) 
+        VALUES (?, ?, ?, ?);
+    ''', notes)
+
+    # Assign users to persons (shared access)
+    # Admin (anna) has access to Max and Eva
+    # Editor (bernd) has access to Karl and Lisa
+    # Viewer (clara) has access to Olaf
+    user_person_assignments = [
+        (1, 1), (1, 2),  # anna can access Max and Eva
+        (2, 3), (2, 4),  # bernd can access Karl and Lisa
+        (3, 5)           # clara can access Olaf
+    ]
+    conn.executemany('''
+        INSERT INTO user_person (user_id, person_id) 
+        VALUES (?, ?);
+    ''', user_person_assignments)
+
+    # Assign specific notes to users for testing
+    # Let's assign some notes to multiple users to demonstrate sharing
+    note_assignments = [
+        (1, 2),  # Note 1 shared with bernd (editor)
+        (1, 3),  # Note 1 shared with clara (viewer)
+        (5, 1),  # Note 5 shared with anna (admin)
+        (5, 3),  # Note 5 shared with clara (viewer)
+        (10, 1), # Note 10 shared with anna (admin)
+        (15, 2), # Note 15 shared with bernd (editor)
+        (20, 1)  # Note 20 shared with anna (admin)
+    ]
+    conn.executemany('''
+        INSERT INTO note_assignment (note_id, user_id) 
+        VALUES (?, ?);
+    ''', note_assignments)
+
+
+FILLER_WORDS = (
+    'Termin', 'Anruf', 'Kunde', 'Vertrag', 'Angebot', 'Rechnung', 'Projekt', 'Frist',
+    'besprochen', 'vereinbart', 'offen', 'erledigt', 'dringend', 'Rückfrage', 'Unterlagen',
+    'Adresse', 'geändert', 'per', 'E-Mail', 'Telefon', 'morgen', 'nächste', 'Woche',
+    'bitte', 'prüfen', 'senden', 'Zahlung', 'eingegangen', 'Mahnung', 'Lieferung',
+    'verschoben', 'bestätigt', 'Notiz', 'Gespräch', 'mit', 'und', 'der', 'die', 'das',
+    'wegen', 'noch', 'nicht', 'bereits', 'am', 'um', 'Uhr', 'Betrag', 'EUR', 'Status',
+) + tuple(str(n) for n in range(100))
+
+
+def insert_synthetic_data(conn, users=100, persons=10000, notes_per_person=10,
+                          grants_per_user=20, content_size=0, seed=0,
+                          batch_size=10000, tenant_id=None):
+    """Insert a large, reproducible random data set for tests and benchmarks.
+    
+    The first user is an admin, the remaining users alternate between editor
+    and viewer. Notes get creation timestamps spread over the last two years.
+    IDs continue after the existing rows, so the function can be called once
+    per tenant to fill a multi-tenant database.
+    
+    Args:
+        conn: Database connection with an empty schema.
+        users: Number of users to create.
+        persons: Number of persons to create.
+        notes_per_person: Number of notes per person.
+        grants_per_user: Person and note assignments created per user.
+        content_size: Minimum length of note contents (padded with random
+            words, so they compress roughly like real text).
+        seed: Seed for the random number generator.
+        batch_size: Number of rows per executemany call.
+        tenant_id: Tenant of all inserted rows (requires multi-tenant mode,
+            see enable_tenants).
+    """
+    rng = random.Random(seed)
+    user_base, person_base, note_base = (
+        conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}').fetchone()[0]
+        for table in ('user', 'person', 'note')
+    )
+    # Setting the tenant explicitly skips the triggers that copy it
+    tenant_column = ', tenant_id' if tenant_id is not None else ''
+    tenant_value = (tenant_id,) if tenant_id is not None else ()
+    tenant_param = ', ?' if tenant_id is not None else ''
+    
+    def random_user():
+        return user_base + rng.randint(1, users)
+    
+    roles = [role_to_db(conn, Role.ADMIN)] + [
+        role_to_db(conn, Role.EDITOR if i % 2 else Role.VIEWER) for i in range(1, users)
+    ]
+    conn.executemany(
+        f'INSERT INTO user (id, username, role{tenant_column}) VALUES (?, ?, ?{tenant_param})',
+        [(user_base + i + 1, f'user{user_base + i + 1}', role) + tenant_value
+         for i, role in enumerate(roles)]
+    )
+    conn.executemany(
+        f'INSERT INTO person (id, vorname, nachname, email, telefon, created_by{tenant_column}) '
+        f'VALUES (?, ?, ?, ?, ?, ?{tenant_param})',
+        ((i, f'Vorname{i}', f'Nachname{i % 997}', f'person{i}@example.com',
+          f'+49{i:09d}', random_user()) + tenant_value
+         for i in range(person_base + 1, person_base + persons + 1))
+    )
+    
+    start = datetime(2024, 1, 1)
+    min_size = content_compression_min_size(conn)
+    
+    def generate_notes():
+        note_id = note_base + 1
+        for person_id in range(person_base + 1, person_base + persons + 1):
+            for _ in range(notes_per_person):
+                content = f'Note {note_id} for person {person_id}'
+                while len(content) < content_size:
+                    content += ' ' + ' '.join(rng.choices(FILLER_WORDS, k=16))
+                content = encode_note_content(content[:max(content_size, len(content))], min_size)
+                created_at = start + timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60))
+                yield (note_id, content, created_at.strftime('%Y-%m-%d %H:%M:%S'),
+                       random_user(), person_id) + tenant_value
+                note_id += 1
+    
+    notes = generate_notes()
+    while True:
+        batch = [row for _, row in zip(range(batch_size), notes)]
+        if not batch:
+            break
+        conn.executemany(
+            f'INSERT INTO note (id, content, created_at, created_by, person_id{tenant_column}) '
+            f'VALUES (?, ?, ?, ?, ?{tenant_param})', batch
+        )
+    
+    total_notes = persons * notes_per_person
+    for user_id in range(user_base + 2, user_base + users + 1):
+        conn.executemany(
+            f'INSERT OR IGNORE INTO user_person (user_id, person_id{tenant_column}) '
+            f'VALUES (?, ?{tenant_param})',
+            [(user_id, person_base + rng.randint(1, persons)) + tenant_value
+             for _ in range(grants_per_user // 2)]
+        )
+        if total_notes:
+            conn.executemany(
+                f'INSERT OR IGNORE INTO note_assignment (note_id, user_id{tenant_column}) '
+                f'VALUES (?, ?{tenant_param})',
+                [(note_base + rng.randint(1, total_notes), user_id) + tenant_value
+                 for _ in range(grants_per_user - grants_per_user // 2)]
+            )
+    conn.commit()
+
+
+IMPORT_FIELDS = {
+    'person': ('id', 'vorname', 'nachname', 'email', 'telefon', 'created_by'),
+    'note': ('id', 'content', 'created_at', 'created_by', 'person_id'),
+}
+IMPORT_REQUIRED = {
+    'person': ('vorname', 'nachname', 'email', 'created_by'),
+    'note': ('content', 'created_by', 'person_id'),
+}
+
+
+def _open_text(path, mode='rt'):
+    """Open a text file, transparently (de)compressing *.gz files."""
+    if str(path).endswith('.gz'):
+        # Level 6 compresses nearly as well as the default 9 at a fraction of the CPU
+        return gzip.open(path, mode, compresslevel=6, encoding='utf-8', newline='')
+    return open(path, mode.replace('t', ''), encoding='utf-8', newline='')
+
+
+def read_records(path):
+    """Stream records (dicts) from a CSV or JSONL file, optionally gzipped."""
+    name = str(path)[:-3] if str(path).endswith('.gz') else str(path)
+    with _open_text(path) as f:
+        if name.endswith('.csv'):
+            for record in csv.DictReader(f):
+                # CSV has no NULL; treat empty fields as missing
+                yield {key: (value if value != '' else None) for key, value in record.items()}
+        elif name.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError(f"Unsupported import format: {path}")
+
+
+def _validate_record(table, record, user_ids, person_ids, min_size=None):
+    """Convert a record into an insert tuple, raising ValueError if invalid."""
+    for field in IMPORT_REQUIRED[table]:
+        if record.get(field) in (None, ''):
+            raise ValueError(f"missing field '{field}'")
+    
+    created_by = record['created_by']
+    if created_by not in user_ids:
+        raise ValueError(f"unknown user '{created_by}'")
+    values = dict(record, created_by=user_ids[created_by])
+    
+    if values.get('id') is not None:
+        values['id'] = int(values['id'])
+    if table == 'person':
+        if '@' not in values['email']:
+            raise ValueError(f"invalid email '{values['email']}'")
+    else:
+        values['person_id'] = int(values['person_id'])
+        if values['person_id'] not in person_ids:
+            raise ValueError(f"unknown person {values['person_id']}")
+        if values.get('created_at') is None:
+            values['created_at'] = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        values['content'] = encode_note_content(values['content'], min_size)
+    return tuple(values.get(field) for field in IMPORT_FIELDS[table])
+
+
+def _drop_indexes(conn, table):
+    """Drop the explicit indexes of a table and return their DDL for rebuilding."""
+    indexes = conn.execute(
+        "SELECT name, sql FROM sqlite_master "
+        "WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (table,)
+    ).fetchall()
+    for name, _ in indexes:
+        conn.execute(f'DROP INDEX {name}')
+    return [sql for _, sql in indexes]
+
+
+def import_records(conn, table, records, batch_size=50000, rebuild_indexes=False,
+                   max_errors=100):
+    """Bulk insert validated person or note records.
+    
+    created_by may be a username or a user ID; usernames are resolved through
+    an in-memory map loaded once. Rows are inserted with executemany and
+    committed once per batch (any pending transaction is committed first).
+    Invalid rows are skipped and reported.
+    
+    Args:
+        conn: Database connection.
+        table: 'person' or 'note'.
+        records: Iterable of dicts, e.g. from read_records().
+        batch_size: Number of rows per executemany call and transaction.
+        rebuild_indexes: Drop the table's indexes before loading and
+            recreate them afterwards (faster for large loads).
+        max_errors: Number of error messages to keep in the result.
+    
+    Returns:
+        dict: rows, skipped, errors, seconds and rows_per_sec.
+    """
+    if table not in IMPORT_FIELDS:
+        raise ValueError(f"Cannot import into table '{table}'")
+    
+    user_ids = {}
+    for user_id, username in conn.execute('SELECT id, username FROM user'):
+        user_ids[username] = user_id
+        user_ids[user_id] = user_id
+        user_ids[str(user_id)] = user_id
+    person_ids = set()
+    min_size = None
+    if table == 'note':
+        person_ids = {row[0] for row in conn.execute('SELECT id FROM person')}
+        min_size = content_compression_min_size(conn)
+    
+    columns = IMPORT_FIELDS[table]
+    insert_sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})"
+    )
+    result = {'rows': 0, 'skipped': 0, 'errors': []}
+    start = time.perf_counter()
+    
+    def flush(batch):
+        try:
+            conn.executemany(insert_sql, batch)
+            result['rows'] += len(batch)
+        except sqlite3.IntegrityError:
+            # Constraint violation somewhere in the batch: redo it row by row
+            conn.rollback()
+            for row in batch:
+                try:
+                    conn.execute(insert_sql, row)
+                    result['rows'] += 1
+                except sqlite3.IntegrityError as e:
+                    result['skipped'] += 1
+                    if len(result['errors']) < max_errors:
+                        result['errors'].append(f"row {row}: {e}")
+        conn.commit()
+    
+    conn.commit()
+    index_sql = _drop_indexes(conn, table) if rebuild_indexes else []
+    try:
+        batch = []
+        for line, record in enumerate(records, start=1):
+            try:
+                batch.append(_validate_record(table, record, user_ids, person_ids, min_size))
+            except (ValueError, TypeError) as e:
+                result['skipped'] += 1
+                if len(result['errors']) < max_errors:
+                    result['errors'].append(f"record {line}: {e}")
+                continue
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    finally:
+        for sql in index_sql:
+            conn.execute(sql)
+        conn.commit()
+    
+    result['seconds'] = time.perf_counter() - start
+    result['rows_per_sec'] = result['rows'] / result['seconds'] if result['seconds'] else 0.0
+    return result
+
+
+def import_file(conn, table, path, **kwargs):
+    """Bulk import a CSV or JSONL file (see import_records) and print a summary."""
+    result = import_records(conn, table, read_records(path), **kwargs)
+    print(f"Imported {result['rows']} {table} rows from {path} in {result['seconds']:.2f}s "
+          f"({result['rows_per_sec']:,.0f} rows/sec), skipped {result['skipped']}")
+    for error in result['errors'][:10]:
+        print(f"  {error}")
+    if result['skipped'] > 10:
+        print(f"  ... {result['skipped'] - 10} more")
+    return result
+
+
+EXPORT_COLUMNS = ('user_id',) + VISIBLE_COLUMNS
+
+
+def _export_writer(path, fmt, batches, errors):
+    """Write batches of export rows from a queue until a None sentinel arrives."""
+    try:
+        with _open_text(path, 'wt') as f:
+            if fmt == 'csv':
+                writer = csv.writer(f)
+                writer.writerow(EXPORT_COLUMNS)
+            while True:
+                batch = batches.get()
+                if batch is None:
+                    break
+                if fmt == 'csv':
+                    writer.writerows(batch)
+                else:
+                    f.writelines(
+                        json.dumps(dict(zip(EXPORT_COLUMNS, row))) + '\n' for row in batch
+                    )
+    except Exception as e:  # Reported to the producer thread
+        errors.append(e)
+        while batches.get() is not None:
+            pass  # Drain so the producer never blocks
+
+
+def export_visible_data(conn, user_ids, path, batch_size=10000):
+    """Stream the rows visible to one or many users into a CSV or JSONL file.
+    
+    The format follows the file extension (.csv or .jsonl, plus .gz for gzip
+    compression). Rows are read with fetchmany and handed to a background
+    writer thread through a queue holding at most one batch, so memory use is
+    bounded by a few batches regardless of the database size.
+    
+    Args:
+        conn: Database connection.
+        user_ids: IDs of the users whose visible data is exported.
+        path: Output file path.
+        batch_size: Number of rows per fetchmany batch.
+    
+    Returns:
+        dict: rows, seconds and rows_per_sec.
+    """
+    name = str(path)[:-3] if str(path).endswith('.gz') else str(path)
+    fmt = name.rsplit('.', 1)[-1]
+    if fmt not in ('csv', 'jsonl'):
+        raise ValueError(f"Unsupported export format: {path}")
+    
+    batches = queue.Queue(maxsize=1)
+    errors = []
+    writer = threading.Thread(target=_export_writer, args=(path, fmt, batches, errors),
+                              daemon=True)
+    start = time.perf_counter()
+    writer.start()
+    rows = 0
+    try:
+        for user_id in user_ids:
+            cursor = execute_visible_query(conn, user_id)
+            if cursor is None:
+                continue
+            while not errors:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                batches.put([(user_id,) + tuple(row) for row in batch])
+                rows += len(batch)
+    finally:
+        batches.put(None)
+        writer.join()
+    if errors:
+        raise errors[0]
+    
+    seconds = time.perf_counter() - start
+    return {'rows': rows, 'seconds': seconds,
+            'rows_per_sec': rows / seconds if seconds else 0.0}
+
+
+def _visible_sort_key(row):
+    """Sort key matching ORDER BY p.nachname, p.vorname, n.created_at (NULLs first)."""
+    return (row.nachname, row.vorname, row.created_at is not None, row.created_at or '')
+
+
+class ShardRouter:
+    """Spread persons and their notes across several SQLite files.
+    
+    A person lives on shard person_id % len(paths); its notes and grants
+    live on the same shard, so every visibility join stays shard-local.
+    Users are replicated to every shard. Each thread uses its own
+    connection per shard; reads fan out to all shards in parallel and the
+    ordered per-shard results are merged. The shard of every note written
+    or looked up through the router is remembered, so routing a note
+    only fans out the first time it is seen.
+    """
+
+    def __init__(self, paths, role_storage='text'):
+        self.paths = list(paths)
+        self._local = threading.local()
+        self._id_lock = threading.Lock()
+        self._conns_lock = threading.Lock()
+        self._all_conns = []
+        self._note_shards = {}
+        self._executor = ThreadPoolExecutor(max_workers=len(self.paths))
+        for shard in range(len(self.paths)):
+            conn = self.connection(shard)
+            create_schema(conn, role_storage=role_storage)
+            conn.commit()
+        self._next_person_id = self._max_id('person') + 1
+        self._next_note_id = self._max_id('note') + 1
+
+    def connection(self, shard):
+        """Return the calling thread's connection to a shard."""
+        conns = getattr(self._local, 'conns', None)
+        if conns is None:
+            conns = self._local.conns = {}
+        if shard not in conns:
+            # Only the owning thread uses it; close() may close it from another
+            conns[shard] = get_connection(self.paths[shard], check_same_thread=False)
+            with self._conns_lock:
+                self._all_conns.append(conns[shard])
+        return conns[shard]
+
+    def shard_for_person(self, person_id):
+        return person_id % len(self.paths)
+
+    def shard_for_note(self, note_id):
+        """Find the shard holding a note (notes follow their person)."""
+        shard = self._note_shards.get(note_id)
+        if shard is not None:
+            return shard
+        
+        def holds(shard):
+            return self.connection(shard).execute(
+                'SELECT 1 FROM note WHERE id = ?', (note_id,)
+            ).fetchone() is not None
+        
+        for shard, found in enumerate(self._executor.map(holds, range(len(self.paths)))):
+            if found:
+                self._note_shards[note_id] = shard
+                return shard
+        raise KeyError(f"Note {note_id} not found on any shard")
+
+    def _max_id(self, table):
+        return max(
+            self.connection(shard).execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}').fetchone()[0]
+            for shard in range(len(self.paths))
+        )
+
+    def _allocate_id(self, attribute):
+        with self._id_lock:
+            new_id = getattr(self, attribute)
+            setattr(self, attribute, new_id + 1)
+            return new_id
+
+    def _write(self, shard, sql, params):
+        conn = self.connection(shard)
+        cursor = conn.execute(sql, params)
+        conn.commit()
+        return cursor
+
+    def add_user(self, username, role, user_id=None):
+        """Insert a user into every shard and return its ID.
+        
+        Shards commit one by one, so a failure can leave the user on only
+        some of them. The insert is idempotent: calling add_user again
+        with the same arguments reuses the partly written ID and fills in
+        the missing shards.
+        
+        Raises:
+            sqlite3.IntegrityError: If a shard holds a different user with
+                this ID or username.
+        """
+        with self._id_lock:
+            # Held until the rows exist so a concurrent add_user sees the new maximum
+            if user_id is None:
+                user_id = self._partial_user_id(username) or self._max_id('user') + 1
+            for shard in range(len(self.paths)):
+                conn = self.connection(shard)
+                db_role = role_to_db(conn, role)
+                self._write(shard, 'INSERT OR IGNORE INTO user (id, username, role) VALUES (?, ?, ?)',
+                            (user_id, username, db_role))
+                row = conn.execute('SELECT username, role FROM user WHERE id = ?',
+                                   (user_id,)).fetchone()
+                if row is None or (row['username'], row['role']) != (username, db_role):
+                    raise sqlite3.IntegrityError(
+                        f"User {user_id} ({username}) conflicts with an existing user on shard {shard}"
+                    )
+        return user_id
+
+    def _partial_user_id(self, username):
+        """Return the ID of a user that an earlier add_user left on some shards only."""
+        ids = [
+            row[0]
+            for shard in range(len(self.paths))
+            for row in self.connection(shard).execute(
+                'SELECT id FROM user WHERE username = ?', (username,))
+        ]
+        if ids and len(ids) < len(self.paths):
+            return ids[0]
+        return None
+
+    def add_person(self, vorname, nachname, email, created_by, telefon=None, person_id=None):
+        """Insert a person on its shard and return its ID."""
+        if person_id is None:
+            person_id = self._allocate_id('_next_person_id')
+        else:
+            with self._id_lock:
+                self._next_person_id = max(self._next_person_id, person_id + 1)
+        self._write(
+            self.shard_for_person(person_id),
+            'INSERT INTO person (id, vorname, nachname, email, telefon, created_by) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (person_id, vorname, nachname, email, telefon, created_by)
+        )
+        return person_id
+
+    def add_note(self, person_id, content, created_by, created_at=None, note_id=None):
+        """Insert a note on the shard of its person and return its ID."""
+        if note_id is None:
+            note_id = self._allocate_id('_next_note_id')
+        else:
+            with self._id_lock:
+                self._next_note_id = max(self._next_note_id, note_id + 1)
+        shard = self.shard_for_person(person_id)
+        content = encode_note_content(content, content_compression_min_size(self.connection(shard)))
+        self._write(
+            shard,
+            'INSERT INTO note (id, content, created_at, created_by, person_id) '
+            "VALUES (?, ?, COALESCE(?, datetime('now')), ?, ?)",
+            (note_id, content, created_at, created_by, person_id)
+        )
+        self._note_shards[note_id] = shard
+        return note_id
+
+    def assign_person(self, user_id, person_id):
+        self._write(self.shard_for_person(person_id),
+                    'INSERT OR IGNORE INTO user_person (user_id, person_id) VALUES (?, ?)',
+                    (user_id, person_id))
+
+    def assign_note(self, note_id, user_id):
+        self._write(self.shard_for_note(note_id),
+                    'INSERT OR IGNORE INTO note_assignment (note_id, user_id) VALUES (?, ?)',
+                    (note_id, user_id))
+
+    def fetch_visible_persons_notes(self, user_id):
+        """Run the visibility query on all shards in parallel and merge the results."""
+        def fetch(shard):
+            return fetch_visible_persons_notes(self.connection(shard), user_id)
+        
+        results = list(self._executor.map(fetch, range(len(self.paths))))
+        return list(heapq.merge(*results, key=_visible_sort_key))
+
+    def get_users_with_access(self, entity_type, entity_id):
+        if entity_type == 'person':
+            shard = self.shard_for_person(entity_id)
+        else:
+            shard = self.shard_for_note(entity_id)
+        return get_users_with_access(self.connection(shard), entity_type, entity_id)
+
+    def close(self):
+        """Shut down the worker threads and close every thread's connections."""
+        self._executor.shutdown(wait=True)
+        with self._conns_lock:
+            conns, self._all_conns = self._all_conns, []
+        for conn in conns:
+            conn.close()
+        self._local.conns = {}
+
+
+# Materialized visibility: one row per (user, note) and (user, person) with the
+# number of reasons that make it visible. Triggers on the entity and grant
+# tables adjust the reference counts; triggers on these tables keep the
+# per-user counters in visibility_counts up to date.
+VISIBILITY_COUNTER_DDL = (
+    '''
+    CREATE TABLE IF NOT EXISTS visibility_counts (
+        user_id INTEGER PRIMARY KEY,
+        persons INTEGER NOT NULL DEFAULT 0,
+        notes INTEGER NOT NULL DEFAULT 0,
+        own_notes INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS visible_note (
+        user_id INTEGER NOT NULL,
+        note_id INTEGER NOT NULL,
+        person_id INTEGER NOT NULL,
+        refcount INTEGER NOT NULL,
+        PRIMARY KEY(user_id, note_id)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_visible_note_note ON visible_note(note_id)
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS visible_person (
+        user_id INTEGER NOT NULL,
+        person_id INTEGER NOT NULL,
+        refcount INTEGER NOT NULL,
+        PRIMARY KEY(user_id, person_id)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS visibility_totals (
+        id INTEGER PRIMARY KEY CHECK(id = 1),
+        persons INTEGER NOT NULL,
+        notes INTEGER NOT NULL
+    )
+    ''',
+    # Counters of visible notes/persons change with the materialized rows
+    '''
+    CREATE TRIGGER IF NOT EXISTS vc_visible_note_insert AFTER INSERT ON visible_note
+    BEGIN
+        INSERT INTO visibility_counts (user_id) VALUES (NEW.user_id) ON CONFLICT DO NOTHING;
+        UPDATE visibility_counts SET notes = notes + 1 WHERE user_id = NEW.user_id;
+        INSERT INTO visible_person (user_id, person_id, refcount)
+        VALUES (NEW.user_id, NEW.person_id, 1)
+        ON CONFLICT(user_id, person_id) DO UPDATE SET refcount = refcount + 1;
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS vc_visible_note_delete AFTER DELETE ON visible_note
+    BEGIN
+        UPDATE visibility_counts SET notes = notes - 1 WHERE user_id = OLD.user_id;
+        UPDATE visible_person SET refcount = refcount - 1
+        WHERE user_id = OLD.user_id AND person_id = OLD.person_id;
+        DELETE FROM visible_person
+        WHERE user_id = OLD.user_id AND person_id = OLD.person_id AND refcount <= 0;
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS vc_visible_person_insert AFTER INSERT ON visible_person
+    BEGIN
+        INSERT INTO visibility_counts (user_id) VALUES (NEW.user_id) ON CONFLICT DO NOTHING;
+        UPDATE visibility_counts SET persons = persons + 1 WHERE user_id = NEW.user_id;
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS vc_visible_person_delete AFTER DELETE ON visible_person
+    BEGIN
+        UPDATE visibility_counts SET persons = persons - 1 WHERE user_id = OLD.user_id;
+    END;
+    ''',
+    # Notes: visible to their creator, the person's creator, users assigned to
+    # the person and users assigned to the note
+    '''
+    CREATE TRIGGER IF NOT EXISTS vc_note_insert AFTER INSERT ON note
+    BEGIN
+        INSERT INTO visible_note (user_id, note_id, person_id, refcount)
+        SELECT user_id, NEW.id, NEW.person_id, COUNT(*) FROM (
+            SELECT NEW.created_by AS user_id
+            UNION ALL SELECT created_by FROM person WHERE id = NEW.person_id
+            UNION ALL SELECT user_id FROM user_person WHERE person_id = NEW.person_id
+            UNION ALL SELECT user_id FROM note_assignment WHERE note_id = NEW.id
+        ) GROUP BY user_id;
+        INSERT INTO visibility_counts (user_id) VALUES (NEW.created_by) ON CONFLICT DO NOTHING;
+        UPDATE visibility_counts SET own_notes = own_notes + 1 WHERE user_id = NEW.created_by;
+        UPDATE visibility_totals SET notes = notes + 1;
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS vc_note_delete AFTER DELETE ON note
+    BEGIN
+        DELETE FROM visible_note WHERE note_id = OLD.id;
+        UPDATE visibility_counts SET own_notes = own_notes - 1 WHERE user_id = OLD.created_by;
+        UPDATE visibility_totals SET notes = notes - 1;
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS vc_note_update AFTER UPDATE OF person_id, created_by ON note
+    BEGIN
+        DELETE FROM visible_note WHERE note_id = OLD.id;
+        INSERT INTO visible_note (user_id, note_id, person_id, refcount)
+        SELECT user_id, NEW.id, NEW.person_id, COUNT(*) FROM (
+            SELECT NEW.created_by AS user_id
+            UNION ALL SELECT created_by FROM person WHERE id = NEW.person_id
+            UNION ALL SELECT user_id FROM user_person WHERE person_id = NEW.person_id
+            UNION ALL SELECT user_id FROM note_assignment WHERE note_id = NEW.id
+        ) GROUP BY user_id;
+        UPDATE visibility_counts SET own_notes = own_notes - 1 WHERE user_id = OLD.created_by;
+        INSERT INTO visibility_counts (user_id) VALUES (NEW.created_by) ON CONFLICT DO NOTHING;
+        UPDATE visibility_counts SET own_notes = own_notes + 1 WHERE user_id = NEW.created_by;
+    END;
+    ''',
+    # Persons: visible to their creator and assigned users, plus (via
+    # visible_note) to everyone who can see one of their notes
+    '''
+    CREATE TRIGGER IF NOT EXISTS vc_person_insert AFTER INSERT ON person
+    BEGIN
+        INSERT INTO visible_person (user_id, person_id, refcount)
+        VALUES (NEW.created_by, NEW.id, 1)
+        ON CONFLICT(user_id, person_id) DO UPDATE SET refcount = refcount + 1;
+        UPDATE visibility_totals SET persons = persons + 1;
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS vc_person_delete AFTER DELETE ON person
+    BEGIN
+        DELETE FROM visible_person WHERE person_id = OLD.id;
+        UPDATE visibility_totals SET persons = persons - 1;
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS vc_person_update AFTER UPDATE OF created_by ON person
+    WHEN OLD.created_by IS NOT NEW.created_by
+    BEGIN
+        INSERT INTO visible_person (user_id, person_id, refcount)
+        VALUES (NEW.created_by, NEW.id, 1)
+        ON CONFLICT(user_id, person_id) DO UPDATE SET refcount = refcount + 1;
+        INSERT INTO visible_note (user_id, note_id, person_id, refcount)
+        SELECT NEW.created_by, id, person_id, 1 FROM note WHERE person_id = NEW.id
+        ON CONFLICT(user_id, note_id) DO UPDATE SET refcount = refcount + 1;
+        UPDATE visible_note SET refcount = refcount - 1
+        WHERE user_id = OLD.created_by AND note_id IN (SELECT id FROM note WHERE person_id = OLD.id);
+        DELETE FROM visible_note WHERE user_id = OLD.created_by AND refcount <= 0;
+        UPDATE visible_person SET refcount = refcount - 1
+        WHERE user_id = OLD.created_by AND person_id = OLD.id;
+        DELETE FROM visible_person
+        WHERE user_id = OLD.created_by AND person_id = OLD.id AND refcount <= 0;
+    END;
+    ''',
+    # Grants (rows are inserted and deleted, never updated)
+    '''
+    CREATE TRIGGER IF NOT EXISTS vc_user_person_insert AFTER INSERT ON user_person
+    BEGIN
+        INSERT INTO visible_person (user_id, person_id, refcount)
+        VALUES (NEW.user_id, NEW.person_id, 1)
+        ON CONFLICT(user_id, person_id) DO UPDATE SET refcount = refcount + 1;
+        INSERT INTO visible_note (user_id, note_id, person_id, refcount)
+        SELECT NEW.user_id, id, person_id, 1 FROM note WHERE person_id = NEW.person_id
+        ON CONFLICT(user_id, note_id) DO UPDATE SET refcount = refcount + 1;
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS vc_user_person_delete AFTER DELETE ON user_person
+    BEGIN
+        UPDATE visible_note SET refcount = refcount - 1
+        WHERE user_id = OLD.user_id
+          AND note_id IN (SELECT id FROM note WHERE person_id = OLD.person_id);
+        DELETE FROM visible_note WHERE user_id = OLD.user_id AND refcount <= 0;
+        UPDATE visible_person SET refcount = refcount - 1
+        WHERE user_id = OLD.user_id AND person_id = OLD.person_id;
+        DELETE FROM visible_person
+        WHERE user_id = OLD.user_id AND person_id = OLD.person_id AND refcount <= 0;
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS vc_note_assignment_insert AFTER INSERT ON note_assignment
+    BEGIN
+        INSERT INTO visible_note (user_id, note_id, person_id, refcount)
+        SELECT NEW.user_id, id, person_id, 1 FROM note WHERE id = NEW.note_id
+        ON CONFLICT(user_id, note_id) DO UPDATE SET refcount = refcount + 1;
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS vc_note_assignment_delete AFTER DELETE ON note_assignment
+    BEGIN
+        UPDATE visible_note SET refcount = refcount - 1
+        WHERE user_id = OLD.user_id AND note_id = OLD.note_id;
+        DELETE FROM visible_note
+        WHERE user_id = OLD.user_id AND note_id = OLD.note_id AND refcount <= 0;
+    END;
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS vc_user_delete AFTER DELETE ON user
+    BEGIN
+        DELETE FROM visibility_counts WHERE user_id = OLD.id;
+    END;
+    ''',
+)
+
+
+def create_visibility_counters(conn):
+    """Create the trigger-maintained per-user visibility counters.
+    
+    On first creation the counters are filled from the existing data. After
+    that every insert/delete on the entity and grant tables keeps them
+    current, so count_visible() answers without scanning any data.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'visibility_counts'"
+    ).fetchone()
+    for statement in VISIBILITY_COUNTER_DDL:
+        conn.execute(statement)
+    if not exists:
+        rebuild_visibility_counters(conn)
+
+
+def rebuild_visibility_counters(conn):
+    """Recompute all visibility counters from scratch."""
+    conn.execute('DELETE FROM visible_note')
+    conn.execute('DELETE FROM visible_person')
+    conn.execute('DELETE FROM visibility_counts')
+    # Direct person reasons; the insert triggers maintain the counters
+    conn.execute('''
+        INSERT INTO visible_person (user_id, person_id, refcount)
+        SELECT user_id, person_id, COUNT(*) FROM (
+            SELECT created_by AS user_id, id AS person_id FROM person
+            UNION ALL SELECT user_id, person_id FROM user_person
+        ) GROUP BY user_id, person_id
+    ''')
+    conn.execute('''
+        INSERT INTO visible_note (user_id, note_id, person_id, refcount)
+        SELECT user_id, note_id, person_id, COUNT(*) FROM (
+            SELECT created_by AS user_id, id AS note_id, person_id FROM note
+            UNION ALL
+            SELECT p.created_by, n.id, n.person_id
+            FROM note n JOIN person p ON p.id = n.person_id
+            UNION ALL
+            SELECT up.user_id, n.id, n.person_id
+            FROM note n JOIN user_person up ON up.person_id = n.person_id
+            UNION ALL
+            SELECT na.user_id, n.id, n.person_id
+            FROM note_assignment na JOIN note n ON n.id = na.note_id
+        ) GROUP BY user_id, note_id
+    ''')
+    conn.execute('''
+        INSERT INTO visibility_counts (user_id, own_notes)
+        SELECT created_by, COUNT(*) FROM note WHERE true GROUP BY created_by
+        ON CONFLICT(user_id) DO UPDATE SET own_notes = excluded.own_notes
+    ''')
+    conn.execute('''
+        INSERT OR REPLACE INTO visibility_totals (id, persons, notes)
+        VALUES (1, (SELECT COUNT(*) FROM person), (SELECT COUNT(*) FROM note))
+    ''')
+    conn.commit()
+
 
-    # Assign users to persons (shared access)
-    # Admin (anna) has access to Max and Eva
-    # Editor (bernd) has access to Karl and Lisa
-    # Viewer (clara) has access to Olaf
-    user_person_assignments = [
-        (1, 1), (1, 2),  # anna can access Max and Eva
-        (2, 3), (2, 4),  # bernd can access Karl and Lisa
-        (3, 5)           # clara can access Olaf
-    ]
-    conn.executemany('''
-        INSERT INTO user_person (user_id, person_id) 
-        VALUES (?, ?);
-    ''', user_person_assignments)
+def count_visible(conn, user_id):
+    """Return how many persons and notes a user can see and write.
+    
+    Reads the trigger-maintained counters (see create_visibility_counters),
+    so the cost does not depend on the amount of live data. The counters
+    only cover live notes: with an archive attached, the user's archived
+    notes are counted with indexed queries on the archive.
+    
+    Returns:
+        dict: persons, notes and writable_notes, or None for unknown users.
+    """
+    role = get_user_role(conn, user_id)
+    if role is None:
+        return None
+    archived = _archive_attached(conn)
+    if is_admin(role) and has_tenants(conn):
+        # Admins see their own tenant: count its range of the tenant indexes
+        persons, notes = conn.execute(f'''
+            SELECT (SELECT COUNT(*) FROM person WHERE tenant_id = :tenant_id),
+                   (SELECT COUNT(*) FROM note WHERE tenant_id = :tenant_id)
+                   {"""+ (SELECT COUNT(*) FROM archive.note
+                      WHERE person_id IN (SELECT id FROM person WHERE tenant_id = :tenant_id))"""
+                    if archived else ''}
+        ''', {'tenant_id': get_user_tenant(conn, user_id)}).fetchone()
+        return {'persons': persons, 'notes': notes, 'writable_notes': notes}
+    if is_admin(role):
+        row = conn.execute('SELECT persons, notes FROM visibility_totals WHERE id = 1').fetchone()
+        persons, notes = row if row else (0, 0)
+        if archived:
+            notes += conn.execute('SELECT COUNT(*) FROM archive.note').fetchone()[0]
+        return {'persons': persons, 'notes': notes, 'writable_notes': notes}
+    
+    row = conn.execute(
+        'SELECT persons, notes, own_notes FROM visibility_counts WHERE user_id = ?', (user_id,)
+    ).fetchone()
+    persons, notes, own_notes = row if row else (0, 0, 0)
+    if archived:
+        archived_persons, archived_notes, archived_own = conn.execute(
+            ARCHIVED_VISIBLE_COUNTS_QUERY, {'user_id': user_id}
+        ).fetchone()
+        notes += archived_notes
+        own_notes += archived_own
+        if archived_persons:
+            persons = archived_persons
+    # Editors may write every note they see, viewers only their own
+    writable = notes if role == Role.EDITOR else own_notes
+    return {'persons': persons, 'notes': notes, 'writable_notes': writable}
 
-    # Assign specific notes to users for testing
-    # Let's assign some notes to multiple users to demonstrate sharing
-    note_assignments = [
-        (1, 2),  # Note 1 shared with bernd (editor)
-        (1, 3),  # Note 1 shared with clara (viewer)
-        (5, 1),  # Note 5 shared with anna (admin)
-        (5, 3),  # Note 5 shared with clara (viewer)
-        (10, 1), # Note 10 shared with anna (admin)
-        (15, 2), # Note 15 shared with bernd (editor)
-        (20, 1)  # Note 20 shared with anna (admin)
+
+# Archived notes a non-admin user can see (same rules as the counter triggers).
+# persons is the size of the union with the live visible_person rows, or 0
+# if no archived note is visible.
+ARCHIVED_VISIBLE_COUNTS_QUERY = '''
+WITH granted(person_id) AS (
+    SELECT id FROM person WHERE created_by = :user_id
+    UNION
+    SELECT person_id FROM user_person WHERE user_id = :user_id
+),
+visible(id, person_id, created_by) AS (
+    SELECT id, person_id, created_by FROM archive.note WHERE created_by = :user_id
+    UNION
+    SELECT id, person_id, created_by FROM archive.note
+    WHERE person_id IN (SELECT person_id FROM granted)
+    UNION
+    SELECT n.id, n.person_id, n.created_by
+    FROM archive.note_assignment na JOIN archive.note n ON n.id = na.note_id
+    WHERE na.user_id = :user_id
+)
+SELECT CASE WHEN EXISTS (SELECT 1 FROM visible) THEN (
+           SELECT COUNT(*) FROM (
+               SELECT person_id FROM visible
+               UNION
+               SELECT person_id FROM visible_person WHERE user_id = :user_id
+           )
+       ) ELSE 0 END,
+       (SELECT COUNT(*) FROM visible),
+       (SELECT COUNT(*) FROM visible WHERE created_by = :user_id)
+'''
+
+
+def verify_visibility_counts(conn, user_ids=None):
+    """Compare count_visible() against the full visibility query.
+    
+    Returns:
+        list: (user_id, expected, actual) for every user whose counters differ.
+    """
+    if user_ids is None:
+        user_ids = [row[0] for row in conn.execute('SELECT id FROM user')]
+    mismatches = []
+    for user_id in user_ids:
+        expected = count_visible_by_query(conn, user_id)
+        actual = count_visible(conn, user_id)
+        if actual != expected:
+            mismatches.append((user_id, expected, actual))
+    return mismatches
+
+
+def count_visible_by_query(conn, user_id):
+    """Return the same counts as count_visible() from the full visibility query.
+    
+    Works without the counters installed, at the cost of reading every
+    visible row.
+    """
+    role = get_user_role(conn, user_id)
+    username = conn.execute('SELECT username FROM user WHERE id = ?', (user_id,)).fetchone()[0]
+    rows = fetch_visible_persons_notes(conn, user_id)
+    notes = {row.note_id: row.created_by_username for row in rows if row.note_id is not None}
+    writable = [
+        note_id for note_id, creator in notes.items()
+        if role != Role.VIEWER or creator == username
     ]
-    conn.executemany('''
-        INSERT INTO note_assignment (note_id, user_id) 
-        VALUES (?, ?);
-    ''', note_assignments)
+    return {
+        'persons': len({row.person_id for row in rows}),
+        'notes': len(notes),
+        'writable_notes': len(writable),
+    }
 
 
 # Global state to track changes between use cases
@@ -242,10 +3294,30 @@ state_tracking = {
     'current_usecase': 0
 }
 
-def get_users_with_access(conn, entity_type, entity_id):
-    """Get a list of usernames who have access to a specific person or note."""
+def get_users_with_access(conn, entity_type, entity_id, tenant_id=None):
+    """Get a list of usernames who have access to a specific person or note.
+    
+    In multi-tenant mode only admins of the entity's tenant are listed. If
+    tenant_id is given, entities of other tenants have no users.
+    """
     cursor = conn.cursor()
     users = []
+    admin_tenant = None
+    note_table, assignment_table = _note_sources(conn, None)
+    if has_tenants(conn):
+        if entity_type in ('person', 'note'):
+            # A note belongs to its person's tenant (archived notes have no tenant_id)
+            row = cursor.execute(
+                'SELECT tenant_id FROM person WHERE id = ?' if entity_type == 'person' else
+                f'SELECT p.tenant_id FROM {note_table} n JOIN person p ON p.id = n.person_id '
+                'WHERE n.id = ?',
+                (entity_id,)
+            ).fetchone()
+            if row is not None and tenant_id is not None and row[0] != tenant_id:
+                return []
+            admin_tenant = row[0] if row is not None else tenant_id
+    elif tenant_id is not None:
+        raise ValueError("Multi-tenant mode is not enabled (see enable_tenants)")
     
     if entity_type == 'person':
         # Users who created the person
@@ -273,15 +3345,14 @@ def get_users_with_access(conn, entity_type, entity_id):
         users.extend([row['username'] for row in cursor.fetchall()])
         
         # Admin users always have access
-        cursor.execute("SELECT username FROM user WHERE role = 'Admin'")
-        users.extend([row['username'] for row in cursor.fetchall()])
+        users.extend(get_admin_usernames(conn, admin_tenant))
         
     elif entity_type == 'note':
         # Users who created the note
         cursor.execute(
-            '''
+            f'''
             SELECT DISTINCT u.username
-            FROM note n
+            FROM {note_table} n
             JOIN user u ON n.created_by = u.id
             WHERE n.id = ?
             ''',
@@ -291,9 +3362,9 @@ def get_users_with_access(conn, entity_type, entity_id):
         
         # Users assigned to the note
         cursor.execute(
-            '''
+            f'''
             SELECT DISTINCT u.username
-            FROM note_assignment na
+            FROM {assignment_table} na
             JOIN user u ON na.user_id = u.id
             WHERE na.note_id = ?
             ''',
@@ -303,9 +3374,9 @@ def get_users_with_access(conn, entity_type, entity_id):
         
         # Users assigned to the person of this note
         cursor.execute(
-            '''
+            f'''
             SELECT DISTINCT u.username
-            FROM note n
+            FROM {note_table} n
             JOIN user_person up ON n.person_id = up.person_id
             JOIN user u ON up.user_id = u.id
             WHERE n.id = ?
@@ -315,8 +3386,7 @@ def get_users_with_access(conn, entity_type, entity_id):
         users.extend([row['username'] for row in cursor.fetchall()])
         
         # Admin users always have access
-        cursor.execute("SELECT username FROM user WHERE role = 'Admin'")
-        users.extend([row['username'] for row in cursor.fetchall()])
+        users.extend(get_admin_usernames(conn, admin_tenant))
     
     # Remove duplicates and sort
     return sorted(set(users))
@@ -376,125 +3446,849 @@ def detect_changes(entity_type, entity_id, current_data):
                 'users': current_users
             }
     
-    return changes
+    return changes
+
+def format_multiline_cell(value, max_width=20):
+    """Format a cell value to be displayed on multiple lines if needed."""
+    if isinstance(value, list):
+        # For lists (like users with access), put each item on a new line
+        return '\n'.join(value)
+    elif isinstance(value, str):
+        # For long strings, wrap text
+        if len(value) > max_width:
+            return '\n'.join(textwrap.wrap(value, width=max_width))
+    return value
+
+def format_table_data(data, column_widths):
+    """Format table data with appropriate column widths and multiline cells."""
+    formatted_data = []
+    for row in data:
+        formatted_row = {}
+        for key, value in row.items():
+            if key in column_widths:
+                formatted_row[key] = format_multiline_cell(value, column_widths[key])
+            else:
+                formatted_row[key] = value
+        formatted_data.append(formatted_row)
+    return formatted_data
+
+def calculate_column_widths(data, max_total_width=MAX_TABLE_WIDTH):
+    """Calculate optimal column widths based on content and max total width."""
+    # Get all column names
+    columns = set()
+    for row in data:
+        columns.update(row.keys())
+    columns = list(columns)
+    
+    # Calculate initial widths based on column names and content
+    widths = {col: len(col) for col in columns}
+    for row in data:
+        for col, val in row.items():
+            if isinstance(val, str):
+                widths[col] = max(widths[col], min(len(val), 40))  # Cap at 40 chars
+    
+    # Adjust widths to fit within max_total_width
+    total_width = sum(widths.values()) + (3 * len(columns))  # Add spacing between columns
+    if total_width > max_total_width:
+        # Scale down proportionally
+        scale_factor = max_total_width / total_width
+        for col in widths:
+            # Ensure minimum width of 5 for each column
+            widths[col] = max(5, int(widths[col] * scale_factor))
+    
+    return widths
+
+# Connection-local log of the entities changed through this connection (see
+# RenderCache). A ('user', NULL) entry invalidates every access list.
+RENDER_CHANGES_DDL = (
+    'CREATE TEMP TABLE IF NOT EXISTS render_changes (entity_type TEXT NOT NULL, entity_id INTEGER)',
+    '''
+    CREATE TEMP TRIGGER IF NOT EXISTS render_note_update AFTER UPDATE ON main.note BEGIN
+        INSERT INTO render_changes VALUES ('note', NEW.id);
+    END
+    ''',
+    # Inserts and deletes too: a new note may reuse a deleted note's ID
+    '''
+    CREATE TEMP TRIGGER IF NOT EXISTS render_note_insert AFTER INSERT ON main.note BEGIN
+        INSERT INTO render_changes VALUES ('note', NEW.id);
+    END
+    ''',
+    '''
+    CREATE TEMP TRIGGER IF NOT EXISTS render_note_delete AFTER DELETE ON main.note BEGIN
+        INSERT INTO render_changes VALUES ('note', OLD.id);
+    END
+    ''',
+    '''
+    CREATE TEMP TRIGGER IF NOT EXISTS render_person_update AFTER UPDATE ON main.person BEGIN
+        INSERT INTO render_changes VALUES ('person', NEW.id);
+    END
+    ''',
+    '''
+    CREATE TEMP TRIGGER IF NOT EXISTS render_user_person_insert
+    AFTER INSERT ON main.user_person BEGIN
+        INSERT INTO render_changes VALUES ('person', NEW.person_id);
+    END
+    ''',
+    '''
+    CREATE TEMP TRIGGER IF NOT EXISTS render_user_person_delete
+    AFTER DELETE ON main.user_person BEGIN
+        INSERT INTO render_changes VALUES ('person', OLD.person_id);
+    END
+    ''',
+    '''
+    CREATE TEMP TRIGGER IF NOT EXISTS render_note_assignment_insert
+    AFTER INSERT ON main.note_assignment BEGIN
+        INSERT INTO render_changes VALUES ('note', NEW.note_id);
+    END
+    ''',
+    '''
+    CREATE TEMP TRIGGER IF NOT EXISTS render_note_assignment_delete
+    AFTER DELETE ON main.note_assignment BEGIN
+        INSERT INTO render_changes VALUES ('note', OLD.note_id);
+    END
+    ''',
+    '''
+    CREATE TEMP TRIGGER IF NOT EXISTS render_user_insert AFTER INSERT ON main.user BEGIN
+        INSERT INTO render_changes VALUES ('user', NULL);
+    END
+    ''',
+    '''
+    CREATE TEMP TRIGGER IF NOT EXISTS render_user_update AFTER UPDATE ON main.user BEGIN
+        INSERT INTO render_changes VALUES ('user', NULL);
+    END
+    ''',
+    '''
+    CREATE TEMP TRIGGER IF NOT EXISTS render_user_delete AFTER DELETE ON main.user BEGIN
+        INSERT INTO render_changes VALUES ('user', NULL);
+    END
+    ''',
+)
+
+
+class RenderCache:
+    """Access lists and rendered table rows reused between print_user_tables calls.
+    
+    Between use cases only a few rows change. Access lists are kept until
+    their entity is in the changed-entity set: temporary triggers record
+    the persons and notes changed through this connection, and a commit by
+    any other connection (PRAGMA data_version) invalidates all of them.
+    Formatted and padded rows are keyed by their content, access list and
+    column widths, so unchanged rows are never wrapped or padded again.
+    
+    Args:
+        max_rows: Number of formatted rows kept (least recently used first out).
+    """
+    
+    def __init__(self, max_rows=100000):
+        self.max_rows = max_rows
+        self.access = {}  # (entity_type, entity_id) -> usernames
+        self.person_notes = {}  # person_id -> note IDs with cached access lists
+        self.rows = OrderedDict()  # row key -> cell lines or rendered lines
+        self.data_version = None
+        self.hits = 0
+        self.misses = 0
+    
+    def refresh(self, conn):
+        """Drop the access lists of persons and notes changed since the last call."""
+        for statement in RENDER_CHANGES_DDL:
+            conn.execute(statement)
+        data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+        changes = {tuple(row) for row in conn.execute(
+            'SELECT DISTINCT entity_type, entity_id FROM render_changes')}
+        if changes:
+            in_transaction = conn.in_transaction
+            conn.execute('DELETE FROM render_changes')
+            if not in_transaction:
+                conn.commit()  # Do not leave a read transaction open
+        if data_version != self.data_version or ('user', None) in changes:
+            self.access.clear()
+            self.person_notes.clear()
+        else:
+            for entity_type, entity_id in changes:
+                self.access.pop((entity_type, entity_id), None)
+                if entity_type == 'person':
+                    # Person grants are part of the access lists of its notes
+                    for note_id in self.person_notes.pop(entity_id, ()):
+                        self.access.pop(('note', note_id), None)
+        self.data_version = data_version
+    
+    def users_with_access(self, conn, entity_type, entity_id, person_id=None):
+        """Return get_users_with_access(), cached until the entity changes.
+        
+        person_id is the person of a note.
+        """
+        key = (entity_type, entity_id)
+        users = self.access.get(key)
+        if users is None:
+            users = self.access[key] = get_users_with_access(conn, entity_type, entity_id)
+            if entity_type == 'note':
+                self.person_notes.setdefault(person_id, set()).add(entity_id)
+        return users
+    
+    def lookup(self, key, build):
+        """Return the cached value for key, calling build() on a miss."""
+        value = self.rows.get(key)
+        if value is not None:
+            self.rows.move_to_end(key)
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = self.rows[key] = build()
+        if len(self.rows) > self.max_rows:
+            self.rows.popitem(last=False)
+        return value
+
+
+def _cell_lines(value):
+    # Like tabulate: no text for None, surrounding whitespace stripped
+    text = '' if value is None else str(value).strip()
+    return text.split('\n')
+
+
+def render_table(rows, column_widths, cache=None):
+    """Render row dicts as a table in tabulate's "grid" format.
+    
+    Every row is wrapped (see format_multiline_cell) and padded on its own,
+    so with a RenderCache only new or changed rows cost more than a lookup.
+    Integer columns are right-aligned, all others left-aligned.
+    """
+    if not rows:
+        return ''
+    cache = cache if cache is not None else RenderCache()
+    columns = tuple(dict.fromkeys(key for row in rows for key in row))
+    widths_key = tuple(column_widths.get(column) for column in columns)
+    
+    def formatted(row):
+        values = [row.get(column) for column in columns]
+        key = (columns, widths_key, *[
+            tuple(value) if value.__class__ is list else value for value in values
+        ])
+        
+        def build():
+            cells = format_table_data([row], column_widths)[0]
+            lines = [_cell_lines(cells.get(column)) for column in columns]
+            return lines, [max(len(line) for line in cell) for cell in lines]
+        return key, cache.lookup(('cells',) + key, build)
+    
+    formatted_rows = [formatted(row) for row in rows]
+    numeric = [
+        all(isinstance(row.get(column), int) for row in rows if row.get(column) is not None)
+        and any(row.get(column) is not None for row in rows)
+        for column in columns
+    ]
+    display = [
+        max([len(column) + 2] + [line_widths[i] for _, (_, line_widths) in formatted_rows])
+        for i, column in enumerate(columns)
+    ]
+    layout = (tuple(display), tuple(numeric))
+    
+    def pad(lines):
+        height = max(len(cell) for cell in lines)
+        return '\n'.join(
+            '|' + '|'.join(
+                ' ' + (str.rjust if right else str.ljust)(
+                    cell[i] if i < len(cell) else '', width) + ' '
+                for cell, width, right in zip(lines, display, numeric)
+            ) + '|'
+            for i in range(height)
+        )
+    
+    separator = '+' + '+'.join('-' * (width + 2) for width in display) + '+'
+    parts = [
+        separator,
+        pad([[column] for column in columns]),
+        separator.replace('-', '='),
+    ]
+    for key, (lines, _) in formatted_rows:
+        parts.append(cache.lookup(('row', layout) + key, lambda: pad(lines)))
+        parts.append(separator)
+    return '\n'.join(parts)
+
+
+def print_user_tables(conn, user_id, username):
+    """Print well-formatted tables of persons and notes visible to a user.
+    
+    Access lists and rendered rows come from the connection's RenderCache
+    for persons and notes that did not change since an earlier call.
+    """
+    if hasattr(conn, 'render_cache'):
+        if conn.render_cache is None:
+            conn.render_cache = RenderCache()
+        cache = conn.render_cache
+        cache.refresh(conn)
+    else:
+        cache = RenderCache()  # Nothing to keep it on for plain connections
+    visible_persons = fetch_visible_persons_with_notes(conn, user_id)
+    
+    persons = {}
+    notes = []
+    for person in visible_persons:
+        person_id = person['person_id']
+        name = f"{person['vorname']} {person['nachname']}"
+        users_with_access = cache.users_with_access(conn, 'person', person_id)
+        person_data = {
+            'ID': person_id,
+            'Name': name,
+            'Email': person['email'],
+            'Visible For': users_with_access  # Keep as list for multiline formatting
+        }
+        
+        # Add changes column
+        if state_tracking['current_usecase'] > 0:  # Skip for initial state
+            person_data['Changes'] = detect_changes('person', person_id, {
+                'Visible For': users_with_access
+            })
+        
+        persons[person_id] = person_data
+        
+        for note in person['notes']:
+            note_id = note['note_id']
+            users_with_access = cache.users_with_access(conn, 'note', note_id, person_id)
+            note_data = {
+                'ID': note_id,
+                'Person': name,
+                'Content': note['content'],
+                'Created By': note['created_by_username'],
+                'Visible For': users_with_access  # Keep as list for multiline formatting
+            }
+            
+            # Add changes column
+            if state_tracking['current_usecase'] > 0:  # Skip for initial state
+                note_data['Changes'] = detect_changes('note', note_id, {
+                    'Content': note['content'],
+                    'Visible For': users_with_access
+                })
+            
+            notes.append(note_data)
+    
+    # Format and print persons table
+    persons_list = list(persons.values())
+    person_column_widths = calculate_column_widths(persons_list)
+    
+    print(f"\n{username}'s Visible Persons:")
+    print(render_table(persons_list, person_column_widths, cache))
+    
+    # Format and print notes table
+    note_column_widths = calculate_column_widths(notes)
+    
+    print(f"\n{username}'s Visible Notes:")
+    print(render_table(notes, note_column_widths, cache))
+
+
+def get_user_id_by_username(conn, username):
+    """Return the ID of the user with the given username, or None."""
+    cursor = conn.cursor()
+    cursor.execute('SELECT id FROM user WHERE username = ?', (username,))
+    row = cursor.fetchone()
+    return row['id'] if row else None
+
+
+def _resolve_user_arg(conn, user):
+    """Resolve a CLI user argument (ID or username) to a user ID, or None if unknown."""
+    if not user.isdigit():
+        return get_user_id_by_username(conn, user)
+    row = conn.execute('SELECT id FROM user WHERE id = ?', (int(user),)).fetchone()
+    return row['id'] if row else None
+
+
+def get_user_role(conn, user_id):
+    """Return the Role of a user, or None if the user does not exist."""
+    row = conn.execute('SELECT role FROM user WHERE id = ?', (user_id,)).fetchone()
+    return Role.from_db(row[0]) if row else None
+
+
+def find_person_id(conn, vorname, nachname):
+    """Return the ID of the person with the given name, or None."""
+    row = conn.execute(
+        'SELECT id FROM person WHERE vorname = ? AND nachname = ?',
+        (vorname, nachname)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def user_can_read(conn, user_id, entity_type, entity_id):
+    """Check whether a user can read a person or note (see can_read).
+    
+    In multi-tenant mode entities of other tenants are never readable.
+    """
+    role = get_user_role(conn, user_id)
+    if role is None:
+        return False
+    note_table, assignment_table = _note_sources(conn, None)
+    if has_tenants(conn):
+        row = conn.execute(
+            'SELECT tenant_id FROM person WHERE id = ?' if entity_type == 'person' else
+            f'SELECT p.tenant_id FROM {note_table} n JOIN person p ON p.id = n.person_id '
+            'WHERE n.id = ?',
+            (entity_id,)
+        ).fetchone()
+        if row is None or row[0] != get_user_tenant(conn, user_id):
+            return False
+    if entity_type == 'person':
+        row = conn.execute('''
+            SELECT p.created_by,
+                   EXISTS (SELECT 1 FROM user_person WHERE person_id = p.id AND user_id = ?)
+            FROM person p WHERE p.id = ?
+        ''', (user_id, entity_id)).fetchone()
+    else:
+        row = conn.execute(f'''
+            SELECT n.created_by,
+                   EXISTS (SELECT 1 FROM {assignment_table} WHERE note_id = n.id AND user_id = ?)
+                   OR EXISTS (SELECT 1 FROM user_person WHERE person_id = n.person_id AND user_id = ?)
+                   OR p.created_by = ?
+            FROM {note_table} n JOIN person p ON p.id = n.person_id WHERE n.id = ?
+        ''', (user_id, user_id, user_id, entity_id)).fetchone()
+    if row is None:
+        return False
+    return can_read(role, row[0], user_id, bool(row[1]))
+
+
+def user_can_write_note(conn, user_id, note_id):
+    """Check whether a user can read and modify a note (see can_write)."""
+    if not user_can_read(conn, user_id, 'note', note_id):
+        return False
+    row = conn.execute('SELECT created_by FROM main.note WHERE id = ?', (note_id,)).fetchone()
+    if row is None:
+        return False  # Archived notes are read-only
+    return can_write(get_user_role(conn, user_id), row[0], user_id)
+
+
+# Every NOTE_SNAPSHOT_INTERVAL-th revision stores the full text, so rebuilding
+# any revision applies at most NOTE_SNAPSHOT_INTERVAL - 1 deltas
+NOTE_SNAPSHOT_INTERVAL = 8
+
+_DELTA_TOKENS = re.compile(r'\s+|\S+')
+
+
+def _content_checksum(text):
+    return zlib.crc32(text.encode('utf-8'))
+
+
+def make_delta(old, new):
+    """Encode new as a word-level delta against old (JSON list of operations).
+    
+    Operations are [n] to copy n characters of old, [-n] to skip n
+    characters of old, and "text" to insert text.
+    """
+    old_tokens = _DELTA_TOKENS.findall(old)
+    new_tokens = _DELTA_TOKENS.findall(new)
+    # Edits are usually local: only diff what lies between the common
+    # prefix and suffix, which keeps SequenceMatcher's work small
+    prefix = 0
+    limit = min(len(old_tokens), len(new_tokens))
+    while prefix < limit and old_tokens[prefix] == new_tokens[prefix]:
+        prefix += 1
+    suffix = 0
+    while (suffix < limit - prefix
+           and old_tokens[-1 - suffix] == new_tokens[-1 - suffix]):
+        suffix += 1
+    old_middle = old_tokens[prefix:len(old_tokens) - suffix]
+    new_middle = new_tokens[prefix:len(new_tokens) - suffix]
+    
+    ops = [[len(''.join(old_tokens[:prefix]))]] if prefix else []
+    matcher = difflib.SequenceMatcher(None, old_middle, new_middle)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        old_length = sum(len(token) for token in old_middle[i1:i2])
+        if tag == 'equal':
+            ops.append([old_length])
+            continue
+        if old_length:
+            ops.append([-old_length])
+        if j2 > j1:
+            ops.append(''.join(new_middle[j1:j2]))
+    if suffix:
+        ops.append([len(''.join(old_tokens[len(old_tokens) - suffix:]))])
+    return json.dumps(ops, ensure_ascii=False, separators=(',', ':'))
+
+
+def apply_delta(old, delta):
+    """Rebuild the text that make_delta(old, new) was computed for."""
+    parts = []
+    position = 0
+    for op in json.loads(delta):
+        if isinstance(op, str):
+            parts.append(op)
+        elif op[0] >= 0:
+            parts.append(old[position:position + op[0]])
+            position += op[0]
+        else:
+            position -= op[0]
+    return ''.join(parts)
+
+
+def _record_revision(conn, note_id, old_content, new_content, edited_by):
+    """Append new_content to the revision history of a note.
+    
+    Must run in the write transaction of the note update (see
+    update_note_content), so no other writer can take the same revision
+    number between the read and the insert.
+    """
+    latest = conn.execute('''
+        SELECT revision, checksum,
+               (SELECT MAX(revision) FROM note_revision
+                WHERE note_id = :note_id AND kind = 'full') AS last_full
+        FROM note_revision WHERE note_id = :note_id
+        ORDER BY revision DESC LIMIT 1
+    ''', {'note_id': note_id}).fetchone()
+    min_size = content_compression_min_size(conn)
+    
+    def insert(revision, kind, data, text, created_at=None, user_id=None):
+        if kind == 'full':
+            data = encode_note_content(data, min_size)
+        conn.execute('''
+            INSERT INTO note_revision
+                (note_id, revision, kind, data, checksum, created_at, edited_by)
+            VALUES (?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?)
+        ''', (note_id, revision, kind, data, _content_checksum(text), created_at, user_id))
+    
+    if latest is None:
+        # First edit: the original content becomes revision 1
+        created_at, created_by = conn.execute(
+            'SELECT created_at, created_by FROM note WHERE id = ?', (note_id,)
+        ).fetchone()
+        insert(1, 'full', old_content, old_content, created_at, created_by)
+        revision, last_full = 1, 1
+    elif latest['checksum'] != _content_checksum(old_content):
+        # The note was changed without going through update_note_content
+        revision = last_full = latest['revision'] + 1
+        insert(revision, 'full', old_content, old_content)
+    else:
+        revision, last_full = latest['revision'], latest['last_full']
+    
+    revision += 1
+    delta = make_delta(old_content, new_content)
+    if revision - last_full >= NOTE_SNAPSHOT_INTERVAL or len(delta) >= len(new_content):
+        insert(revision, 'full', new_content, new_content, user_id=edited_by)
+    else:
+        insert(revision, 'delta', delta, new_content, user_id=edited_by)
+
+
+class VersionConflictError(Exception):
+    """Raised when a row was changed since the version an update is based on."""
+
+    def __init__(self, entity_type, entity_id, expected, actual):
+        if actual is None:
+            message = f"{entity_type} {entity_id} no longer exists"
+        else:
+            message = f"{entity_type} {entity_id} is at version {actual}, expected {expected}"
+        super().__init__(message)
+        self.entity_type = entity_type
+        self.entity_id = entity_id
+        self.expected = expected
+        self.actual = actual
+
+
+def _raise_conflict(conn, table, entity_id, expected):
+    row = conn.execute(f'SELECT version FROM {table} WHERE id = ?', (entity_id,)).fetchone()
+    raise VersionConflictError(table, entity_id, expected, row[0] if row else None)
+
+
+def get_note(conn, note_id):
+    """Return a note with its current version, for a later compare-and-swap update.
+    
+    Returns:
+        dict: id, content, created_at, created_by, person_id and version, or
+        None if the note does not exist.
+    """
+    row = conn.execute('''
+        SELECT id, note_text(content) AS content, created_at, created_by, person_id, version
+        FROM note WHERE id = ?
+    ''', (note_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def update_note_content(conn, note_id, content, edited_by=None, expected_version=None):
+    """Replace the content of a note (UC-2). The caller commits.
+    
+    The previous and new contents are recorded in note_revision (see
+    get_note_revision); the note row itself keeps only the current text.
+    Every update increments the version of the note. With expected_version
+    the update is a compare-and-swap: it only succeeds if the note is still
+    at that version (see get_note); the caller should roll back on conflict.
+    
+    Returns:
+        int: The new version, or None if the note does not exist.
+    
+    Raises:
+        VersionConflictError: The note is no longer at expected_version.
+    """
+    if not conn.in_transaction:
+        # Take the write lock before reading, so the version check and the
+        # next revision number cannot be raced by another connection
+        conn.execute('BEGIN IMMEDIATE')
+    row = conn.execute(
+        'SELECT note_text(content), version FROM note WHERE id = ?', (note_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    old_content, version = row
+    if expected_version is not None and version != expected_version:
+        raise VersionConflictError('note', note_id, expected_version, version)
+    stored = encode_note_content(content, content_compression_min_size(conn))
+    # Conditional on the version read above, so a concurrent update between
+    # the read and the write is detected instead of overwritten
+    cursor = conn.execute(
+        'UPDATE note SET content = ?, version = version + 1 WHERE id = ? AND version = ?',
+        (stored, note_id, version)
+    )
+    if cursor.rowcount == 0:
+        _raise_conflict(conn, 'note', note_id, version)
+    if old_content != content:
+        _record_revision(conn, note_id, old_content, content, edited_by)
+    return version + 1
+
+
+PERSON_FIELDS = ('vorname', 'nachname', 'email', 'telefon')
+
+
+def get_person(conn, person_id):
+    """Return a person with its current version, or None if it does not exist."""
+    row = conn.execute('''
+        SELECT id, vorname, nachname, email, telefon, created_by, version
+        FROM person WHERE id = ?
+    ''', (person_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def update_person(conn, person_id, changes, expected_version=None):
+    """Change fields of a person. The caller commits.
+    
+    Args:
+        changes: Dict of new values for fields in PERSON_FIELDS.
+        expected_version: If given, only update the person if it is still at
+            this version (compare-and-swap, see get_person).
+    
+    Returns:
+        int: The new version, or None if the person does not exist.
+    
+    Raises:
+        VersionConflictError: The person is no longer at expected_version.
+    """
+    unknown = set(changes) - set(PERSON_FIELDS)
+    if unknown:
+        raise ValueError(f"Cannot update person fields: {', '.join(sorted(unknown))}")
+    assignments = ''.join(f'{field} = :{field}, ' for field in changes)
+    query = f'UPDATE person SET {assignments}version = version + 1 WHERE id = :id'
+    if expected_version is not None:
+        query += ' AND version = :expected'
+    cursor = conn.execute(query, dict(changes, id=person_id, expected=expected_version))
+    if cursor.rowcount == 0:
+        if expected_version is None:
+            return None
+        _raise_conflict(conn, 'person', person_id, expected_version)
+    if expected_version is not None:
+        return expected_version + 1
+    return conn.execute('SELECT version FROM person WHERE id = ?', (person_id,)).fetchone()[0]
 
-def format_multiline_cell(value, max_width=20):
-    """Format a cell value to be displayed on multiple lines if needed."""
-    if isinstance(value, list):
-        # For lists (like users with access), put each item on a new line
-        return '\n'.join(value)
-    elif isinstance(value, str):
-        # For long strings, wrap text
-        if len(value) > max_width:
-            return '\n'.join(textwrap.wrap(value, width=max_width))
-    return value
 
-def format_table_data(data, column_widths):
-    """Format table data with appropriate column widths and multiline cells."""
-    formatted_data = []
-    for row in data:
-        formatted_row = {}
-        for key, value in row.items():
-            if key in column_widths:
-                formatted_row[key] = format_multiline_cell(value, column_widths[key])
-            else:
-                formatted_row[key] = value
-        formatted_data.append(formatted_row)
-    return formatted_data
+def _revision_source(conn):
+    # Archived notes keep their history in the archive (see archive_notes)
+    return 'note_revision_all' if _archive_attached(conn) else 'note_revision'
 
-def calculate_column_widths(data, max_total_width=MAX_TABLE_WIDTH):
-    """Calculate optimal column widths based on content and max total width."""
-    # Get all column names
-    columns = set()
-    for row in data:
-        columns.update(row.keys())
-    columns = list(columns)
+
+def get_note_revisions(conn, note_id):
+    """List the recorded revisions of a note, oldest first.
     
-    # Calculate initial widths based on column names and content
-    widths = {col: len(col) for col in columns}
-    for row in data:
-        for col, val in row.items():
-            if isinstance(val, str):
-                widths[col] = max(widths[col], min(len(val), 40))  # Cap at 40 chars
+    Returns:
+        list: Dicts with revision, kind, created_at and edited_by. Empty if
+        the note was never edited.
+    """
+    cursor = conn.execute(f'''
+        SELECT revision, kind, created_at, edited_by FROM {_revision_source(conn)}
+        WHERE note_id = ? ORDER BY revision
+    ''', (note_id,))
+    return [dict(row) for row in cursor]
+
+
+def get_note_revision(conn, note_id, revision):
+    """Rebuild the content of a note at the given revision.
     
-    # Adjust widths to fit within max_total_width
-    total_width = sum(widths.values()) + (3 * len(columns))  # Add spacing between columns
-    if total_width > max_total_width:
-        # Scale down proportionally
-        scale_factor = max_total_width / total_width
-        for col in widths:
-            # Ensure minimum width of 5 for each column
-            widths[col] = max(5, int(widths[col] * scale_factor))
+    Starts from the closest full snapshot at or before the revision and
+    applies the deltas after it.
     
-    return widths
+    Returns:
+        str: The content, or None if the revision does not exist.
+    """
+    table = _revision_source(conn)
+    rows = conn.execute(f'''
+        SELECT revision, kind, data FROM {table}
+        WHERE note_id = :note_id AND revision <= :revision
+          AND revision >= (
+              SELECT MAX(revision) FROM {table}
+              WHERE note_id = :note_id AND revision <= :revision AND kind = 'full'
+          )
+        ORDER BY revision
+    ''', {'note_id': note_id, 'revision': revision}).fetchall()
+    if not rows or rows[-1]['revision'] != revision:
+        return None
+    text = decode_note_content(rows[0]['data'])
+    for row in rows[1:]:
+        text = apply_delta(text, row['data'])
+    return text
 
-def print_user_tables(conn, user_id, username):
-    """Print well-formatted tables of persons and notes visible to a user."""
-    visible_data = fetch_visible_persons_notes(conn, user_id)
+
+def create_note(conn, person_id, user_id, content):
+    """Create a note for a person (UC-4). The caller commits.
     
-    # Extract unique persons
-    persons = {}
-    for item in visible_data:
-        person_id = item['person_id']
-        if person_id not in persons:
-            users_with_access = get_users_with_access(conn, 'person', person_id)
-            person_data = {
-                'ID': person_id,
-                'Name': f"{item['vorname']} {item['nachname']}",
-                'Email': item['email'],
-                'Visible For': users_with_access  # Keep as list for multiline formatting
-            }
-            
-            # Add changes column
-            if state_tracking['current_usecase'] > 0:  # Skip for initial state
-                person_data['Changes'] = detect_changes('person', person_id, {
-                    'Visible For': users_with_access
-                })
-            
-            persons[person_id] = person_data
+    Returns:
+        int: The ID of the new note.
+    """
+    cursor = conn.execute(
+        'INSERT INTO note (content, person_id, created_by, created_at) VALUES (?, ?, ?, datetime(\'now\'))',
+        (encode_note_content(content, content_compression_min_size(conn)), person_id, user_id)
+    )
+    return cursor.lastrowid
+
+
+def assign_person(conn, user_id, person_id):
+    """Grant a user access to a person (UC-5). The caller commits.
     
-    # Extract notes
-    notes = []
-    for item in visible_data:
-        note_id = item['note_id']
-        users_with_access = get_users_with_access(conn, 'note', note_id)
-        note_data = {
-            'ID': note_id,
-            'Person': f"{item['vorname']} {item['nachname']}",
-            'Content': item['content'],
-            'Created By': item['created_by_username'],
-            'Visible For': users_with_access  # Keep as list for multiline formatting
-        }
-        
-        # Add changes column
-        if state_tracking['current_usecase'] > 0:  # Skip for initial state
-            note_data['Changes'] = detect_changes('note', note_id, {
-                'Content': item['content'],
-                'Visible For': users_with_access
-            })
-        
-        notes.append(note_data)
+    Returns:
+        bool: True if a new assignment was created, False if it already existed.
+    """
+    cursor = conn.execute(
+        'SELECT 1 FROM user_person WHERE user_id = ? AND person_id = ?',
+        (user_id, person_id)
+    )
+    if cursor.fetchone():
+        return False
+    conn.execute(
+        'INSERT INTO user_person (user_id, person_id) VALUES (?, ?)',
+        (user_id, person_id)
+    )
+    return True
+
+
+# Chunked statements of offboard_user, in order. Each one handles at most
+# :limit rows, so it can be repeated in short transactions until rowcount is 0.
+OFFBOARD_STEPS = (
+    ('persons', 'SELECT COUNT(*) FROM person WHERE created_by = :user_id', '''
+        UPDATE person SET created_by = :new_owner_id, version = version + 1
+        WHERE id IN (SELECT id FROM person WHERE created_by = :user_id LIMIT :limit)
+    '''),
+    ('notes', 'SELECT COUNT(*) FROM note WHERE created_by = :user_id', '''
+        UPDATE note SET created_by = :new_owner_id, version = version + 1
+        WHERE id IN (SELECT id FROM note WHERE created_by = :user_id LIMIT :limit)
+    '''),
+)
+
+REVOKE_STEPS = (
+    ('person_grants', 'SELECT COUNT(*) FROM user_person WHERE user_id = :user_id', '''
+        DELETE FROM user_person WHERE user_id = :user_id AND person_id IN (
+            SELECT person_id FROM user_person WHERE user_id = :user_id LIMIT :limit
+        )
+    '''),
+    ('note_grants', 'SELECT COUNT(*) FROM note_assignment WHERE user_id = :user_id', '''
+        DELETE FROM note_assignment WHERE user_id = :user_id AND note_id IN (
+            SELECT note_id FROM note_assignment WHERE user_id = :user_id LIMIT :limit
+        )
+    '''),
+)
+
+
+def _run_chunked_steps(conn, steps, params, chunk_size, lock_budget, pause, progress):
+    """Run chunked steps, each chunk in its own write transaction.
     
-    # Format and print persons table
-    persons_list = list(persons.values())
-    person_column_widths = calculate_column_widths(persons_list)
-    formatted_persons = format_table_data(persons_list, person_column_widths)
+    The chunk size starts at chunk_size and is scaled after every chunk so
+    that the write lock is held for about lock_budget seconds at most
+    (None: always use chunk_size).
+    Between chunks the lock is released for pause seconds, giving waiting
+    writers (whose busy handlers poll) a chance to get in.
     
-    print(f"\n{username}'s Visible Persons:")
-    print(tabulate(formatted_persons, headers="keys", tablefmt="grid"))
+    Returns:
+        dict: Rows per step, chunks, max_lock_seconds and seconds.
+    """
+    conn.commit()
+    result = {'chunks': 0, 'max_lock_seconds': 0.0}
+    limit = chunk_size
+    start = time.perf_counter()
+    for name, count_query, statement in steps:
+        total = conn.execute(count_query, params).fetchone()[0]
+        done = 0
+        while True:
+            conn.execute('BEGIN IMMEDIATE')
+            locked_at = time.perf_counter()
+            try:
+                rows = conn.execute(statement, dict(params, limit=limit)).rowcount
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            held = time.perf_counter() - locked_at
+            if rows == 0:
+                break
+            done += rows
+            result['chunks'] += 1
+            result['max_lock_seconds'] = max(result['max_lock_seconds'], held)
+            if lock_budget is not None:
+                # Aim for 80% of the budget, but never above chunk_size rows
+                limit = max(1, min(chunk_size, int(limit * lock_budget * 0.8 / max(held, 1e-6))))
+            if progress:
+                progress(name, done, max(total, done))
+            if pause:
+                time.sleep(pause)
+        result[name] = done
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def revoke_access(conn, user_id, chunk_size=1000, lock_budget=0.05, pause=0.005,
+                  progress=None):
+    """Remove all person and note grants of a user in short transactions.
     
-    # Format and print notes table
-    note_column_widths = calculate_column_widths(notes)
-    formatted_notes = format_table_data(notes, note_column_widths)
+    Commits after every chunk, so a large revoke never holds the write lock
+    for long (see _run_chunked_steps). progress(step, done, total) is
+    called after each chunk.
     
-    print(f"\n{username}'s Visible Notes:")
-    print(tabulate(formatted_notes, headers="keys", tablefmt="grid"))
+    Returns:
+        dict: person_grants and note_grants removed, chunks,
+        max_lock_seconds and seconds.
+    """
+    return _run_chunked_steps(conn, REVOKE_STEPS, {'user_id': user_id}, chunk_size,
+                              lock_budget, pause, progress)
 
 
-def get_user_id_by_username(conn, username):
-    cursor = conn.cursor()
-    cursor.execute('SELECT id FROM user WHERE username = ?', (username,))
-    return cursor.fetchone()['id']
+def offboard_user(conn, user_id, new_owner_id, chunk_size=1000, lock_budget=0.05,
+                  pause=0.005, progress=None):
+    """Remove a user, handing the persons and notes they created to new_owner_id.
+    
+    Ownership is reassigned and grants are revoked in chunks, one
+    transaction each, that keep the write lock for about lock_budget
+    seconds at most (see revoke_access). Only when nothing refers to the
+    user any more is the user row deleted. If interrupted, calling it
+    again continues where it stopped.
+    
+    Returns:
+        dict: persons, notes, person_grants and note_grants handled,
+        chunks, max_lock_seconds and seconds.
+    """
+    if user_id == new_owner_id:
+        raise ValueError("The new owner must be a different user")
+    for uid in (user_id, new_owner_id):
+        if get_user_role(conn, uid) is None:
+            raise ValueError(f"Unknown user {uid}")
+    steps = OFFBOARD_STEPS + REVOKE_STEPS
+    params = {'user_id': user_id, 'new_owner_id': new_owner_id}
+    result = {}
+    while True:
+        done = _run_chunked_steps(conn, steps, params, chunk_size, lock_budget, pause, progress)
+        for key, value in done.items():
+            combine = max if key == 'max_lock_seconds' else lambda a, b: a + b
+            result[key] = combine(result.get(key, 0), value)
+        # Re-count and delete under one write lock: rows other writers added
+        # for the user since their step ran send us through the steps again
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            remaining = sum(conn.execute(count_query, params).fetchone()[0]
+                            for _, count_query, _ in steps)
+            if not remaining:
+                conn.execute('DELETE FROM user WHERE id = ?', (user_id,))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        if not remaining:
+            return result
 
 
 def run_uc1(conn):
@@ -542,7 +4336,7 @@ def run_uc2(conn):
     cursor = conn.cursor()
     cursor.execute(
         '''
-        SELECT n.id, n.content, n.created_by, u.username
+        SELECT n.id, note_text(n.content) AS content, n.created_by, n.version, u.username
         FROM note n
         JOIN user u ON n.created_by = u.id
         JOIN person p ON n.person_id = p.id
@@ -559,15 +4353,17 @@ def run_uc2(conn):
         old_content = note['content']
         created_by_username = note['username']
         
-        # Update the note with modified content
+        # Update the note with modified content, unless someone else changed
+        # it since it was read
         new_content = f"Updated: {old_content}"
-        cursor.execute(
-            'UPDATE note SET content = ? WHERE id = ?',
-            (new_content, note_id)
-        )
-        conn.commit()
-        
-        print(f"Updated Note {note_id} by {created_by_username}: {new_content}")
+        try:
+            update_note_content(conn, note_id, new_content, edited_by=editor_id,
+                                expected_version=note['version'])
+            conn.commit()
+            print(f"Updated Note {note_id} by {created_by_username}: {new_content}")
+        except VersionConflictError as e:
+            conn.rollback()
+            print(f"Note {note_id} was not updated: {e}")
     else:
         print("No notes available for the editor to update")
         
@@ -617,18 +4413,10 @@ def run_uc4(conn):
     editor_id = get_user_id_by_username(conn, "bernd.mueller")
     
     # Get Karl's person ID
-    cursor = conn.cursor()
-    cursor.execute(
-        'SELECT id FROM person WHERE vorname = ? AND nachname = ?',
-        ("Karl", "Offen")
-    )
-    karl_id = cursor.fetchone()['id']
+    karl_id = find_person_id(conn, "Karl", "Offen")
     
     # Create a new note for Karl
-    cursor.execute(
-        'INSERT INTO note (content, person_id, created_by, created_at) VALUES (?, ?, ?, datetime(\'now\'))',
-        ('New note created by Bernd for Karl', karl_id, editor_id)
-    )
+    create_note(conn, karl_id, editor_id, 'New note created by Bernd for Karl')
     conn.commit()
     
     print(f"Added Note by bernd.mueller for Karl Offen: New note created by Bernd for Karl")
@@ -653,26 +4441,14 @@ def run_uc5(conn):
     editor_id = get_user_id_by_username(conn, "bernd.mueller")
     
     # Get Olaf's person ID
-    cursor = conn.cursor()
-    cursor.execute(
-        'SELECT id FROM person WHERE vorname = ? AND nachname = ?',
-        ("Olaf", "Gemein")
-    )
-    olaf_id = cursor.fetchone()['id']
+    olaf_id = find_person_id(conn, "Olaf", "Gemein")
     
-    # Check if assignment already exists
-    cursor.execute(
-        'SELECT 1 FROM user_person WHERE user_id = ? AND person_id = ?',
-        (editor_id, olaf_id)
-    )
-    if not cursor.fetchone():
-        # Assign Bernd to Olaf
-        cursor.execute(
-            'INSERT INTO user_person (user_id, person_id) VALUES (?, ?)',
-            (editor_id, olaf_id)
-        )
+    # Assign Bernd to Olaf unless the assignment already exists
+    if assign_person(conn, editor_id, olaf_id):
         conn.commit()
     
+    cursor = conn.cursor()
+    
     print(f"Assigned bernd.mueller to access Olaf Gemein")
     
     # Verify Bernd can now see Olaf's data
@@ -694,6 +4470,310 @@ def run_uc5(conn):
     print_user_tables(conn, admin_id, "Anna Schmitt")
 
 
+SCENARIO_OPERATIONS = ('read', 'read_nested', 'update_note', 'create_note', 'assign_person')
+
+
+def load_scenario(path):
+    """Load a scenario script: one JSON operation per line.
+    
+    Supported operations (users may be given by username or ID, persons by
+    "Vorname Nachname" or ID):
+    
+        {"op": "read", "user": "clara.schulz"}
+        {"op": "read_nested", "user": 3}
+        {"op": "update_note", "user": "bernd.mueller", "note_id": 9, "content": "..."}
+        {"op": "create_note", "user": "bernd.mueller", "person": "Karl Offen", "content": "..."}
+        {"op": "assign_person", "user": "anna.schmitt", "grantee": "bernd.mueller",
+         "person": "Olaf Gemein"}
+    
+    An optional "repeat" field expands an operation into several copies.
+    Lines starting with '#' are ignored.
+    """
+    operations = []
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            operation = json.loads(line)
+            if operation.get('op') not in SCENARIO_OPERATIONS:
+                raise ValueError(f"{path}:{line_number}: unknown operation {operation.get('op')!r}")
+            operations.extend([operation] * int(operation.get('repeat', 1)))
+    return operations
+
+
+class _ScenarioContext:
+    """Per-thread connection with cached user and person ID lookups."""
+
+    def __init__(self, db_path):
+        self.conn = get_connection(db_path)
+        self.user_ids = {}
+        self.person_ids = {}
+
+    def user_id(self, user):
+        if isinstance(user, int):
+            return user
+        if user not in self.user_ids:
+            user_id = get_user_id_by_username(self.conn, user)
+            if user_id is None:
+                raise KeyError(f"unknown user {user!r}")
+            self.user_ids[user] = user_id
+        return self.user_ids[user]
+
+    def person_id(self, person):
+        if isinstance(person, int):
+            return person
+        if person not in self.person_ids:
+            vorname, nachname = person.split(' ', 1)
+            self.person_ids[person] = find_person_id(self.conn, vorname, nachname)
+        return self.person_ids[person]
+
+
+def _run_operation(context, operation):
+    """Execute one scenario operation; returns False if permission was denied."""
+    conn = context.conn
+    op = operation['op']
+    user_id = context.user_id(operation['user'])
+    
+    if op == 'read':
+        fetch_visible_persons_notes(conn, user_id)
+    elif op == 'read_nested':
+        fetch_visible_persons_with_notes(conn, user_id)
+    elif op == 'update_note':
+        note_id = operation['note_id']
+        if not user_can_write_note(conn, user_id, note_id):
+            return False
+        update_note_content(conn, note_id, operation.get('content', 'Updated by scenario'),
+                            edited_by=user_id)
+        conn.commit()
+    elif op == 'create_note':
+        person_id = context.person_id(operation['person'])
+        if not user_can_read(conn, user_id, 'person', person_id):
+            return False
+        create_note(conn, person_id, user_id, operation.get('content', 'Created by scenario'))
+        conn.commit()
+    elif op == 'assign_person':
+        if get_user_role(conn, user_id) != Role.ADMIN:
+            return False
+        assign_person(conn, context.user_id(operation['grantee']),
+                      context.person_id(operation['person']))
+        conn.commit()
+    return True
+
+
+def run_scenario(db_path, operations, threads=1):
+    """Run scenario operations against a database, optionally concurrently.
+    
+    Each thread uses its own connection and takes the next operation from a
+    shared queue, so operations start in script order.
+    
+    Returns:
+        dict: 'latency' (op -> LatencyHistogram), 'denied' and 'errors'
+        counts, 'seconds' and 'ops_per_sec'.
+    """
+    work = queue.SimpleQueue()
+    for operation in operations:
+        work.put(operation)
+    latency = {op: LatencyHistogram() for op in SCENARIO_OPERATIONS}
+    outcome = {'denied': 0, 'errors': 0, 'error_messages': []}
+    outcome_lock = threading.Lock()
+    
+    def worker():
+        context = _ScenarioContext(db_path)
+        try:
+            while True:
+                try:
+                    operation = work.get_nowait()
+                except queue.Empty:
+                    return
+                start = time.perf_counter()
+                try:
+                    allowed = _run_operation(context, operation)
+                except (sqlite3.Error, KeyError, TypeError, ValueError) as e:
+                    context.conn.rollback()
+                    with outcome_lock:
+                        outcome['errors'] += 1
+                        if len(outcome['error_messages']) < 10:
+                            outcome['error_messages'].append(f"{operation}: {e}")
+                    continue
+                latency[operation['op']].record(time.perf_counter() - start)
+                if not allowed:
+                    with outcome_lock:
+                        outcome['denied'] += 1
+        finally:
+            context.conn.close()
+    
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    seconds = time.perf_counter() - start
+    
+    outcome.update(latency=latency, seconds=seconds,
+                   ops_per_sec=len(operations) / seconds if seconds else 0.0)
+    return outcome
+
+
+def print_scenario_report(result):
+    """Print a per-operation latency table for a run_scenario result."""
+    rows = [dict(op=op, **histogram.summary())
+            for op, histogram in result['latency'].items() if histogram.count]
+    print(tabulate(rows, headers="keys", tablefmt="grid"))
+    print(f"{result['ops_per_sec']:,.0f} ops/sec in {result['seconds']:.2f}s, "
+          f"{result['denied']} denied, {result['errors']} errors")
+    for message in result['error_messages']:
+        print(f"  {message}")
+
+
+# Phases of the demo output, mapped to the module-level functions that
+# implement them (print_user_tables looks these up at call time)
+PROFILE_PHASES = {
+    'query': ('fetch_visible_persons_with_notes',),
+    'access-list lookup': ('get_users_with_access',),
+    'change detection': ('detect_changes',),
+    'column widths': ('calculate_column_widths',),
+    'table rendering': ('render_table',),
+}
+
+
+class PhaseProfiler:
+    """Attribute wall time and allocations to the phases of a demo run.
+    
+    While instrument() is active, the functions listed in PROFILE_PHASES are
+    replaced by wrappers that accumulate calls and seconds per phase. With
+    trace_memory=True (tracemalloc must be running) they also record the
+    allocation high-water mark of each call and the memory still held
+    when it returns.
+    """
+    
+    def __init__(self, phases=PROFILE_PHASES, trace_memory=False):
+        self.phases = phases
+        self.trace_memory = trace_memory
+        self.stats = {
+            phase: {'calls': 0, 'seconds': 0.0, 'peak_bytes': 0, 'retained_bytes': 0}
+            for phase in phases
+        }
+    
+    def _wrap(self, phase, func):
+        stats = self.stats[phase]
+        
+        def wrapper(*args, **kwargs):
+            if self.trace_memory:
+                before, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats['seconds'] += time.perf_counter() - start
+                stats['calls'] += 1
+                if self.trace_memory:
+                    after, peak = tracemalloc.get_traced_memory()
+                    stats['peak_bytes'] = max(stats['peak_bytes'], peak - before)
+                    stats['retained_bytes'] += after - before
+        return wrapper
+    
+    @contextmanager
+    def instrument(self):
+        module = globals()
+        originals = {}
+        for phase, names in self.phases.items():
+            for name in names:
+                originals[name] = module[name]
+                module[name] = self._wrap(phase, originals[name])
+        try:
+            yield self
+        finally:
+            module.update(originals)
+
+
+def run_use_cases(conn, prompt_continue=lambda: True):
+    """Run UC-1 to UC-5, stopping early if prompt_continue() returns False."""
+    use_cases = [run_uc1, run_uc2, run_uc3, run_uc4, run_uc5]
+    for index, use_case in enumerate(use_cases):
+        use_case(conn)
+        if index < len(use_cases) - 1 and not prompt_continue():
+            return False
+    return True
+
+
+def _profile_pass(source, repeat):
+    """Run the use cases repeat times on fresh in-memory copies of source."""
+    for _ in range(repeat):
+        conn = get_connection(':memory:')
+        source.backup(conn)
+        state_tracking.update(persons={}, notes={}, current_usecase=0)
+        try:
+            with redirect_stdout(io.StringIO()):
+                run_use_cases(conn)
+        finally:
+            conn.close()
+
+
+def profile_use_cases(source, report_path, repeat=20, top=25):
+    """Profile the use cases on copies of source and write a text report.
+    
+    Three separate passes are made because each instrument distorts the
+    others: phase timers only, cProfile for a per-function breakdown, and
+    tracemalloc for allocations. The source database is not modified.
+    
+    Returns:
+        dict: The phase timings of the first pass.
+    """
+    timings = PhaseProfiler()
+    start = time.perf_counter()
+    with timings.instrument():
+        _profile_pass(source, repeat)
+    total = time.perf_counter() - start
+    
+    profiler = cProfile.Profile()
+    profiler.runcall(_profile_pass, source, repeat)
+    function_stats = io.StringIO()
+    pstats.Stats(profiler, stream=function_stats).sort_stats('cumulative').print_stats(top)
+    
+    allocations = PhaseProfiler(trace_memory=True)
+    tracemalloc.start(10)
+    try:
+        with allocations.instrument():
+            _profile_pass(source, 1)
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    
+    rows = []
+    for phase, stats in timings.stats.items():
+        memory = allocations.stats[phase]
+        rows.append([
+            phase,
+            stats['calls'] // repeat,
+            f"{stats['seconds'] * 1000 / repeat:.2f}",
+            f"{100 * stats['seconds'] / total:.1f}%" if total else '-',
+            f"{stats['seconds'] * 1e6 / stats['calls']:.1f}" if stats['calls'] else '-',
+            f"{memory['peak_bytes'] / 1024:.1f}",
+            f"{memory['retained_bytes'] / 1024:.1f}",
+        ])
+    accounted = sum(stats['seconds'] for stats in timings.stats.values())
+    rows.append(['other', '', f"{(total - accounted) * 1000 / repeat:.2f}",
+                 f"{100 * (total - accounted) / total:.1f}%" if total else '-', '', '', ''])
+    
+    lines = [
+        f"Use case run profile ({repeat} runs, {total * 1000 / repeat:.2f} ms per run)",
+        '',
+        tabulate(rows, headers=['Phase', 'Calls/run', 'ms/run', 'Share', 'us/call',
+                                'Peak KiB', 'Retained KiB']),
+        '',
+        f"Top {top} functions by cumulative time (cProfile, all runs):",
+        function_stats.getvalue(),
+        "Largest live allocation sites at the end of one run (tracemalloc):",
+    ]
+    lines.extend(str(stat) for stat in snapshot.statistics('lineno')[:10])
+    with open(report_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    return timings.stats
+
+
 def database_exists(conn):
     """Check if the database is already initialized with required tables and data."""
     cursor = conn.cursor()
@@ -717,9 +4797,151 @@ def database_exists(conn):
         return False
 
 
-def main():
+def parse_args(argv=None):
+    """Parse command line arguments; without a command the demo is run."""
+    parser = argparse.ArgumentParser(
+        description="Persons & notes access-control showcase database"
+    )
+    parser.add_argument('--db', default="showcase.db", help="SQLite database file")
+    parser.add_argument('--no-prompt', action='store_true',
+                        help="Run all use cases without asking to continue")
+    parser.add_argument('--profile', nargs='?', const='profile_report.txt', metavar='REPORT',
+                        help="Profile the use cases on a copy of the database and write "
+                             "a report (default: profile_report.txt)")
+    parser.add_argument('--profile-repeat', type=int, default=20,
+                        help="Use case runs to average over when profiling")
+    subparsers = parser.add_subparsers(dest='command')
+    
+    import_parser = subparsers.add_parser(
+        'import', help="Bulk import persons or notes from CSV/JSONL"
+    )
+    import_parser.add_argument('table', choices=sorted(IMPORT_FIELDS))
+    import_parser.add_argument('path', help="Input file (.csv, .jsonl, optionally .gz)")
+    import_parser.add_argument('--batch-size', type=int, default=50000)
+    import_parser.add_argument('--rebuild-indexes', action='store_true',
+                               help="Drop indexes during the load and rebuild them afterwards")
+    
+    export_parser = subparsers.add_parser(
+        'export', help="Export the data visible to users to CSV/JSONL"
+    )
+    export_parser.add_argument('path', help="Output file (.csv, .jsonl, optionally .gz)")
+    export_parser.add_argument('--user', action='append', default=[],
+                               help="Username or ID to export for (repeatable); default: all users")
+    export_parser.add_argument('--batch-size', type=int, default=10000)
+    
+    scenario_parser = subparsers.add_parser(
+        'scenario', help="Replay a scenario script of use-case operations"
+    )
+    scenario_parser.add_argument('path', help="Scenario file (JSONL, see load_scenario)")
+    scenario_parser.add_argument('--threads', type=int, default=1)
+    scenario_parser.add_argument('--repeat', type=int, default=1,
+                                 help="Run the whole script this many times")
+    
+    backup_parser = subparsers.add_parser(
+        'backup', help="Online backup of the database that does not block writers"
+    )
+    backup_parser.add_argument('path', help="Backup file to write")
+    backup_parser.add_argument('--pages', type=int, default=1024,
+                               help="Pages copied per step")
+    backup_parser.add_argument('--sleep', type=float, default=0.01,
+                               help="Seconds to pause between steps")
+    
+    offboard_parser = subparsers.add_parser(
+        'offboard', help="Remove a user, reassigning their persons and notes in small chunks"
+    )
+    offboard_parser.add_argument('user', help="Username or ID of the user to remove")
+    offboard_parser.add_argument('--to', required=True, dest='new_owner',
+                                 help="Username or ID of the new owner")
+    offboard_parser.add_argument('--chunk-size', type=int, default=1000,
+                                 help="Maximum rows changed per transaction")
+    offboard_parser.add_argument('--lock-budget', type=float, default=0.05,
+                                 help="Target seconds the write lock is held per chunk")
+    
+    return parser.parse_args(argv)
+
+
+def run_offboard_command(args):
+    def progress(step, done, total):
+        print(f"\r{step}: {done}/{total}", end='\n' if done == total else '', flush=True)
+    
+    conn = get_connection(args.db)
+    try:
+        user_id, new_owner_id = [_resolve_user_arg(conn, user)
+                                 for user in (args.user, args.new_owner)]
+        unknown = [user for user, uid in ((args.user, user_id), (args.new_owner, new_owner_id))
+                   if uid is None]
+        if unknown:
+            print(f"Error: Unknown user(s): {', '.join(unknown)}")
+            return 1
+        result = offboard_user(conn, user_id, new_owner_id, chunk_size=args.chunk_size,
+                               lock_budget=args.lock_budget, progress=progress)
+        print(f"Removed {args.user}: reassigned {result['persons']} persons and "
+              f"{result['notes']} notes, revoked {result['person_grants']} person and "
+              f"{result['note_grants']} note grants in {result['chunks']} chunks "
+              f"({result['seconds']:.2f}s, longest lock {result['max_lock_seconds'] * 1000:.1f} ms)")
+    finally:
+        conn.close()
+
+
+def run_backup_command(args):
+    def progress(done, total):
+        print(f"\rBacked up {done}/{total} pages", end='', flush=True)
+    
+    result = backup_database(args.db, args.path, pages=args.pages, sleep=args.sleep,
+                             progress=progress)
+    print(f"\nBackup of {args.db} written to {args.path} "
+          f"({result['pages']} pages in {result['seconds']:.2f}s)")
+
+
+def run_scenario_command(args):
+    operations = load_scenario(args.path) * args.repeat
+    result = run_scenario(args.db, operations, threads=args.threads)
+    print_scenario_report(result)
+
+
+def run_export_command(args):
+    conn = get_connection(args.db)
+    try:
+        if args.user:
+            user_ids = [_resolve_user_arg(conn, user) for user in args.user]
+            unknown = [user for user, user_id in zip(args.user, user_ids) if user_id is None]
+            if unknown:
+                print(f"Error: Unknown user(s): {', '.join(unknown)}")
+                return 1
+        else:
+            user_ids = [row['id'] for row in conn.execute('SELECT id FROM user ORDER BY id')]
+        result = export_visible_data(conn, user_ids, args.path, batch_size=args.batch_size)
+        print(f"Exported {result['rows']} rows for {len(user_ids)} users to {args.path} "
+              f"in {result['seconds']:.2f}s ({result['rows_per_sec']:,.0f} rows/sec)")
+    finally:
+        conn.close()
+
+
+def run_import_command(args):
+    conn = get_connection(args.db)
+    try:
+        create_schema(conn)
+        import_file(conn, args.table, args.path, batch_size=args.batch_size,
+                    rebuild_indexes=args.rebuild_indexes)
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'import':
+        return run_import_command(args)
+    if args.command == 'export':
+        return run_export_command(args)
+    if args.command == 'scenario':
+        return run_scenario_command(args)
+    if args.command == 'backup':
+        return run_backup_command(args)
+    if args.command == 'offboard':
+        return run_offboard_command(args)
+    
     # Use persistent database file
-    DB_FILE = "showcase.db"
+    DB_FILE = args.db
     conn = None
     
     try:
@@ -737,40 +4959,40 @@ def main():
         if user_count == 0:
             print(f"Inserting sample data into {DB_FILE}")
             insert_sample_data(conn)
+            create_visibility_counters(conn)
             conn.commit()  # Ensure data is saved
         else:
             print(f"Using existing database at {DB_FILE} with {user_count} users")
         
+        if args.profile:
+            stats = profile_use_cases(conn, args.profile, repeat=args.profile_repeat)
+            slowest = max(stats, key=lambda phase: stats[phase]['seconds'])
+            print(f"Profile written to {args.profile} (slowest phase: {slowest})")
+            return
+        
         # Run all use cases
         print("\nRunning use cases...")
         
         def prompt_continue():
+            if args.no_prompt:
+                return True
             response = input("\nContinue / Stop? ").strip().lower()
             return response != "stop"
         
-        run_uc1(conn)  # Admin overview
-        if not prompt_continue():
-            return
-            
-        run_uc2(conn)  # Editor updates note
-        if not prompt_continue():
-            return
-            
-        run_uc3(conn)  # Viewer reads notes
-        if not prompt_continue():
-            return
-            
-        run_uc4(conn)  # Editor creates new note
-        if not prompt_continue():
+        if not run_use_cases(conn, prompt_continue):
             return
-            
-        run_uc5(conn)  # Admin assigns rights
         
         # Final verification
         print("\nFinal verification:")
+        # Databases created before the counters existed use the full query
+        counters = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'visibility_counts'"
+        ).fetchone()
+        count = count_visible if counters else count_visible_by_query
         for user_id, username in [(1, 'anna.schmitt'), (2, 'bernd.mueller'), (3, 'clara.schulz')]:
-            visible_data = fetch_visible_persons_notes(conn, user_id)
-            print(f"{username} can see {len(visible_data)} notes")
+            counts = count(conn, user_id)
+            print(f"{username} can see {counts['persons']} persons and "
+                  f"{counts['notes']} notes ({counts['writable_notes']} writable)")
         
         # Keep the database file after execution
         print(f"\nDatabase has been saved to {DB_FILE}")
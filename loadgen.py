@@ -0,0 +1,94 @@
+"""Load generator for the showcase HTTP server (see server.py).
+
+Runs a mix of visibility reads, access-list lookups and note updates from
+several client threads against a running server and reports requests/sec
+and latency percentiles. Example:
+
+    python server.py --db bench.db --workers 8 &
+    python loadgen.py --url http://127.0.0.1:8000 --threads 8 --duration 10
+"""
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+from demo_db import LatencyHistogram
+
+
+def _request(conn, method, path, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    headers = {'Content-Type': 'application/json'} if data else {}
+    conn.request(method, path, body=data, headers=headers)
+    response = conn.getresponse()
+    payload = response.read()
+    return response.status, payload
+
+
+def _client(url, args, deadline, histograms, errors, seed):
+    rng = random.Random(seed)
+    target = urlparse(url)
+    conn = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+    try:
+        while time.perf_counter() < deadline:
+            user_id = rng.randint(1, args.users)
+            choice = rng.random()
+            if choice < args.write_ratio:
+                name = 'update_note'
+                note_id = rng.randint(1, args.notes)
+                request = ('PUT', f'/notes/{note_id}',
+                           {'user_id': 1, 'content': f'Load test update {rng.random()}'})
+            elif choice < args.write_ratio + 0.3:
+                name = 'access'
+                request = ('GET', f'/access/note/{rng.randint(1, args.notes)}', None)
+            else:
+                name = 'visible'
+                request = ('GET', f'/users/{user_id}/persons', None)
+            start = time.perf_counter()
+            status, _ = _request(conn, *request)
+            histograms[name].record(time.perf_counter() - start)
+            if status >= 500:
+                errors.append(status)
+    finally:
+        conn.close()
+
+
+def run_load(url, args):
+    """Run the load test and return (requests/sec, histograms, error count)."""
+    histograms = {name: LatencyHistogram() for name in ('visible', 'access', 'update_note')}
+    errors = []
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=_client, args=(url, args, deadline, histograms, errors, i))
+        for i in range(args.threads)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    total = sum(histogram.count for histogram in histograms.values())
+    return total / elapsed, histograms, len(errors)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load generator for server.py")
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds to run")
+    parser.add_argument('--users', type=int, default=3, help="User IDs to read as (1..N)")
+    parser.add_argument('--notes', type=int, default=20, help="Note IDs to touch (1..N)")
+    parser.add_argument('--write-ratio', type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    rate, histograms, errors = run_load(args.url, args)
+    print(f"{rate:,.0f} requests/sec with {args.threads} threads, {errors} server errors")
+    for name, histogram in histograms.items():
+        print(f"  {name:<12} {histogram.summary()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+"""HTTP/JSON API over the showcase database.
+
+Endpoints:
+
+    GET  /users/<id>/visible[?since=&limit=&offset=]  flat visible rows
+                                                      (&content=0: without contents,
+                                                      &tenant=: only for that tenant)
+    GET  /users/<id>/persons[?tenant=]                persons with nested notes
+                                                      (?q=&limit=: search_persons)
+    GET  /users/<id>/feed[?limit=&before_at=&before_id=&tenant=]
+                                                      newest visible notes
+    GET  /access/<person|note>/<id>[?tenant=]         get_users_with_access
+    GET  /notes/<id>?user_id=                         note with its version
+    POST /notes        {"user_id", "person_id", "content"}    create a note (UC-4)
+    PUT  /notes/<id>   {"user_id", "content"[, "version"]}    update a note (UC-2);
+                                                      409 if "version" is stale
+    POST /grants       {"admin_id", "user_id", "person_id"}   grant access (UC-5)
+    GET  /metrics                                     per-endpoint latency
+
+Run with:
+
+    python server.py --db showcase.db --port 8000 --workers 8
+"""
+import argparse
+import json
+import re
+import sqlite3
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from demo_db import (
+    ConnectionPool,
+    LatencyHistogram,
+    Role,
+    VersionConflictError,
+    assign_person,
+    create_note,
+    fetch_activity_feed,
+    fetch_visible_persons_notes,
+    fetch_visible_persons_with_notes,
+    get_note,
+    get_user_role,
+    get_users_with_access,
+    has_tenants,
+    search_persons,
+    update_note_content,
+    user_can_read,
+    user_can_write_note,
+)
+
+
+class ApiError(Exception):
+    """Error returned to the client with an HTTP status code."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _require(body, *fields):
+    missing = [field for field in fields if field not in body]
+    if missing:
+        raise ApiError(400, f"Missing fields: {', '.join(missing)}")
+    return [body[field] for field in fields]
+
+
+def _tenant(query):
+    return int(query['tenant']) if 'tenant' in query else None
+
+
+def get_visible(conn, params, body, user_id):
+    query = {key: values[-1] for key, values in params.items()}
+    limit = int(query['limit']) if 'limit' in query else None
+    rows = fetch_visible_persons_notes(conn, int(user_id), limit=limit,
+                                       offset=int(query.get('offset', 0)),
+                                       since=query.get('since'),
+                                       with_content=query.get('content', '1') != '0',
+                                       tenant_id=_tenant(query))
+    return [row.as_dict() for row in rows]
+
+
+def get_persons(conn, params, body, user_id):
+    query = {key: values[-1] for key, values in params.items()}
+    if 'q' in query:
+        return search_persons(conn, int(user_id), query['q'], int(query.get('limit', 10)),
+                              tenant_id=_tenant(query))
+    return fetch_visible_persons_with_notes(conn, int(user_id), tenant_id=_tenant(query))
+
+
+def get_feed(conn, params, body, user_id):
+    query = {key: values[-1] for key, values in params.items()}
+    before = None
+    if 'before_at' in query or 'before_id' in query:
+        if 'before_at' not in query or 'before_id' not in query:
+            raise ApiError(400, "before_at and before_id must be given together")
+        before = (query['before_at'], int(query['before_id']))
+    rows, next_before = fetch_activity_feed(conn, int(user_id), int(query.get('limit', 50)),
+                                            before, tenant_id=_tenant(query))
+    next_page = None
+    if next_before is not None:
+        next_page = {'before_at': next_before[0], 'before_id': next_before[1]}
+    return {'rows': [row.as_dict() for row in rows], 'next': next_page}
+
+
+def get_access(conn, params, body, entity_type, entity_id):
+    query = {key: values[-1] for key, values in params.items()}
+    return get_users_with_access(conn, entity_type, int(entity_id), tenant_id=_tenant(query))
+
+
+def get_note_endpoint(conn, params, body, note_id):
+    user_id = int(params.get('user_id', ['0'])[-1])
+    if not user_can_read(conn, user_id, 'note', int(note_id)):
+        raise ApiError(404, "Note not found")
+    return get_note(conn, int(note_id))
+
+
+def post_note(conn, params, body):
+    user_id, person_id, content = _require(body, 'user_id', 'person_id', 'content')
+    if not user_can_read(conn, user_id, 'person', person_id):
+        raise ApiError(403, "User cannot access this person")
+    note_id = create_note(conn, person_id, user_id, content)
+    conn.commit()
+    return {'note_id': note_id}
+
+
+def put_note(conn, params, body, note_id):
+    user_id, content = _require(body, 'user_id', 'content')
+    expected = body.get('version')
+    if expected is not None:
+        try:
+            expected = int(expected)
+        except (TypeError, ValueError):
+            raise ApiError(400, "version must be an integer")
+    if not user_can_write_note(conn, user_id, int(note_id)):
+        raise ApiError(403, "User cannot modify this note")
+    try:
+        version = update_note_content(conn, int(note_id), content, edited_by=user_id,
+                                      expected_version=expected)
+    except VersionConflictError as e:
+        raise ApiError(409, str(e))
+    conn.commit()
+    return {'note_id': int(note_id), 'version': version}
+
+
+def post_grant(conn, params, body):
+    admin_id, user_id, person_id = _require(body, 'admin_id', 'user_id', 'person_id')
+    if get_user_role(conn, admin_id) != Role.ADMIN:
+        raise ApiError(403, "Only admins can assign rights")
+    if has_tenants(conn) and not user_can_read(conn, admin_id, 'person', person_id):
+        raise ApiError(404, "Person not found")  # Other tenants' persons are invisible
+    created = assign_person(conn, user_id, person_id)
+    conn.commit()
+    return {'created': created}
+
+
+ROUTES = [
+    ('GET', re.compile(r'^/users/(\d+)/visible$'), 'visible', get_visible),
+    ('GET', re.compile(r'^/users/(\d+)/persons$'), 'persons', get_persons),
+    ('GET', re.compile(r'^/users/(\d+)/feed$'), 'feed', get_feed),
+    ('GET', re.compile(r'^/access/(person|note)/(\d+)$'), 'access', get_access),
+    ('GET', re.compile(r'^/notes/(\d+)$'), 'note', get_note_endpoint),
+    ('POST', re.compile(r'^/notes$'), 'create_note', post_note),
+    ('PUT', re.compile(r'^/notes/(\d+)$'), 'update_note', put_note),
+    ('POST', re.compile(r'^/grants$'), 'grant', post_grant),
+]
+
+
+class ShowcaseServer(HTTPServer):
+    """HTTP server handing connections to a fixed worker pool.
+
+    Every worker borrows a database connection from a shared pool for the
+    duration of a request. Latencies are recorded per endpoint.
+    """
+
+    def __init__(self, address, db_path, workers=8):
+        super().__init__(address, RequestHandler)
+        self.db_pool = ConnectionPool(db_path, size=workers)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.metrics = {name: LatencyHistogram() for _, _, name, _ in ROUTES}
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+        self.db_pool.close()
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive for load generators
+    timeout = 30  # Seconds before an idle keep-alive client gives its worker back
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def _dispatch(self, method):
+        start = time.perf_counter()
+        url = urlparse(self.path)
+        if method == 'GET' and url.path == '/metrics':
+            self._send(200, {name: histogram.summary()
+                             for name, histogram in self.server.metrics.items()})
+            return
+
+        for route_method, pattern, name, handler in ROUTES:
+            match = pattern.match(url.path)
+            if route_method == method and match:
+                break
+        else:
+            self._send(404, {'error': f"No route for {method} {url.path}"})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length)) if length else {}
+            if not isinstance(body, dict):
+                raise ApiError(400, "Request body must be a JSON object")
+            with self.server.db_pool.connection() as conn:
+                result = handler(conn, parse_qs(url.query), body, *match.groups())
+            status = 200
+        except ApiError as e:
+            status, result = e.status, {'error': str(e)}
+        except (ValueError, sqlite3.IntegrityError) as e:
+            status, result = 400, {'error': str(e)}
+        except sqlite3.OperationalError as e:
+            if 'database is locked' not in str(e):
+                traceback.print_exc()
+                status, result = 500, {'error': "Internal server error"}
+            else:
+                # A writer held the lock past busy_timeout; the client may retry
+                status, result = 503, {'error': str(e)}
+        except Exception:
+            traceback.print_exc()
+            status, result = 500, {'error': "Internal server error"}
+        self._send(status, result)
+        self.server.metrics[name].record(time.perf_counter() - start)
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # Per-request logging would dominate the latency being measured
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP/JSON API for the showcase database")
+    parser.add_argument('--db', default='showcase.db')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args(argv)
+
+    server = ShowcaseServer((args.host, args.port), args.db, workers=args.workers)
+    print(f"Serving {args.db} on http://{args.host}:{server.server_port} "
+          f"with {args.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Template databases for the tests, built once and cloned per test.
+
+Building a database with create_schema + insert_sample_data (or
+insert_synthetic_data at realistic sizes) is much slower than copying a
+finished one page by page with the backup API. The first request for a
+template builds it in memory; every later request clones it.
+
+    from db_fixtures import sample_database
+    self.conn = sample_database()
+"""
+import sys
+from pathlib import Path
+
+# Ensure the demo_db module can be found
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from demo_db import (  # noqa: E402
+    clone_database,
+    create_schema,
+    get_connection,
+    insert_sample_data,
+    insert_synthetic_data,
+)
+
+_templates = {}
+
+
+def template_database(key, build):
+    """Return the template connection for key, building it with build(conn) once."""
+    if key not in _templates:
+        conn = get_connection(':memory:', check_same_thread=False)
+        build(conn)
+        conn.commit()
+        _templates[key] = conn
+    return _templates[key]
+
+
+def sample_database(role_storage='text', target=':memory:'):
+    """Return a fresh copy of the schema with the sample data."""
+    def build(conn):
+        create_schema(conn, role_storage=role_storage)
+        insert_sample_data(conn)
+    return clone_database(template_database(('sample', role_storage), build), target)
+
+
+def synthetic_database(target=':memory:', **kwargs):
+    """Return a fresh copy of a synthetic database (see insert_synthetic_data)."""
+    def build(conn):
+        create_schema(conn)
+        insert_synthetic_data(conn, **kwargs)
+    key = ('synthetic',) + tuple(sorted(kwargs.items()))
+    return clone_database(template_database(key, build), target)
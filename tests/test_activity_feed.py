@@ -0,0 +1,116 @@
+"""Test the per-user activity feed with keyset pagination."""
+import sys
+import unittest
+from pathlib import Path
+
+# Ensure the demo_db module can be found
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from demo_db import (  # noqa: E402
+    ACTIVITY_FEED_QUERY,
+    fetch_activity_feed,
+    fetch_visible_persons_notes,
+)
+from db_fixtures import sample_database, synthetic_database  # noqa: E402
+
+
+def newest_first(conn, user_id):
+    """Reference result: all visible notes sorted by the full visibility query."""
+    rows = [row for row in fetch_visible_persons_notes(conn, user_id) if row.note_id is not None]
+    return sorted(rows, key=lambda row: (row.created_at, row.note_id), reverse=True)
+
+
+class TestActivityFeed(unittest.TestCase):
+    """Test fetch_activity_feed against the full visibility query."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up a synthetic database with overlapping access paths."""
+        cls.conn = synthetic_database(users=8, persons=300, notes_per_person=4,
+                                      grants_per_user=40)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up after tests."""
+        cls.conn.close()
+
+    def collect(self, user_id, limit):
+        rows, before = [], None
+        while True:
+            page, before = fetch_activity_feed(self.conn, user_id, limit, before)
+            self.assertLessEqual(len(page), limit)
+            rows.extend(page)
+            if before is None:
+                return rows
+
+    def test_pages_match_visibility_query(self):
+        """Test that paging through the feed yields every visible note once, newest first."""
+        for user_id in (1, 2, 3):
+            expected = [row.note_id for row in newest_first(self.conn, user_id)]
+            self.assertEqual([row.note_id for row in self.collect(user_id, 17)], expected)
+
+    def test_first_page_and_list_mode(self):
+        """Test the first page and leaving out contents."""
+        expected = newest_first(self.conn, 2)[:5]
+        rows, before = fetch_activity_feed(self.conn, 2, limit=5)
+        self.assertEqual(rows, expected)
+        self.assertEqual(before, (expected[-1].created_at, expected[-1].note_id))
+        rows, _ = fetch_activity_feed(self.conn, 2, limit=5, with_content=False)
+        self.assertEqual([row.content for row in rows], [None] * 5)
+
+    def test_limit_must_be_positive(self):
+        """Test that an empty page size is rejected instead of failing on the token."""
+        for limit in (0, -1):
+            with self.assertRaises(ValueError):
+                fetch_activity_feed(self.conn, 2, limit=limit)
+
+    def test_unknown_user(self):
+        """Test that unknown users get an empty feed."""
+        self.assertEqual(fetch_activity_feed(self.conn, 999), ([], None))
+
+    def test_access_paths_use_indexes(self):
+        """Test that no access path scans the note table."""
+        query = ACTIVITY_FEED_QUERY.format(content='NULL', keyset='', keyset_n='')
+        plan = [row[3] for row in self.conn.execute(
+            'EXPLAIN QUERY PLAN ' + query, {'user_id': 2, 'limit': 50})]
+        self.assertIn('SEARCH note USING COVERING INDEX idx_note_created_by_at (created_by=?)',
+                      plan)
+        self.assertIn('SEARCH note USING COVERING INDEX idx_note_person (person_id=?)', plan)
+        self.assertFalse([line for line in plan if line.startswith('SCAN note')])
+
+    def test_assigned_notes_are_bounded(self):
+        """Test that a user with many assigned notes gets at most limit candidates."""
+        conn = synthetic_database(users=8, persons=300, notes_per_person=4,
+                                  grants_per_user=40)
+        user_id = conn.execute(
+            "INSERT INTO user (username, role) VALUES ('assignee', 'Viewer')").lastrowid
+        conn.execute('INSERT INTO note_assignment (note_id, user_id) '
+                     'SELECT id, ? FROM note ORDER BY id LIMIT 40', (user_id,))
+        expected = [row.note_id for row in newest_first(conn, user_id)]
+        self.assertEqual(len(expected), 40)
+
+        candidates = ACTIVITY_FEED_QUERY.format(
+            content='NULL', keyset='', keyset_n=''
+        ).split('\nSELECT p.id')[0] + '\nSELECT COUNT(*) FROM candidate'
+        self.assertEqual(conn.execute(candidates, {'user_id': user_id, 'limit': 5}).fetchone()[0], 5)
+
+        rows, before = [], None
+        while True:
+            page, before = fetch_activity_feed(conn, user_id, 5, before)
+            rows.extend(page)
+            if before is None:
+                break
+        self.assertEqual([row.note_id for row in rows], expected)
+        conn.close()
+
+    def test_sample_data(self):
+        """Test the feed of a user who sees only some notes of the sample data."""
+        conn = sample_database()
+        rows, before = fetch_activity_feed(conn, 3)
+        self.assertIsNone(before)
+        self.assertEqual(len(rows), len(newest_first(conn, 3)))
+        conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""Test archiving of old notes and time-filtered visibility queries."""
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+# Ensure the demo_db module can be found
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from demo_db import (  # noqa: E402
+    get_connection,
+    create_schema,
+    insert_sample_data,
+    archive_notes,
+    attach_archive,
+    fetch_visible_persons_notes,
+    fetch_visible_persons_with_notes,
+    get_meta,
+    get_users_with_access,
+    user_can_read,
+    user_can_write_note
+)
+
+
+class TestNoteArchive(unittest.TestCase):
+    """Test moving cold notes to an attached archive database."""
+
+    def setUp(self):
+        """Set up a file database whose odd notes are from 2023."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmp.name) / 'live.db'
+        self.archive_path = Path(self.tmp.name) / 'archive.db'
+        self.conn = get_connection(str(self.db_path))
+        create_schema(self.conn)
+        insert_sample_data(self.conn)
+        self.conn.execute("UPDATE note SET created_at = '2025-06-01 12:00:00'")
+        self.conn.execute("UPDATE note SET created_at = '2023-03-01 12:00:00' WHERE id % 2 = 1")
+        self.conn.commit()
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def test_unified_view_keeps_results(self):
+        """Test that archived notes remain visible through the unified view."""
+        before = {u: sorted(fetch_visible_persons_notes(self.conn, u)) for u in (1, 2, 3)}
+        moved = archive_notes(self.conn, datetime(2024, 1, 1), self.archive_path, chunk_size=3)
+        self.assertEqual(moved, 10)
+        self.assertEqual(self.conn.execute('SELECT COUNT(*) FROM main.note').fetchone()[0], 10)
+        self.assertEqual(get_meta(self.conn, 'archive_before'), '2024-01-01 00:00:00')
+        for user_id, rows in before.items():
+            self.assertEqual(sorted(fetch_visible_persons_notes(self.conn, user_id)), rows)
+
+    def test_since_filter_prunes_archive(self):
+        """Test that recent-only queries do not need the archive."""
+        archive_notes(self.conn, '2024-01-01 00:00:00', self.archive_path)
+        recent = fetch_visible_persons_notes(self.conn, 1, since='2025-01-01')
+        self.assertEqual(len(recent), 10)
+        self.assertTrue(all(row['note_id'] % 2 == 0 for row in recent))
+        # Before the watermark the archive is included again
+        self.assertEqual(len(fetch_visible_persons_notes(self.conn, 1, since='2023-01-01')), 20)
+
+    def test_reattach_in_new_connection(self):
+        """Test that a new connection attaches the configured archive by itself."""
+        archive_notes(self.conn, '2024-01-01 00:00:00', self.archive_path)
+        conn = get_connection(str(self.db_path))
+        # Clara keeps access to archived note 1 through its archived assignment
+        note_ids = {row['note_id'] for row in fetch_visible_persons_notes(conn, 3)}
+        self.assertIn(1, note_ids)
+        self.assertEqual(len(note_ids), 6)
+        attach_archive(conn)  # Already attached: a no-op
+        self.assertEqual(len(fetch_visible_persons_notes(conn, 3)), 6)
+        conn.close()
+
+    def test_readers_include_archived_notes(self):
+        """Test the nested query, access lists and read checks on archived notes."""
+        before = {
+            'nested': {u: fetch_visible_persons_with_notes(self.conn, u) for u in (1, 2, 3)},
+            'access': get_users_with_access(self.conn, 'note', 1),
+            'can_read': user_can_read(self.conn, 3, 'note', 1),
+        }
+        archive_notes(self.conn, '2999-01-01', self.archive_path)
+        self.assertEqual(self.conn.execute('SELECT COUNT(*) FROM main.note').fetchone()[0], 0)
+        conn = get_connection(str(self.db_path))
+        for c in (self.conn, conn):
+            for user_id, persons in before['nested'].items():
+                self.assertEqual(fetch_visible_persons_with_notes(c, user_id), persons)
+            self.assertEqual(get_users_with_access(c, 'note', 1), before['access'])
+            self.assertTrue(user_can_read(c, 3, 'note', 1))
+            self.assertTrue(before['can_read'])
+            # Archived notes can be read but no longer edited
+            self.assertFalse(user_can_write_note(c, 1, 1))
+        conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""Test database cloning, the test templates and the online backup."""
+import io
+import sqlite3
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# Ensure the demo_db module can be found
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from demo_db import (  # noqa: E402
+    backup_database,
+    clone_database,
+    fetch_visible_persons_notes,
+    get_connection,
+    main,
+)
+from db_fixtures import sample_database, synthetic_database  # noqa: E402
+
+
+class TestBackup(unittest.TestCase):
+    """Test clone_database, backup_database and the backup command."""
+
+    def setUp(self):
+        """Set up a sample database file."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = str(Path(self.tmp.name) / 'live.db')
+        sample_database(target=self.path).close()
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.tmp.cleanup()
+
+    def test_clones_are_independent(self):
+        """Test that changes to one clone do not leak into the next."""
+        first = sample_database()
+        first.execute('DELETE FROM note_assignment')
+        first.commit()
+        second = sample_database()
+        self.assertEqual(second.execute('SELECT COUNT(*) FROM note_assignment').fetchone()[0], 7)
+        self.assertEqual(second.execute('PRAGMA foreign_keys').fetchone()[0], 1)
+        first.close()
+        second.close()
+
+    def test_synthetic_template(self):
+        """Test cloning a synthetic template with given parameters."""
+        conn = synthetic_database(users=5, persons=50, notes_per_person=2)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM note').fetchone()[0], 100)
+        conn.close()
+
+    def test_clone_from_path(self):
+        """Test cloning a database file into memory."""
+        conn = clone_database(self.path)
+        with get_connection(self.path) as live:
+            self.assertEqual(fetch_visible_persons_notes(conn, 2),
+                             fetch_visible_persons_notes(live, 2))
+        conn.close()
+
+    def test_backup_does_not_block_writer(self):
+        """Test that a writer can commit between backup steps."""
+        writer = sqlite3.connect(self.path, timeout=0)
+        commits = []
+        
+        def progress(done, total):
+            if not commits:
+                writer.execute("UPDATE note SET content = 'during backup' WHERE id = 1")
+                writer.commit()
+                commits.append(done)
+        
+        dest = str(Path(self.tmp.name) / 'backup.db')
+        result = backup_database(self.path, dest, pages=1, sleep=0, progress=progress)
+        writer.close()
+        self.assertEqual(len(commits), 1)
+        self.assertGreater(result['pages'], 1)
+        backup = get_connection(dest)
+        content = backup.execute('SELECT content FROM note WHERE id = 1').fetchone()[0]
+        self.assertEqual(content, 'during backup')
+        self.assertEqual(backup.execute('PRAGMA integrity_check').fetchone()[0], 'ok')
+        backup.close()
+
+    def test_backup_command(self):
+        """Test the backup subcommand."""
+        dest = Path(self.tmp.name) / 'cli-backup.db'
+        main(['--db', self.path, 'backup', str(dest), '--pages', '2', '--sleep', '0'])
+        conn = get_connection(str(dest))
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM user').fetchone()[0], 3)
+        conn.close()
+
+    def test_backup_of_missing_file_fails(self):
+        """Test that a mistyped source path is not created as an empty database."""
+        missing = Path(self.tmp.name) / 'typo.db'
+        with redirect_stdout(io.StringIO()), self.assertRaises(sqlite3.OperationalError):
+            backup_database(str(missing), str(Path(self.tmp.name) / 'copy.db'))
+        self.assertFalse(missing.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""Test the trigger-fed change log and the push subscriptions."""
+import asyncio
+import os
+import queue
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Ensure the demo_db module can be found
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from demo_db import (  # noqa: E402
+    ChangeFeed,
+    ChangeFeedError,
+    assign_person,
+    create_change_log,
+    create_note,
+    find_person_id,
+    get_connection,
+    prune_change_log,
+    update_note_content,
+)
+from db_fixtures import sample_database  # noqa: E402
+
+
+class TestChangeFeed(unittest.TestCase):
+    """Test event routing with a writer on a separate connection."""
+
+    def setUp(self):
+        """Set up a sample database file with the change log enabled."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'changes.db')
+        conn = sample_database(target=self.path)
+        create_change_log(conn)
+        conn.commit()
+        conn.close()
+        self.writer = get_connection(self.path)
+        self.feed = ChangeFeed(self.path, poll_interval=0.01)
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.feed.close()
+        self.writer.close()
+        self.tmp.cleanup()
+
+    def events(self, subscription, count):
+        return [subscription.get(timeout=5) for _ in range(count)]
+
+    def test_grant_reaches_grantee_only(self):
+        """Test that UC-5's grant is pushed to bernd.mueller and nobody else."""
+        bernd, clara = self.feed.subscribe(2), self.feed.subscribe(3)
+        olaf = find_person_id(self.writer, 'Olaf', 'Gemein')
+        assign_person(self.writer, 2, olaf)
+        self.writer.commit()
+        event = bernd.get(timeout=5)
+        self.assertEqual((event.kind, event.user_id, event.person_id), ('person_granted', 2, olaf))
+        with self.assertRaises(queue.Empty):
+            clara.get(timeout=0.1)
+
+    def test_errors_reach_subscribers_and_are_retried(self):
+        """Test that a failing feed reports the error once and then catches up."""
+        anna = self.feed.subscribe(1)
+        with mock.patch.object(self.feed, '_recipients_query',
+                               return_value='SELECT id FROM no_such_table'):
+            update_note_content(self.writer, 1, 'While failing')
+            self.writer.commit()
+            with self.assertRaises(ChangeFeedError):
+                anna.get(timeout=5)
+        self.assertIn('no such table', self.feed.errors[0])
+        event = anna.get(timeout=5)
+        self.assertEqual((event.kind, event.note_id), ('note_updated', 1))
+        with self.assertRaises(queue.Empty):
+            anna.get(timeout=0.1)
+
+    def test_note_events_follow_visibility(self):
+        """Test that note events reach the users who can see the note."""
+        anna, bernd, clara = (self.feed.subscribe(user_id) for user_id in (1, 2, 3))
+        # Note 1 is visible to all three users
+        note_id = 1
+        update_note_content(self.writer, note_id, 'Changed')
+        self.writer.commit()
+        for subscription in (anna, bernd, clara):
+            event = subscription.get(timeout=5)
+            self.assertEqual((event.kind, event.note_id), ('note_updated', note_id))
+        # A note on a person only the admin and the creator can see
+        karl = find_person_id(self.writer, 'Karl', 'Offen')
+        new_id = create_note(self.writer, karl, 2, 'Private')
+        self.writer.commit()
+        self.assertEqual(bernd.get(timeout=5).note_id, new_id)
+        self.assertEqual(anna.get(timeout=5).kind, 'note_created')
+        with self.assertRaises(queue.Empty):
+            clara.get(timeout=0.1)
+
+    def test_revocations_and_unsubscribe(self):
+        """Test revoke events, and that closed subscriptions receive nothing."""
+        clara = self.feed.subscribe(3)
+        revoked = self.writer.execute('DELETE FROM note_assignment WHERE user_id = 3').rowcount
+        self.writer.commit()
+        self.assertGreater(revoked, 0)
+        kinds = {event.kind for event in self.events(clara, revoked)}
+        self.assertEqual(kinds, {'note_revoked'})
+        clara.close()
+        self.writer.execute('DELETE FROM user_person WHERE user_id = 3')
+        self.writer.commit()
+        self.feed.notify()
+        with self.assertRaises(queue.Empty):
+            clara.get(timeout=0.1)
+
+    def test_async_subscription(self):
+        """Test consuming events with async for."""
+        async def consume():
+            subscription = self.feed.subscribe_async(2)
+            loop = asyncio.get_running_loop()
+            
+            def write():
+                conn = get_connection(self.path)
+                assign_person(conn, 2, 5)
+                conn.commit()
+                conn.close()
+            
+            await loop.run_in_executor(None, write)
+            async for event in subscription:
+                return event
+        
+        event = asyncio.run(asyncio.wait_for(consume(), timeout=5))
+        self.assertEqual((event.kind, event.person_id), ('person_granted', 5))
+
+    def test_prune(self):
+        """Test that delivered entries can be pruned from the log."""
+        update_note_content(self.writer, 1, 'Pruned later')
+        self.writer.commit()
+        last = self.writer.execute('SELECT MAX(seq) FROM change_log').fetchone()[0]
+        self.assertEqual(prune_change_log(self.writer, last + 1), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,12 +7,10 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from demo_db import (  # noqa: E402
-    get_connection,
-    create_schema,
-    insert_sample_data,
     Role,
     fetch_visible_persons_notes
 )
+from db_fixtures import sample_database  # noqa: E402
 
 
 class TestEdgeCases(unittest.TestCase):
@@ -20,9 +18,7 @@ class TestEdgeCases(unittest.TestCase):
 
     def setUp(self):
         """Set up test database with sample data."""
-        self.conn = get_connection(':memory:')  # Use in-memory database for testing
-        create_schema(self.conn)
-        insert_sample_data(self.conn)
+        self.conn = sample_database()
 
     def tearDown(self):
         """Clean up after tests."""
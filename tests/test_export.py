@@ -0,0 +1,74 @@
+"""Test the streaming export of visible data."""
+import io
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# Ensure the demo_db module can be found
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from demo_db import (  # noqa: E402
+    export_visible_data,
+    fetch_visible_persons_notes,
+    main,
+    read_records
+)
+from db_fixtures import sample_database  # noqa: E402
+
+
+class TestExport(unittest.TestCase):
+    """Test exporting the rows visible to users."""
+
+    def setUp(self):
+        """Set up test database with sample data and a scratch directory."""
+        self.conn = sample_database()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def test_jsonl_gz_export_matches_query(self):
+        """Test that compressed JSONL output contains every visible row."""
+        path = self.dir / 'export.jsonl.gz'
+        result = export_visible_data(self.conn, [2, 3], path, batch_size=4)
+        records = list(read_records(path))
+        expected = [(user_id, row['note_id'])
+                    for user_id in (2, 3)
+                    for row in fetch_visible_persons_notes(self.conn, user_id)]
+        self.assertEqual([(r['user_id'], r['note_id']) for r in records], expected)
+        self.assertEqual(result['rows'], len(expected))
+
+    def test_csv_export(self):
+        """Test CSV output with a header row."""
+        path = self.dir / 'export.csv'
+        export_visible_data(self.conn, [3], path)
+        records = list(read_records(path))
+        self.assertEqual(len(records), 6)
+        self.assertEqual(records[0]['user_id'], '3')
+        self.assertIn('created_by_username', records[0])
+
+    def test_unsupported_format(self):
+        """Test that unknown extensions are rejected before writing."""
+        with self.assertRaises(ValueError):
+            export_visible_data(self.conn, [1], self.dir / 'export.xml')
+
+    def test_export_command_unknown_user(self):
+        """Test that the export command reports unknown users instead of crashing."""
+        db_path = self.dir / 'live.db'
+        sample_database(target=str(db_path)).close()
+        out = io.StringIO()
+        with redirect_stdout(out):
+            status = main(['--db', str(db_path), 'export', str(self.dir / 'out.jsonl'),
+                           '--user', 'anna.schmitt', '--user', 'nobody', '--user', '99'])
+        self.assertEqual(status, 1)
+        self.assertIn('nobody, 99', out.getvalue())
+        self.assertFalse((self.dir / 'out.jsonl').exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""Test the bulk import pipeline for persons and notes."""
+import gzip
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Ensure the demo_db module can be found
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from demo_db import (  # noqa: E402
+    import_file,
+    import_records,
+    read_records
+)
+from db_fixtures import sample_database  # noqa: E402
+
+
+class TestBulkImport(unittest.TestCase):
+    """Test streaming CSV/JSONL import with validation."""
+
+    def setUp(self):
+        """Set up test database with sample data and a scratch directory."""
+        self.conn = sample_database()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def test_import_csv_persons(self):
+        """Test importing persons from CSV, resolving usernames."""
+        path = self.dir / 'persons.csv'
+        path.write_text(
+            'id,vorname,nachname,email,telefon,created_by\n'
+            '100,Ida,Import,ida@example.com,,clara.schulz\n'
+            '101,Bad,Mail,no-email,,clara.schulz\n'
+            '102,Udo,Unknown,udo@example.com,,nobody\n'
+        )
+        result = import_file(self.conn, 'person', path, batch_size=1)
+        self.assertEqual((result['rows'], result['skipped']), (1, 2))
+        self.assertEqual(len(result['errors']), 2)
+        row = self.conn.execute('SELECT * FROM person WHERE id = 100').fetchone()
+        self.assertEqual((row['created_by'], row['telefon']), (3, None))
+
+    def test_import_gzipped_jsonl_notes(self):
+        """Test importing notes from compressed JSONL."""
+        path = self.dir / 'notes.jsonl.gz'
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            for i in range(10):
+                f.write(json.dumps({'content': f'Imported {i}', 'created_by': 'bernd.mueller',
+                                    'person_id': 3}) + '\n')
+            f.write(json.dumps({'content': 'Orphan', 'created_by': 2, 'person_id': 999}) + '\n')
+        result = import_file(self.conn, 'note', path, batch_size=4)
+        self.assertEqual((result['rows'], result['skipped']), (10, 1))
+        count = self.conn.execute(
+            "SELECT COUNT(*) FROM note WHERE content LIKE 'Imported %' AND created_at IS NOT NULL"
+        ).fetchone()[0]
+        self.assertEqual(count, 10)
+        self.assertGreater(result['rows_per_sec'], 0)
+
+    def test_rebuild_indexes_restores_indexes(self):
+        """Test that indexes dropped for the load are recreated."""
+        def indexes():
+            return {row[0] for row in self.conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'note'"
+            )}
+        before = indexes()
+        records = [{'content': 'x', 'created_by': 1, 'person_id': 1}] * 5
+        result = import_records(self.conn, 'note', records, rebuild_indexes=True)
+        self.assertEqual(result['rows'], 5)
+        self.assertEqual(indexes(), before)
+
+    def test_constraint_violations_are_skipped(self):
+        """Test that rows violating constraints are skipped, not fatal."""
+        records = [
+            {'id': 1, 'vorname': 'Dup', 'nachname': 'Id', 'email': 'd@x.de', 'created_by': 1},
+            {'id': 50, 'vorname': 'New', 'nachname': 'Id', 'email': 'n@x.de', 'created_by': 1},
+        ]
+        result = import_records(self.conn, 'person', records)
+        self.assertEqual((result['rows'], result['skipped']), (1, 1))
+        self.assertIn('UNIQUE', result['errors'][0])
+
+    def test_unsupported_format(self):
+        """Test that unknown file extensions are rejected."""
+        path = self.dir / 'persons.xml'
+        path.write_text('<persons/>')
+        with self.assertRaises(ValueError):
+            list(read_records(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
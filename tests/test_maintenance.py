@@ -0,0 +1,102 @@
+"""Test planner statistics, incremental vacuum and the maintenance scheduler."""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+# Ensure the demo_db module can be found
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from demo_db import (  # noqa: E402
+    MaintenanceScheduler,
+    WriteQueue,
+    create_note,
+    enable_incremental_vacuum,
+    explain_visible_query,
+    get_connection,
+    has_statistics,
+    incremental_vacuum,
+    run_maintenance,
+)
+from db_fixtures import sample_database, synthetic_database  # noqa: E402
+
+
+class TestMaintenance(unittest.TestCase):
+    """Test maintenance on a synthetic database file."""
+
+    def setUp(self):
+        """Set up a synthetic database file."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'maintenance.db')
+        synthetic_database(self.path, users=5, persons=500, notes_per_person=4).close()
+        self.conn = get_connection(self.path)
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def test_statistics_are_collected_once(self):
+        """Test that run_maintenance analyzes only databases without statistics."""
+        self.assertFalse(has_statistics(self.conn))
+        self.assertTrue(run_maintenance(self.conn)['analyzed'])
+        self.assertTrue(has_statistics(self.conn))
+        self.assertFalse(run_maintenance(self.conn)['analyzed'])
+        self.assertTrue(run_maintenance(self.conn, analyze=True)['analyzed'])
+
+    def test_incremental_vacuum_frees_pages(self):
+        """Test that free pages left by deletes are returned in small steps."""
+        self.assertEqual(self.conn.execute('PRAGMA auto_vacuum').fetchone()[0], 2)
+        self.conn.execute('DELETE FROM note WHERE id <= 1000')
+        self.conn.commit()
+        free = self.conn.execute('PRAGMA freelist_count').fetchone()[0]
+        self.assertGreater(free, 4)
+        self.assertEqual(incremental_vacuum(self.conn, pages=2, max_pages=4), 4)
+        self.assertEqual(incremental_vacuum(self.conn, pages=2), free - 4)
+        self.assertEqual(self.conn.execute('PRAGMA freelist_count').fetchone()[0], 0)
+
+    def test_enable_incremental_vacuum(self):
+        """Test converting a database created without auto-vacuum."""
+        path = os.path.join(self.tmp.name, 'plain.db')
+        conn = sqlite3.connect(path)
+        conn.execute('CREATE TABLE t (x)')
+        conn.close()
+        conn = get_connection(path)
+        self.assertEqual(incremental_vacuum(conn), 0)
+        self.assertTrue(enable_incremental_vacuum(conn))
+        self.assertFalse(enable_incremental_vacuum(conn))
+        self.assertEqual(conn.execute('PRAGMA auto_vacuum').fetchone()[0], 2)
+        conn.close()
+
+    def test_explain_visible_query(self):
+        """Test that the plan of the visibility query can be inspected."""
+        plan = explain_visible_query(self.conn, 2, since='2025-01-01')
+        self.assertTrue(any('idx_note_person' in line for line in plan))
+        self.assertEqual(explain_visible_query(self.conn, 999), [])
+
+    def test_scheduler_runs_after_writes(self):
+        """Test that writes reported by the WriteQueue trigger ANALYZE."""
+        with MaintenanceScheduler(self.path, interval=3600, writes_threshold=10) as scheduler:
+            with WriteQueue(self.path, maintenance=scheduler) as writes:
+                for future in [writes.submit(create_note, 1, 2, f'note {i}') for i in range(10)]:
+                    future.result(timeout=5)
+            deadline = time.time() + 5
+            while not scheduler.history and time.time() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(len(scheduler.history), 1)
+        self.assertTrue(scheduler.history[0]['analyzed'])
+        self.assertEqual(scheduler.history[0]['writes'], 10)
+        self.assertTrue(has_statistics(self.conn))
+
+    def test_new_databases_use_incremental_vacuum(self):
+        """Test that create_schema enables incremental auto-vacuum."""
+        conn = sample_database()
+        self.assertEqual(conn.execute('PRAGMA auto_vacuum').fetchone()[0], 2)
+        conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+"""Test the person-grouped visibility API against the flat query."""
+import sys
+import unittest
+from pathlib import Path
+
+# Ensure the demo_db module can be found
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from demo_db import (  # noqa: E402
+    get_connection,
+    create_schema,
+    insert_sample_data,
+    insert_synthetic_data,
+    fetch_visible_persons_notes,
+    fetch_visible_persons_with_notes
+)
+
+
+def flatten(persons):
+    """Convert the nested result into the (person_id, note_id) pairs of the flat query."""
+    pairs = set()
+    for person in persons:
+        if not person['notes']:
+            pairs.add((person['person_id'], None))
+        for note in person['notes']:
+            pairs.add((person['person_id'], note['note_id']))
+    return pairs
+
+
+class TestNestedVisibility(unittest.TestCase):
+    """Test that the nested API matches fetch_visible_persons_notes."""
+
+    def assert_matches_flat(self, conn, user_id):
+        flat = fetch_visible_persons_notes(conn, user_id)
+        nested = fetch_visible_persons_with_notes(conn, user_id)
+        self.assertEqual(flatten(nested), {(r['person_id'], r['note_id']) for r in flat})
+        flat_order = list(dict.fromkeys(r['person_id'] for r in flat))
+        self.assertEqual([p['person_id'] for p in nested], flat_order)
+
+    def test_sample_data(self):
+        """Test all sample users, including a person without notes."""
+        conn = get_connection(':memory:')
+        create_schema(conn)
+        insert_sample_data(conn)
+        conn.execute(
+            "INSERT INTO person (vorname, nachname, email, created_by) "
+            "VALUES ('No', 'Notes', 'no.notes@example.com', 3)"
+        )
+        for user_id in (1, 2, 3):
+            self.assert_matches_flat(conn, user_id)
+        olaf = fetch_visible_persons_with_notes(conn, 3)[1]
+        self.assertEqual(olaf['nachname'], 'Gemein')
+        self.assertEqual(len(olaf['notes']), 4)
+        conn.close()
+
+    def test_synthetic_data(self):
+        """Test random users on a larger generated data set."""
+        conn = get_connection(':memory:')
+        create_schema(conn)
+        insert_synthetic_data(conn, users=10, persons=200, notes_per_person=3)
+        for user_id in range(1, 11):
+            self.assert_matches_flat(conn, user_id)
+        conn.close()
+
+    def test_unknown_user(self):
+        """Test that an unknown user sees nothing."""
+        conn = get_connection(':memory:')
+        create_schema(conn)
+        self.assertEqual(fetch_visible_persons_with_notes(conn, 99), [])
+        conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""Test list-mode queries and compressed note contents."""
+import sys
+import unittest
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+# Ensure the demo_db module can be found
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from demo_db import (  # noqa: E402
+    archive_notes,
+    create_note,
+    enable_content_compression,
+    fetch_note_contents,
+    fetch_visible_persons_notes,
+    fetch_visible_persons_with_notes,
+    import_records,
+    run_uc2,
+    update_note_content,
+)
+from db_fixtures import sample_database  # noqa: E402
+
+LONG_TEXT = 'Gespräch mit Kunde wegen Vertrag. ' * 40
+
+
+class TestNoteContent(unittest.TestCase):
+    """Test lazy content loading and transparent decompression."""
+
+    def setUp(self):
+        """Set up a sample database with one long note."""
+        self.conn = sample_database()
+        update_note_content(self.conn, 1, LONG_TEXT)
+        self.conn.commit()
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.conn.close()
+
+    def stored_type(self, note_id):
+        return self.conn.execute(
+            'SELECT typeof(content) FROM note WHERE id = ?', (note_id,)
+        ).fetchone()[0]
+
+    def test_list_mode_omits_content(self):
+        """Test that list mode returns the same rows without contents."""
+        full = fetch_visible_persons_notes(self.conn, 2)
+        listed = fetch_visible_persons_notes(self.conn, 2, with_content=False)
+        self.assertEqual([row._replace(content=None) for row in full], listed)
+        nested = fetch_visible_persons_with_notes(self.conn, 2, with_content=False)
+        self.assertTrue(all(note['content'] is None
+                            for person in nested for note in person['notes']))
+
+    def test_batch_content_fetch(self):
+        """Test loading contents for the rows of a list view."""
+        rows = fetch_visible_persons_notes(self.conn, 1)
+        expected = {row.note_id: row.content for row in rows}
+        self.assertEqual(fetch_note_contents(self.conn, expected, batch_size=3), expected)
+        self.assertEqual(fetch_note_contents(self.conn, [999]), {})
+
+    def test_compression_is_transparent(self):
+        """Test that compressed contents read back as the original text."""
+        before = {user_id: fetch_visible_persons_notes(self.conn, user_id) for user_id in (1, 2, 3)}
+        nested = fetch_visible_persons_with_notes(self.conn, 3)
+        self.assertEqual(enable_content_compression(self.conn, min_size=100), 1)
+        self.assertEqual(self.stored_type(1), 'blob')
+        self.assertEqual(self.stored_type(2), 'text')  # Short notes stay uncompressed
+        for user_id, rows in before.items():
+            self.assertEqual(fetch_visible_persons_notes(self.conn, user_id), rows)
+        self.assertEqual(fetch_visible_persons_with_notes(self.conn, 3), nested)
+        self.assertEqual(fetch_note_contents(self.conn, [1]), {1: LONG_TEXT})
+
+    def test_writes_follow_compression_setting(self):
+        """Test that new and updated notes are compressed once enabled."""
+        enable_content_compression(self.conn, min_size=100)
+        update_note_content(self.conn, 2, LONG_TEXT)
+        note_id = create_note(self.conn, 1, 1, LONG_TEXT)
+        import_records(self.conn, 'note', [
+            {'id': 500, 'content': LONG_TEXT, 'created_by': 'anna.schmitt', 'person_id': 1}
+        ])
+        for note_id in (2, note_id, 500):
+            self.assertEqual(self.stored_type(note_id), 'blob')
+        self.assertEqual(fetch_note_contents(self.conn, [2, 500]), {2: LONG_TEXT, 500: LONG_TEXT})
+
+    def test_use_case_reads_compressed_content(self):
+        """Test that UC-2 prepends to the decompressed text."""
+        enable_content_compression(self.conn, min_size=100)
+        with patch('sys.stdout', new=StringIO()):
+            run_uc2(self.conn)
+        contents = fetch_note_contents(self.conn, range(1, 30)).values()
+        self.assertTrue(any(content.startswith('Updated: ') for content in contents))
+        self.assertFalse(any("b'" in content for content in contents))
+
+    def test_archived_contents(self):
+        """Test reading compressed contents from the note archive."""
+        enable_content_compression(self.conn, min_size=100)
+        archive_notes(self.conn, '2100-01-01', ':memory:')
+        self.assertEqual(fetch_note_contents(self.conn, [1]), {1: LONG_TEXT})
+        rows = fetch_visible_persons_notes(self.conn, 1)
+        self.assertIn(LONG_TEXT, [row.content for row in rows])
+
+
+if __name__ == '__main__':
+    unittest.main()
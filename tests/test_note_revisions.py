@@ -0,0 +1,158 @@
+"""Test the delta-compressed note revision history."""
+import random
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Ensure the demo_db module can be found
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from demo_db import (  # noqa: E402
+    NOTE_SNAPSHOT_INTERVAL,
+    apply_delta,
+    archive_notes,
+    create_note,
+    enable_content_compression,
+    fetch_note_contents,
+    get_connection,
+    get_note_revision,
+    get_note_revisions,
+    make_delta,
+    update_note_content,
+)
+from db_fixtures import sample_database  # noqa: E402
+
+WORDS = ['Termin', 'Kunde', 'Vertrag', 'offen', 'erledigt', 'bitte', 'prüfen', '\n', '  ']
+
+
+def edit(rng, text):
+    """Randomly insert, delete or replace a few words."""
+    words = text.split(' ')
+    for _ in range(rng.randint(1, 3)):
+        position = rng.randrange(len(words) + 1)
+        action = rng.choice(('insert', 'delete', 'replace'))
+        if action == 'insert' or not words[position:]:
+            words.insert(position, rng.choice(WORDS))
+        elif action == 'delete':
+            del words[position]
+        else:
+            words[position] = rng.choice(WORDS)
+    return ' '.join(words)
+
+
+class TestNoteRevisions(unittest.TestCase):
+    """Test recording and rebuilding note revisions."""
+
+    def setUp(self):
+        """Set up test database with sample data."""
+        self.conn = sample_database()
+        self.original = fetch_note_contents(self.conn, [1])[1]
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.conn.close()
+
+    def test_delta_round_trip(self):
+        """Test that applying a delta rebuilds the new text exactly."""
+        rng = random.Random(1)
+        text = ' '.join(rng.choice(WORDS) for _ in range(200))
+        for _ in range(100):
+            new = edit(rng, text)
+            self.assertEqual(apply_delta(text, make_delta(text, new)), new)
+            text = new
+        self.assertEqual(apply_delta('abc', make_delta('abc', '')), '')
+        self.assertEqual(apply_delta('', make_delta('', 'neu')), 'neu')
+
+    def test_every_revision_can_be_rebuilt(self):
+        """Test rebuilding all revisions across several snapshots."""
+        rng = random.Random(2)
+        long_text = ' '.join(rng.choice(WORDS) for _ in range(100))
+        self.conn.execute('UPDATE note SET content = ? WHERE id = 1', (long_text,))
+        versions = [long_text]
+        for _ in range(3 * NOTE_SNAPSHOT_INTERVAL):
+            versions.append(edit(rng, versions[-1]))
+            update_note_content(self.conn, 1, versions[-1], edited_by=2)
+        revisions = get_note_revisions(self.conn, 1)
+        self.assertEqual([r['revision'] for r in revisions], list(range(1, len(versions) + 1)))
+        self.assertEqual(revisions[0]['edited_by'], 1)  # The note's creator
+        self.assertEqual(revisions[1]['edited_by'], 2)
+        full = [r['revision'] for r in revisions if r['kind'] == 'full']
+        self.assertEqual(full, [1, 1 + NOTE_SNAPSHOT_INTERVAL, 1 + 2 * NOTE_SNAPSHOT_INTERVAL,
+                                1 + 3 * NOTE_SNAPSHOT_INTERVAL])
+        for revision, text in enumerate(versions, start=1):
+            self.assertEqual(get_note_revision(self.conn, 1, revision), text)
+        self.assertIsNone(get_note_revision(self.conn, 1, len(versions) + 1))
+        self.assertEqual(fetch_note_contents(self.conn, [1])[1], versions[-1])
+
+    def test_unchanged_content_is_not_recorded(self):
+        """Test that saving identical content adds no revision."""
+        self.assertTrue(update_note_content(self.conn, 1, self.original))
+        self.assertEqual(get_note_revisions(self.conn, 1), [])
+        self.assertFalse(update_note_content(self.conn, 999, 'x'))
+
+    def test_external_change_becomes_snapshot(self):
+        """Test that edits made outside update_note_content are kept."""
+        update_note_content(self.conn, 1, 'Zweite Fassung')
+        self.conn.execute("UPDATE note SET content = 'Direkt geändert' WHERE id = 1")
+        update_note_content(self.conn, 1, 'Vierte Fassung')
+        self.assertEqual(
+            [get_note_revision(self.conn, 1, r) for r in (1, 2, 3, 4)],
+            [self.original, 'Zweite Fassung', 'Direkt geändert', 'Vierte Fassung']
+        )
+
+    def test_deltas_are_smaller_than_copies(self):
+        """Test that small edits of a long note store small deltas."""
+        enable_content_compression(self.conn, min_size=100)
+        text = 'Gespräch mit Kunde wegen Vertrag und Lieferung. ' * 50
+        update_note_content(self.conn, 1, text)
+        for i in range(5):
+            text = f'Nachtrag {i}. ' + text
+            update_note_content(self.conn, 1, text)
+        sizes = [row[0] for row in self.conn.execute(
+            "SELECT length(data) FROM note_revision WHERE note_id = 1 AND kind = 'delta'"
+        )]
+        self.assertEqual(len(sizes), 5)
+        self.assertTrue(all(size < 50 for size in sizes), sizes)
+        self.assertEqual(get_note_revision(self.conn, 1, 7), text)
+
+    def test_history_is_deleted_with_its_note(self):
+        """Test that a note reusing a deleted note's ID starts without history."""
+        update_note_content(self.conn, 20, 'Bearbeitet')
+        self.conn.execute('DELETE FROM note WHERE id = 20')
+        self.assertEqual(get_note_revisions(self.conn, 20), [])
+        self.assertEqual(create_note(self.conn, 1, 2, 'Neu'), 20)
+        update_note_content(self.conn, 20, 'Neu bearbeitet')
+        self.assertEqual(get_note_revision(self.conn, 20, 1), 'Neu')
+
+    def test_history_moves_to_the_archive(self):
+        """Test that archived notes keep their revision history."""
+        update_note_content(self.conn, 1, 'Zweite Fassung')
+        self.conn.commit()
+        archive_notes(self.conn, '2999-01-01', ':memory:')
+        self.assertEqual(
+            self.conn.execute('SELECT COUNT(*) FROM main.note_revision').fetchone()[0], 0)
+        self.assertEqual(len(get_note_revisions(self.conn, 1)), 2)
+        self.assertEqual(get_note_revision(self.conn, 1, 1), self.original)
+
+    def test_update_holds_the_write_lock(self):
+        """Test that the revision number is allocated under the write lock."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / 'revisions.db')
+            sample_database(target=path).close()
+            conn = get_connection(path)
+            other = sqlite3.connect(path, timeout=0)
+            try:
+                update_note_content(conn, 1, 'Gesperrt')
+                with self.assertRaises(sqlite3.OperationalError):
+                    other.execute('BEGIN IMMEDIATE')
+                conn.commit()
+                other.execute('BEGIN IMMEDIATE')
+                other.rollback()
+            finally:
+                conn.close()
+                other.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+"""Test chunked grant revocation and user offboarding."""
+import io
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# Ensure the demo_db module can be found
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from demo_db import (  # noqa: E402
+    create_visibility_counters,
+    get_note,
+    get_user_role,
+    main,
+    offboard_user,
+    revoke_access,
+    verify_visibility_counts,
+)
+from db_fixtures import sample_database, synthetic_database  # noqa: E402
+
+
+class TestOffboarding(unittest.TestCase):
+    """Test offboard_user and revoke_access on the sample data."""
+
+    def setUp(self):
+        """Set up a fresh sample database."""
+        self.conn = sample_database()
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.conn.close()
+
+    def count(self, query, *params):
+        return self.conn.execute(query, params).fetchone()[0]
+
+    def test_offboard_reassigns_and_removes_user(self):
+        """Test that ownership moves to the new owner and the user is deleted."""
+        create_visibility_counters(self.conn)
+        persons = self.count('SELECT COUNT(*) FROM person WHERE created_by = 2')
+        notes = self.count('SELECT COUNT(*) FROM note WHERE created_by = 2')
+        note_id = self.count('SELECT MIN(id) FROM note WHERE created_by = 2')
+        result = offboard_user(self.conn, 2, 1)
+        self.assertEqual((result['persons'], result['notes']), (persons, notes))
+        self.assertGreater(result['person_grants'], 0)
+        self.assertIsNone(get_user_role(self.conn, 2))
+        self.assertEqual(self.count('SELECT COUNT(*) FROM note WHERE created_by = 2'), 0)
+        self.assertEqual(self.count('SELECT COUNT(*) FROM user_person WHERE user_id = 2'), 0)
+        self.assertEqual(get_note(self.conn, note_id)['created_by'], 1)
+        self.assertEqual(get_note(self.conn, note_id)['version'], 2)
+        self.assertEqual(verify_visibility_counts(self.conn), [])
+        self.assertFalse(self.conn.in_transaction)
+
+    def test_revoke_reports_progress(self):
+        """Test that revoking in chunks of one row reports every chunk."""
+        grants = self.count('SELECT COUNT(*) FROM user_person WHERE user_id = 3')
+        calls = []
+        result = revoke_access(self.conn, 3, chunk_size=1, pause=0,
+                               progress=lambda *args: calls.append(args))
+        self.assertEqual(result['person_grants'], grants)
+        self.assertEqual(result['chunks'], len(calls))
+        self.assertEqual(calls[-1][0], 'note_grants')
+        self.assertIn(('person_grants', grants, grants), calls)
+        self.assertIsNotNone(get_user_role(self.conn, 3))
+
+    def test_chunks_shrink_to_lock_budget(self):
+        """Test that a tiny lock budget reduces chunks to single rows."""
+        conn = synthetic_database(users=4, persons=200, notes_per_person=2)
+        notes = conn.execute('SELECT COUNT(*) FROM note WHERE created_by = 2').fetchone()[0]
+        result = offboard_user(conn, 2, 1, chunk_size=100, lock_budget=1e-9, pause=0)
+        self.assertEqual(result['notes'], notes)
+        self.assertGreater(result['chunks'], notes)
+        conn.close()
+
+    def test_invalid_users(self):
+        """Test that the new owner must be another existing user."""
+        with self.assertRaises(ValueError):
+            offboard_user(self.conn, 2, 2)
+        with self.assertRaises(ValueError):
+            offboard_user(self.conn, 2, 99)
+        self.assertIsNotNone(get_user_role(self.conn, 2))
+
+    def test_rows_added_during_offboarding_are_reassigned(self):
+        """Test that a note created after its step ran is handled before the delete."""
+        added = []
+
+        def progress(step, done, total):
+            if step == 'note_grants' and done == total and not added:
+                self.conn.execute(
+                    "INSERT INTO note (content, created_by, person_id) VALUES ('Spät', 2, 1)")
+                self.conn.commit()
+                added.append(True)
+
+        notes = self.count('SELECT COUNT(*) FROM note WHERE created_by = 2')
+        result = offboard_user(self.conn, 2, 1, pause=0, progress=progress)
+        self.assertEqual(result['notes'], notes + 1)
+        self.assertIsNone(get_user_role(self.conn, 2))
+        self.assertEqual(self.count('SELECT COUNT(*) FROM note WHERE created_by = 2'), 0)
+
+    def test_offboard_command_unknown_user(self):
+        """Test that the offboard command reports unknown users instead of crashing."""
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = str(Path(tmp) / 'live.db')
+            sample_database(target=db_path).close()
+            out = io.StringIO()
+            with redirect_stdout(out):
+                status = main(['--db', db_path, 'offboard', 'nobody', '--to', 'anna.schmitt'])
+            self.assertEqual(status, 1)
+            self.assertIn('Unknown user(s): nobody', out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""Test the person search API and its trigram index."""
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Ensure the demo_db module can be found
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import demo_db  # noqa: E402
+from demo_db import (  # noqa: E402
+    create_person_search,
+    search_persons,
+)
+from db_fixtures import sample_database  # noqa: E402
+
+
+def ids(rows):
+    return [row['person_id'] for row in rows]
+
+
+class TestPersonSearch(unittest.TestCase):
+    """Test search_persons with and without the trigram index."""
+
+    def setUp(self):
+        """Set up one database with and one without the search index."""
+        self.conn = sample_database()
+        self.assertTrue(create_person_search(self.conn))
+        self.plain = sample_database()
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.conn.close()
+        self.plain.close()
+
+    def test_substring_match_on_all_columns(self):
+        """Test case-insensitive matches on vorname, nachname and email."""
+        for conn in (self.conn, self.plain):
+            self.assertEqual(ids(search_persons(conn, 1, 'gem')), [5])
+            self.assertEqual(ids(search_persons(conn, 1, 'KARL')), [3])
+            self.assertEqual(ids(search_persons(conn, 1, 'privat@')), [4])
+            self.assertEqual(ids(search_persons(conn, 1, 'a')), [1, 5, 3, 4, 2])
+
+    def test_results_filtered_by_visibility(self):
+        """Test that users only find persons they can see."""
+        for conn in (self.conn, self.plain):
+            self.assertEqual(ids(search_persons(conn, 2, 'example')), [1, 3, 4])
+            self.assertEqual(ids(search_persons(conn, 3, 'example')), [1, 5, 2])
+            self.assertEqual(search_persons(conn, 3, 'Offen'), [])
+            self.assertEqual(search_persons(conn, 99, 'Offen'), [])
+
+    def test_limit_and_special_characters(self):
+        """Test the result limit and that LIKE/FTS syntax is taken literally."""
+        self.assertEqual(len(search_persons(self.conn, 1, 'example', limit=2)), 2)
+        # The first matches by ID (Beispiel, Team), not by name (Beispiel, Gemein)
+        for conn in (self.conn, self.plain):
+            self.assertEqual(ids(search_persons(conn, 1, 'example', limit=2)), [1, 2])
+        for query in ('%', '_', '"', 'a OR b', ''):
+            self.assertEqual(search_persons(self.conn, 1, query), [], query)
+
+    def test_index_follows_person_changes(self):
+        """Test that the triggers keep the search index in sync."""
+        self.conn.execute(
+            "INSERT INTO person (id, vorname, nachname, email, created_by) "
+            "VALUES (6, 'Zora', 'Neu', 'zora@example.org', 1)"
+        )
+        self.assertEqual(ids(search_persons(self.conn, 1, 'zora')), [6])
+        self.conn.execute("UPDATE person SET nachname = 'Umbenannt' WHERE id = 6")
+        self.assertEqual(ids(search_persons(self.conn, 1, 'umbenannt')), [6])
+        self.conn.execute('DELETE FROM person WHERE id = 6')
+        self.assertEqual(search_persons(self.conn, 1, 'zora'), [])
+
+    def test_fallback_for_frequent_terms(self):
+        """Test that users still get all matches when candidates are capped."""
+        with mock.patch.object(demo_db, 'SEARCH_CANDIDATE_LIMIT', 1):
+            self.assertEqual(ids(search_persons(self.conn, 3, 'example')), [1, 5, 2])
+
+    def test_exact_name_lookup_uses_index(self):
+        """Test that the exact-name lookup of UC-4/UC-5 uses the composite index."""
+        plan = ' '.join(row[3] for row in self.conn.execute(
+            'EXPLAIN QUERY PLAN SELECT id FROM person WHERE vorname = ? AND nachname = ?',
+            ('Olaf', 'Gemein')
+        ))
+        self.assertIn('idx_person_name', plan)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+"""Test the profiling mode of the demo run."""
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Ensure the demo_db module can be found
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import demo_db  # noqa: E402
+from db_fixtures import sample_database  # noqa: E402
+from demo_db import (  # noqa: E402
+    PhaseProfiler,
+    PROFILE_PHASES,
+    profile_use_cases,
+)
+
+
+class TestProfile(unittest.TestCase):
+    """Test phase attribution and the profile report."""
+
+    def setUp(self):
+        """Set up a sample database and a report location."""
+        self.conn = sample_database()
+        self.conn.commit()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.report = os.path.join(self.tmp.name, 'report.txt')
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def test_report_covers_all_phases(self):
+        """Test that every phase is timed and the report is written."""
+        stats = profile_use_cases(self.conn, self.report, repeat=2, top=5)
+        for phase in PROFILE_PHASES:
+            self.assertGreater(stats[phase]['calls'], 0, phase)
+            self.assertGreater(stats[phase]['seconds'], 0, phase)
+        with open(self.report, encoding='utf-8') as f:
+            report = f.read()
+        self.assertIn('access-list lookup', report)
+        self.assertIn('cumulative', report)
+        self.assertIn('tracemalloc', report)
+
+    def test_source_database_unchanged(self):
+        """Test that profiling runs on copies of the database."""
+        before = self.conn.execute('SELECT COUNT(*) FROM note').fetchone()[0]
+        profile_use_cases(self.conn, self.report, repeat=1)
+        self.assertEqual(self.conn.execute('SELECT COUNT(*) FROM note').fetchone()[0], before)
+
+    def test_instrumentation_is_removed(self):
+        """Test that the wrapped functions are restored afterwards."""
+        original = demo_db.get_users_with_access
+        with PhaseProfiler().instrument():
+            self.assertIsNot(demo_db.get_users_with_access, original)
+        self.assertIs(demo_db.get_users_with_access, original)
+
+
+if __name__ == '__main__':
+    unittest.main()
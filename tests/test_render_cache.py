@@ -0,0 +1,141 @@
+"""Test incremental re-rendering of the user tables with the render cache."""
+import io
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from tabulate import tabulate
+
+# Ensure the demo_db module can be found
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from demo_db import (  # noqa: E402
+    assign_person,
+    calculate_column_widths,
+    format_table_data,
+    get_connection,
+    get_users_with_access,
+    print_user_tables,
+    render_table,
+    state_tracking,
+    update_note_content,
+)
+from db_fixtures import sample_database  # noqa: E402
+
+
+class TestRenderCache(unittest.TestCase):
+    """Test render_table and the RenderCache used by print_user_tables."""
+
+    def setUp(self):
+        """Set up a sample database and reset the change tracking of the use cases."""
+        self.conn = sample_database()
+        state_tracking.update(persons={}, notes={}, current_usecase=0)
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.conn.close()
+
+    def render(self, conn, user_id=1):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            print_user_tables(conn, user_id, 'Test')
+        return output.getvalue()
+
+    def test_matches_tabulate_grid(self):
+        """Test that render_table produces tabulate's grid output."""
+        rows = [
+            {'ID': 1, 'Name': 'Max Mustermann', 'Visible For': ['anna', 'bernd'], 'Changes': ''},
+            {'ID': 22, 'Name': 'A rather long name that has to be wrapped', 'Visible For': [],
+             'Changes': None},
+        ]
+        widths = calculate_column_widths(rows)
+        expected = tabulate(format_table_data(rows, widths), headers='keys', tablefmt='grid')
+        self.assertEqual(render_table(rows, widths), expected)
+        self.assertEqual(render_table([], {}), '')
+
+    def test_unchanged_rows_are_reused(self):
+        """Test that a second render reuses every row and access list."""
+        first = self.render(self.conn)
+        cache = self.conn.render_cache
+        misses, access = cache.misses, len(cache.access)
+        self.assertEqual(self.render(self.conn), first)
+        self.assertEqual((cache.misses, len(cache.access)), (misses, access))
+        self.assertFalse(self.conn.in_transaction)
+
+    def test_changed_entities_are_recomputed(self):
+        """Test that grants and note edits through the connection show up."""
+        self.render(self.conn)
+        cache = self.conn.render_cache
+        misses = cache.misses
+        assign_person(self.conn, 2, 5)
+        update_note_content(self.conn, 1, 'Edited')
+        self.conn.commit()
+        output = self.render(self.conn)
+        self.assertIn('bernd.mueller', cache.access[('person', 5)])
+        self.assertIn('Edited', output)
+        # Only the changed rows were formatted again
+        self.assertLess(cache.misses - misses, 20)
+        self.assertIn(('note', 2), cache.access)
+
+    def test_user_changes_invalidate_everything(self):
+        """Test that renaming a user refreshes all access lists."""
+        self.render(self.conn)
+        self.conn.execute("UPDATE user SET username = 'anna.neu' WHERE id = 1")
+        output = self.render(self.conn)
+        self.assertNotIn('anna.schmitt', output)
+
+    def test_user_delete_invalidates_everything(self):
+        """Test that a deleted admin disappears from every access list."""
+        self.conn.execute("INSERT INTO user (username, role) VALUES ('temp.admin', 'Admin')")
+        self.conn.commit()
+        self.assertIn('temp.admin', self.render(self.conn))
+        self.conn.execute("DELETE FROM user WHERE username = 'temp.admin'")
+        self.conn.commit()
+        self.assertNotIn('temp.admin', self.render(self.conn))
+
+    def test_note_delete_is_recorded(self):
+        """Test that deleting a note drops its access list."""
+        self.render(self.conn)
+        self.assertIn(('note', 19), self.conn.render_cache.access)
+        # Note 19 has no assignments whose delete triggers would record it
+        self.conn.execute('DELETE FROM note WHERE id = 19')
+        self.conn.commit()
+        self.render(self.conn)
+        self.assertNotIn(('note', 19), self.conn.render_cache.access)
+
+    def test_note_insert_reusing_an_id(self):
+        """Test that a new note never shows the access list of a deleted one."""
+        self.render(self.conn)
+        # Delete and re-insert before the next render, so only the insert is new
+        self.conn.execute('DELETE FROM note WHERE id = 20')
+        self.conn.execute('DELETE FROM render_changes')
+        self.conn.execute(
+            "INSERT INTO note (id, content, created_by, person_id) VALUES (20, 'Neu', 2, 3)")
+        self.conn.commit()
+        self.render(self.conn)
+        self.assertEqual(self.conn.render_cache.access[('note', 20)],
+                         get_users_with_access(self.conn, 'note', 20))
+
+    def test_commits_by_other_connections(self):
+        """Test that changes committed elsewhere invalidate the access lists."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / 'render.db')
+            self.conn.commit()
+            target = get_connection(path)
+            self.conn.backup(target)
+            target.close()
+            conn = get_connection(path)
+            other = get_connection(path)
+            self.render(conn)
+            other.execute('INSERT INTO user_person (user_id, person_id) VALUES (2, 5)')
+            other.commit()
+            self.render(conn)
+            self.assertIn('bernd.mueller', conn.render_cache.access[('person', 5)])
+            other.close()
+            conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
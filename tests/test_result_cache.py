@@ -0,0 +1,119 @@
+"""Test the read-through cache for visible persons and notes."""
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Ensure the demo_db module can be found
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from demo_db import (  # noqa: E402
+    get_connection,
+    create_schema,
+    insert_sample_data,
+    create_version_tracking,
+    get_data_version,
+    fetch_visible_persons_notes,
+    VisibleDataCache
+)
+from db_fixtures import sample_database  # noqa: E402
+
+
+class TestVisibleDataCache(unittest.TestCase):
+    """Test caching, validation and eviction of visible data pages."""
+
+    def setUp(self):
+        """Set up test database with sample data and version tracking."""
+        self.conn = sample_database()
+        create_version_tracking(self.conn)
+        self.conn.commit()
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.conn.close()
+
+    def test_repeated_fetch_is_a_hit(self):
+        """Test that a second fetch is served from the cache."""
+        cache = VisibleDataCache()
+        first = cache.fetch(self.conn, 3)
+        second = cache.fetch(self.conn, 3)
+        self.assertEqual(first, second)
+        self.assertEqual(first, fetch_visible_persons_notes(self.conn, 3))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_write_invalidates_entries(self):
+        """Test that any data change bumps the version and forces a re-read."""
+        cache = VisibleDataCache()
+        cache.fetch(self.conn, 3)
+        version = get_data_version(self.conn)
+        self.conn.execute("UPDATE note SET content = 'Changed' WHERE id = 17")
+        self.conn.commit()
+        self.assertNotEqual(get_data_version(self.conn), version)
+        rows = cache.fetch(self.conn, 3)
+        self.assertIn('Changed', [row['content'] for row in rows])
+        self.assertEqual(cache.misses, 2)
+
+    def test_fallback_without_version_tracking(self):
+        """Test that own writes invalidate entries without the trigger counter."""
+        conn = get_connection(':memory:')
+        create_schema(conn)
+        insert_sample_data(conn)
+        cache = VisibleDataCache()
+        cache.fetch(conn, 1)
+        conn.execute("DELETE FROM note_assignment WHERE note_id = 20")
+        cache.fetch(conn, 1)
+        self.assertEqual(cache.misses, 2)
+        conn.close()
+
+    def test_fallback_across_reopened_connections(self):
+        """Test that a new connection never reuses a closed one's stamp."""
+        def read_through(cache, path):
+            reader = get_connection(path)
+            try:
+                return cache.fetch(reader, 3)
+            finally:
+                reader.close()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / 'cache.db')
+            sample_database(target=path).close()
+            cache = VisibleDataCache()
+            writer = get_connection(path)
+            for i in range(20):
+                writer.execute("UPDATE note SET content = ? WHERE id = 17", (f'Edit {i}',))
+                writer.commit()
+                rows = read_through(cache, path)
+                self.assertIn(f'Edit {i}', [row['content'] for row in rows])
+            writer.close()
+            self.assertEqual(cache.hits, 0)
+
+    def test_plain_connections_are_not_cached(self):
+        """Test that connections without a cache token bypass the cache."""
+        conn = sqlite3.connect(':memory:')
+        self.assertIsNone(get_data_version(conn))
+        conn.close()
+
+    def test_pages_match_full_result(self):
+        """Test that cached pages concatenate to the full result."""
+        cache = VisibleDataCache()
+        pages = [cache.fetch(self.conn, 1, page=i, page_size=8) for i in range(3)]
+        self.assertEqual(sum(pages, []), fetch_visible_persons_notes(self.conn, 1))
+
+    def test_eviction_bounds_entries_and_bytes(self):
+        """Test that least recently used entries are evicted."""
+        cache = VisibleDataCache(max_entries=2)
+        for user_id in (1, 2, 3):
+            cache.fetch(self.conn, user_id)
+        self.assertEqual(cache.evictions, 1)
+        cache.fetch(self.conn, 1)
+        self.assertEqual(cache.misses, 4)
+
+        small = VisibleDataCache(max_bytes=1000)
+        small.fetch(self.conn, 3)
+        small.fetch(self.conn, 2)
+        self.assertLessEqual(small.current_bytes, 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
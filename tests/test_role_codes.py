@@ -0,0 +1,103 @@
+"""Test integer role storage, the admin lookup cache and the role migration."""
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+
+# Ensure the demo_db module can be found
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from demo_db import (  # noqa: E402
+    create_version_tracking,
+    fetch_visible_persons_notes,
+    get_admin_usernames,
+    get_role_storage,
+    get_users_with_access,
+    migrate_role_codes,
+    role_to_db,
+    Role
+)
+from db_fixtures import sample_database  # noqa: E402
+
+
+class TestRoleCodes(unittest.TestCase):
+    """Test the integer-coded role storage mode."""
+
+    def setUp(self):
+        """Set up one database per role storage mode."""
+        self.text_conn = sample_database()
+        self.int_conn = sample_database(role_storage='int')
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.text_conn.close()
+        self.int_conn.close()
+
+    def test_storage_detection(self):
+        """Test that the storage mode is detected and roles are encoded."""
+        self.assertEqual(get_role_storage(self.text_conn), 'text')
+        self.assertEqual(get_role_storage(self.int_conn), 'int')
+        self.assertEqual(role_to_db(self.int_conn, 'Viewer'), 3)
+        stored = self.int_conn.execute('SELECT role FROM user WHERE id = 1').fetchone()[0]
+        self.assertEqual(Role.from_db(stored), Role.ADMIN)
+
+    def test_invalid_role_code_fails(self):
+        """Test that unknown role codes are rejected."""
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.int_conn.execute("INSERT INTO user (username, role) VALUES ('x', 9)")
+
+    def test_same_visibility_in_both_modes(self):
+        """Test that both storage modes produce identical results."""
+        def rows(conn, user_id):
+            # The templates may have been built in different seconds
+            return [row._replace(created_at=None)
+                    for row in fetch_visible_persons_notes(conn, user_id)]
+        
+        for user_id in (1, 2, 3):
+            self.assertEqual(rows(self.text_conn, user_id), rows(self.int_conn, user_id))
+            self.assertEqual(get_users_with_access(self.text_conn, 'note', user_id),
+                             get_users_with_access(self.int_conn, 'note', user_id))
+
+    def test_admin_lookup_uses_partial_index(self):
+        """Test that the admin query is answered from the partial index."""
+        plan = ' '.join(
+            row[3] for row in self.int_conn.execute(
+                'EXPLAIN QUERY PLAN SELECT username FROM user WHERE role = 1 ORDER BY username'
+            )
+        )
+        self.assertIn('idx_user_admin', plan)
+
+    def test_admin_cache_is_invalidated(self):
+        """Test that the cached admin set follows changes to the user table."""
+        create_version_tracking(self.int_conn)
+        self.assertEqual(get_admin_usernames(self.int_conn), ['anna.schmitt'])
+        self.assertIsNotNone(self.int_conn.admin_usernames)
+        self.int_conn.execute('UPDATE user SET role = 1 WHERE id = 3')
+        self.assertEqual(get_admin_usernames(self.int_conn), ['anna.schmitt', 'clara.schulz'])
+
+    def test_migration_preserves_data(self):
+        """Test migrating an existing text-role database to integer codes."""
+        create_version_tracking(self.text_conn)
+        self.text_conn.commit()
+        before = {u: fetch_visible_persons_notes(self.text_conn, u) for u in (1, 2, 3)}
+        migrate_role_codes(self.text_conn)
+        self.assertEqual(get_role_storage(self.text_conn), 'int')
+        for user_id, rows in before.items():
+            self.assertEqual(fetch_visible_persons_notes(self.text_conn, user_id), rows)
+        self.assertEqual(
+            self.text_conn.execute('PRAGMA foreign_keys').fetchone()[0], 1
+        )
+        triggers = {row[0] for row in self.text_conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'user'"
+        )}
+        self.assertIn('user_update_version', triggers)
+        # Foreign keys from other tables still resolve to the rebuilt table
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.text_conn.execute(
+                "INSERT INTO person (vorname, nachname, email, created_by) "
+                "VALUES ('A', 'B', 'a@b.c', 99)"
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""Test row versions and compare-and-swap updates of notes and persons."""
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Ensure the demo_db module can be found
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from demo_db import (  # noqa: E402
+    VersionConflictError,
+    create_schema,
+    get_connection,
+    get_note,
+    get_note_revisions,
+    get_person,
+    update_note_content,
+    update_person,
+)
+from db_fixtures import sample_database  # noqa: E402
+
+
+class TestRowVersions(unittest.TestCase):
+    """Test version bumps and conflict detection."""
+
+    def setUp(self):
+        """Set up a fresh sample database."""
+        self.conn = sample_database()
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.conn.close()
+
+    def test_note_compare_and_swap(self):
+        """Test that only the update based on the current version succeeds."""
+        note = get_note(self.conn, 1)
+        self.assertEqual(note['version'], 1)
+        self.assertEqual(update_note_content(self.conn, 1, 'First', expected_version=1), 2)
+        with self.assertRaises(VersionConflictError) as raised:
+            update_note_content(self.conn, 1, 'Second', expected_version=1)
+        self.assertEqual((raised.exception.expected, raised.exception.actual), (1, 2))
+        self.assertEqual(get_note(self.conn, 1)['content'], 'First')
+        self.assertEqual(len(get_note_revisions(self.conn, 1)), 2)
+
+    def test_unconditional_update_bumps_version(self):
+        """Test that updates without an expected version still invalidate readers."""
+        self.assertEqual(update_note_content(self.conn, 2, 'Blind'), 2)
+        self.assertEqual(update_note_content(self.conn, 2, 'Blind'), 3)
+        self.assertIsNone(update_note_content(self.conn, 999, 'x'))
+        self.assertIsNone(get_note(self.conn, 999))
+
+    def test_person_compare_and_swap(self):
+        """Test person updates with and without an expected version."""
+        self.assertEqual(update_person(self.conn, 1, {'telefon': '0123'}), 2)
+        self.assertEqual(update_person(self.conn, 1, {'email': 'neu@example.com'},
+                                       expected_version=2), 3)
+        with self.assertRaises(VersionConflictError):
+            update_person(self.conn, 1, {'vorname': 'Alt'}, expected_version=2)
+        person = get_person(self.conn, 1)
+        self.assertEqual((person['telefon'], person['email'], person['version']),
+                         ('0123', 'neu@example.com', 3))
+        with self.assertRaises(VersionConflictError) as raised:
+            update_person(self.conn, 999, {'telefon': '1'}, expected_version=1)
+        self.assertIsNone(raised.exception.actual)
+        self.assertIsNone(update_person(self.conn, 999, {'telefon': '1'}))
+        with self.assertRaises(ValueError):
+            update_person(self.conn, 1, {'created_by': 2})
+
+    def test_conflict_between_connections(self):
+        """Test that an editor working from a stale read loses against a committed edit."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'versions.db')
+            sample_database(target=path).close()
+            alice, bob = get_connection(path), get_connection(path)
+            try:
+                alice_note, bob_note = get_note(alice, 5), get_note(bob, 5)
+                update_note_content(alice, 5, 'Alice', expected_version=alice_note['version'])
+                alice.commit()
+                with self.assertRaises(VersionConflictError):
+                    update_note_content(bob, 5, 'Bob', expected_version=bob_note['version'])
+                bob.rollback()
+                self.assertEqual(get_note(bob, 5)['content'], 'Alice')
+            finally:
+                alice.close()
+                bob.close()
+
+    def test_existing_database_is_migrated(self):
+        """Test that create_schema adds the version column to older databases."""
+        conn = get_connection(':memory:')
+        conn.execute("CREATE TABLE user (id INTEGER PRIMARY KEY, username TEXT NOT NULL UNIQUE, "
+                     "role TEXT NOT NULL)")
+        conn.execute("CREATE TABLE person (id INTEGER PRIMARY KEY, vorname TEXT NOT NULL, "
+                     "nachname TEXT NOT NULL, email TEXT NOT NULL, telefon TEXT, "
+                     "created_by INTEGER NOT NULL)")
+        conn.execute("INSERT INTO user VALUES (1, 'anna.schmitt', 'Admin')")
+        conn.execute("INSERT INTO person VALUES (1, 'Max', 'Beispiel', 'max@example.com', "
+                     "NULL, 1)")
+        create_schema(conn)
+        self.assertEqual(get_person(conn, 1)['version'], 1)
+        self.assertEqual(update_person(conn, 1, {'telefon': '1'}, expected_version=1), 2)
+        create_schema(conn)  # Idempotent
+        conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,11 +7,7 @@ from pathlib import Path
 # Ensure the demo_db module can be found
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # noqa: E402
 
-from demo_db import (  # noqa: E402
-    get_connection,
-    create_schema,
-    insert_sample_data
-)
+from db_fixtures import sample_database  # noqa: E402
 
 
 class TestSampleData(unittest.TestCase):
@@ -19,9 +15,7 @@ class TestSampleData(unittest.TestCase):
 
     def setUp(self):
         """Set up test database with sample data."""
-        self.conn = get_connection(":memory:")
-        create_schema(self.conn)
-        insert_sample_data(self.conn)
+        self.conn = sample_database()
 
     def tearDown(self):
         """Clean up after tests."""
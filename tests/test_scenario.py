@@ -0,0 +1,88 @@
+"""Test the non-interactive scenario runner."""
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Ensure the demo_db module can be found
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from demo_db import (  # noqa: E402
+    get_connection,
+    create_schema,
+    insert_sample_data,
+    load_scenario,
+    run_scenario
+)
+
+
+class TestScenarioRunner(unittest.TestCase):
+    """Test replaying use-case operations from a script."""
+
+    def setUp(self):
+        """Set up a file database with sample data."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = str(Path(self.tmp.name) / 'scenario.db')
+        conn = get_connection(self.db_path)
+        create_schema(conn)
+        insert_sample_data(conn)
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.tmp.cleanup()
+
+    def write_script(self, operations):
+        path = Path(self.tmp.name) / 'script.jsonl'
+        path.write_text('\n'.join(json.dumps(op) for op in operations))
+        return path
+
+    def test_use_case_scenario(self):
+        """Test that the shipped scenario reproduces the use cases."""
+        operations = load_scenario(ROOT / 'scenarios' / 'use_cases.jsonl')
+        result = run_scenario(self.db_path, operations)
+        self.assertEqual((result['denied'], result['errors']), (0, 0))
+        self.assertEqual(result['latency']['read'].count, 4)
+        conn = get_connection(self.db_path)
+        self.assertEqual(conn.execute('SELECT content FROM note WHERE id = 9').fetchone()[0],
+                         'Updated: Note 9 for person 3')
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM note').fetchone()[0], 21)
+        self.assertIsNotNone(conn.execute(
+            'SELECT 1 FROM user_person WHERE user_id = 2 AND person_id = 5').fetchone())
+        conn.close()
+
+    def test_concurrent_repeated_operations(self):
+        """Test many repeated operations across threads."""
+        path = self.write_script([
+            {'op': 'read', 'user': 3, 'repeat': 50},
+            {'op': 'create_note', 'user': 'bernd.mueller', 'person': 3, 'repeat': 50},
+        ])
+        result = run_scenario(self.db_path, load_scenario(path), threads=4)
+        self.assertEqual(result['errors'], 0)
+        self.assertEqual(result['latency']['create_note'].count, 50)
+        conn = get_connection(self.db_path)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM note').fetchone()[0], 70)
+        conn.close()
+
+    def test_permission_denied_and_errors(self):
+        """Test that forbidden and failing operations are counted."""
+        path = self.write_script([
+            {'op': 'update_note', 'user': 'clara.schulz', 'note_id': 9},
+            {'op': 'assign_person', 'user': 'bernd.mueller', 'grantee': 3, 'person': 1},
+            {'op': 'read', 'user': 'nobody'},
+        ])
+        result = run_scenario(self.db_path, load_scenario(path))
+        self.assertEqual((result['denied'], result['errors']), (2, 1))
+
+    def test_unknown_operation(self):
+        """Test that invalid scripts are rejected when loading."""
+        path = self.write_script([{'op': 'drop_tables', 'user': 1}])
+        with self.assertRaises(ValueError):
+            load_scenario(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+"""Test the HTTP/JSON API server."""
+import http.client
+import io
+import json
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stderr
+from pathlib import Path
+from unittest import mock
+from urllib.parse import urlencode
+
+# Ensure the demo_db module can be found
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from demo_db import (  # noqa: E402
+    create_note,
+    create_schema,
+    enable_tenants,
+    get_connection,
+    insert_sample_data,
+)
+from server import ShowcaseServer  # noqa: E402
+
+
+class TestServer(unittest.TestCase):
+    """Test the JSON endpoints against the sample data."""
+
+    def setUp(self):
+        """Start a server on a free port backed by a temporary database."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = str(Path(self.tmp.name) / 'server.db')
+        conn = get_connection(self.db_path)
+        create_schema(conn)
+        insert_sample_data(conn)
+        conn.commit()
+        conn.close()
+        self.server = ShowcaseServer(('127.0.0.1', 0), self.db_path, workers=2)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.client = http.client.HTTPConnection('127.0.0.1', self.server.server_port)
+
+    def tearDown(self):
+        """Stop the server and clean up."""
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        self.client.request(method, path, body=data)
+        response = self.client.getresponse()
+        return response.status, json.loads(response.read())
+
+    def test_read_endpoints(self):
+        """Test visible rows, nested persons and access lists."""
+        status, rows = self.request('GET', '/users/3/visible')
+        self.assertEqual((status, len(rows)), (200, 6))
+        self.assertIn('created_by_username', rows[0])
+        status, persons = self.request('GET', '/users/3/persons')
+        self.assertEqual([p['nachname'] for p in persons], ['Beispiel', 'Gemein', 'Team'])
+        status, users = self.request('GET', '/access/note/1')
+        self.assertEqual(users, ['anna.schmitt', 'bernd.mueller', 'clara.schulz'])
+
+    def test_tenant_requires_tenant_mode(self):
+        """Test that a tenant parameter is rejected on a single-tenant database."""
+        for path in ('/access/note/1', '/users/3/persons', '/users/3/feed'):
+            status, result = self.request('GET', f'{path}?tenant=1')
+            self.assertEqual(status, 400)
+            self.assertIn('tenant', result['error'])
+
+    def test_persons_and_feed_are_tenant_scoped(self):
+        """Test the tenant parameter of person search, nested persons and the feed."""
+        conn = get_connection(self.db_path)
+        enable_tenants(conn)
+        conn.execute("INSERT INTO user (id, username, role, tenant_id) "
+                     "VALUES (10, 'berta.admin', 'Admin', 2)")
+        conn.execute("INSERT INTO person (id, vorname, nachname, email, created_by) "
+                     "VALUES (100, 'Kurt', 'Kunde', 'kurt@example.com', 10)")
+        note_id = create_note(conn, 100, 10, 'Tenant 2 note')
+        conn.commit()
+        conn.close()
+
+        status, persons = self.request('GET', '/users/10/persons?q=example')
+        self.assertEqual((status, [p['person_id'] for p in persons]), (200, [100]))
+        self.assertEqual(self.request('GET', '/users/10/persons?q=example&tenant=1')[1], [])
+        self.assertEqual(self.request('GET', '/users/1/persons?q=kurt')[1], [])
+        self.assertEqual(len(self.request('GET', '/users/3/persons?tenant=1')[1]), 3)
+        self.assertEqual(self.request('GET', '/users/3/persons?tenant=2')[1], [])
+
+        status, page = self.request('GET', '/users/10/feed?tenant=2')
+        self.assertEqual([row['note_id'] for row in page['rows']], [note_id])
+        self.assertEqual(self.request('GET', '/users/10/feed?tenant=1')[1],
+                         {'rows': [], 'next': None})
+        self.assertEqual(len(self.request('GET', '/users/3/feed?tenant=1')[1]['rows']), 6)
+
+    def test_feed_pages(self):
+        """Test paging through the activity feed with the continuation token."""
+        status, page = self.request('GET', '/users/3/feed?limit=4')
+        self.assertEqual((status, len(page['rows'])), (200, 4))
+        query = urlencode(dict(page['next'], limit=4))
+        status, rest = self.request('GET', f'/users/3/feed?{query}')
+        self.assertEqual((len(rest['rows']), rest['next']), (2, None))
+        before_at = urlencode({'before_at': page['next']['before_at']})
+        for bad in (before_at, 'before_id=3', 'limit=0'):
+            self.assertEqual(self.request('GET', f'/users/3/feed?{bad}')[0], 400)
+
+    def test_write_endpoints_check_permissions(self):
+        """Test the UC write operations including permission checks."""
+        status, _ = self.request('PUT', '/notes/9', {'user_id': 3, 'content': 'Nope'})
+        self.assertEqual(status, 403)
+        status, _ = self.request('PUT', '/notes/9', {'user_id': 2, 'content': 'Updated'})
+        self.assertEqual(status, 200)
+        status, result = self.request('POST', '/notes',
+                                      {'user_id': 2, 'person_id': 3, 'content': 'New'})
+        self.assertEqual((status, result['note_id']), (200, 21))
+        status, _ = self.request('POST', '/grants',
+                                 {'admin_id': 2, 'user_id': 2, 'person_id': 5})
+        self.assertEqual(status, 403)
+        status, result = self.request('POST', '/grants',
+                                      {'admin_id': 1, 'user_id': 2, 'person_id': 5})
+        self.assertEqual((status, result), (200, {'created': True}))
+        status, rows = self.request('GET', '/users/2/visible')
+        self.assertIn('Gemein', {row['nachname'] for row in rows})
+
+    def test_stale_note_version_conflicts(self):
+        """Test compare-and-swap note updates through the API."""
+        self.assertEqual(self.request('GET', '/notes/9?user_id=3')[0], 404)
+        status, note = self.request('GET', '/notes/9?user_id=2')
+        self.assertEqual((status, note['version']), (200, 1))
+        status, result = self.request('PUT', '/notes/9',
+                                      {'user_id': 2, 'content': 'First', 'version': 1})
+        self.assertEqual((status, result['version']), (200, 2))
+        status, result = self.request('PUT', '/notes/9',
+                                      {'user_id': 2, 'content': 'Second', 'version': 1})
+        self.assertEqual(status, 409)
+        self.assertEqual(self.request('GET', '/notes/9?user_id=2')[1]['content'], 'First')
+        # A version sent as a string is coerced; anything else is a bad request
+        status, result = self.request('PUT', '/notes/9',
+                                      {'user_id': 2, 'content': 'Third', 'version': '2'})
+        self.assertEqual((status, result['version']), (200, 3))
+        for version in ('drei', [3], {}):
+            self.assertEqual(self.request('PUT', '/notes/9', {'user_id': 2, 'content': 'x',
+                                                              'version': version})[0], 400)
+
+    def test_errors_and_metrics(self):
+        """Test error responses and the per-endpoint latency metrics."""
+        self.assertEqual(self.request('GET', '/unknown')[0], 404)
+        self.assertEqual(self.request('POST', '/notes', {'user_id': 1})[0], 400)
+        self.request('GET', '/users/1/visible')
+        status, metrics = self.request('GET', '/metrics')
+        self.assertEqual(metrics['visible']['count'], 1)
+        self.assertEqual(metrics['create_note']['count'], 1)
+
+    def test_unexpected_errors_are_answered(self):
+        """Test that failures other than bad input still get a response and a metric."""
+        self.assertEqual(self.request('POST', '/notes', [1, 2])[0], 400)
+        with mock.patch('server.fetch_visible_persons_with_notes',
+                        side_effect=sqlite3.OperationalError('database is locked')):
+            self.assertEqual(self.request('GET', '/users/1/persons')[0], 503)
+        with mock.patch('server.fetch_visible_persons_with_notes', side_effect=RuntimeError), \
+                redirect_stderr(io.StringIO()):
+            status, body = self.request('GET', '/users/1/persons')
+        self.assertEqual((status, body), (500, {'error': "Internal server error"}))
+        metrics = self.request('GET', '/metrics')[1]
+        self.assertEqual(metrics['persons']['count'], 2)
+        self.assertEqual(metrics['create_note']['count'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""Test the sharded database layout."""
+import sqlite3
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Ensure the demo_db module can be found
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from demo_db import (  # noqa: E402
+    fetch_visible_persons_notes,
+    get_users_with_access,
+    ShardRouter
+)
+from db_fixtures import sample_database  # noqa: E402
+
+
+class TestShardRouter(unittest.TestCase):
+    """Test routing writes and merging fanned-out reads."""
+
+    def setUp(self):
+        """Load the sample data both into one database and into three shards."""
+        self.reference = sample_database()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.router = ShardRouter([Path(self.tmp.name) / f'shard{i}.db' for i in range(3)])
+
+        ref = self.reference
+        for row in ref.execute('SELECT * FROM user'):
+            self.router.add_user(row['username'], row['role'], user_id=row['id'])
+        for row in ref.execute('SELECT * FROM person'):
+            self.router.add_person(row['vorname'], row['nachname'], row['email'],
+                                   row['created_by'], row['telefon'], person_id=row['id'])
+        for row in ref.execute('SELECT * FROM note'):
+            self.router.add_note(row['person_id'], row['content'], row['created_by'],
+                                 row['created_at'], note_id=row['id'])
+        for row in ref.execute('SELECT * FROM user_person'):
+            self.router.assign_person(row['user_id'], row['person_id'])
+        for row in ref.execute('SELECT * FROM note_assignment'):
+            self.router.assign_note(row['note_id'], row['user_id'])
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.router.close()
+        self.reference.close()
+        self.tmp.cleanup()
+
+    def test_persons_are_spread_by_id(self):
+        """Test that each shard holds only its persons and their notes."""
+        for shard in range(3):
+            conn = self.router.connection(shard)
+            person_ids = [row[0] for row in conn.execute('SELECT id FROM person')]
+            self.assertTrue(person_ids)
+            self.assertTrue(all(pid % 3 == shard for pid in person_ids))
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM user').fetchone()[0], 3)
+
+    def test_fan_out_matches_single_database(self):
+        """Test that merged results equal the unsharded query, in order."""
+        for user_id in (1, 2, 3):
+            merged = self.router.fetch_visible_persons_notes(user_id)
+            expected = fetch_visible_persons_notes(self.reference, user_id)
+            self.assertEqual(sorted(merged), sorted(expected))
+            self.assertEqual([(r['nachname'], r['vorname']) for r in merged],
+                             [(r['nachname'], r['vorname']) for r in expected])
+
+    def test_routed_writes_and_access_lists(self):
+        """Test new writes with allocated IDs and per-entity access lookups."""
+        person_id = self.router.add_person('Neu', 'Person', 'neu@example.com', 2)
+        self.assertEqual(person_id, 6)
+        note_id = self.router.add_note(person_id, 'Sharded note', 2)
+        self.assertEqual(note_id, 21)
+        self.router.assign_note(note_id, 3)
+        self.assertEqual(self.router.get_users_with_access('note', note_id),
+                         ['anna.schmitt', 'bernd.mueller', 'clara.schulz'])
+        self.assertEqual(self.router.get_users_with_access('person', 3),
+                         get_users_with_access(self.reference, 'person', 3))
+        contents = [r['content'] for r in self.router.fetch_visible_persons_notes(3)]
+        self.assertIn('Sharded note', contents)
+
+    def test_concurrent_user_ids_are_unique(self):
+        """Test that add_user allocates distinct IDs across threads."""
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            ids = list(pool.map(lambda i: self.router.add_user(f'user{i}', 'Viewer'), range(8)))
+        self.assertEqual(sorted(ids), list(range(4, 12)))
+
+    def test_add_user_retry_after_partial_failure(self):
+        """Test that add_user can be retried after failing on a later shard."""
+        blocker = self.router.connection(2)
+        blocker.execute("INSERT INTO user (id, username, role) VALUES (4, 'other.user', 'Viewer')")
+        blocker.commit()
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.router.add_user('dora.neu', 'Editor', user_id=4)
+        self.assertEqual(
+            [self.router.connection(shard).execute(
+                "SELECT COUNT(*) FROM user WHERE username = 'dora.neu'").fetchone()[0]
+             for shard in range(3)],
+            [1, 1, 0]
+        )
+
+        blocker.execute('DELETE FROM user WHERE id = 4')
+        blocker.commit()
+        self.assertEqual(self.router.add_user('dora.neu', 'Editor'), 4)
+        for shard in range(3):
+            row = self.router.connection(shard).execute(
+                'SELECT username, role FROM user WHERE id = 4').fetchone()
+            self.assertEqual(tuple(row), ('dora.neu', 'Editor'))
+
+    def test_close_closes_worker_connections(self):
+        """Test that close() also closes connections opened by the fan-out threads."""
+        self.router.fetch_visible_persons_notes(1)
+        conns = list(self.router._all_conns)
+        self.assertGreater(len(conns), 3)
+        self.router.close()
+        for conn in conns:
+            with self.assertRaises(sqlite3.ProgrammingError):
+                conn.execute('SELECT 1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""Test read-only connection modes and reporting snapshots."""
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Ensure the demo_db module can be found
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from demo_db import (  # noqa: E402
+    get_connection,
+    create_schema,
+    insert_sample_data,
+    fetch_visible_persons_notes,
+    reporting_snapshot,
+)
+
+
+class TestSnapshot(unittest.TestCase):
+    """Test reports against read-only and snapshot connections."""
+
+    def setUp(self):
+        """Set up a sample database file."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'live db.db')  # Space exercises URI quoting
+        self.conn = get_connection(self.path)
+        create_schema(self.conn)
+        insert_sample_data(self.conn)
+        self.conn.commit()
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def test_read_only_modes(self):
+        """Test that read-only modes return the same rows and reject writes."""
+        expected = fetch_visible_persons_notes(self.conn, 1)
+        for mode in ('ro', 'immutable'):
+            conn = get_connection(self.path, mode=mode, mmap_size=1 << 20)
+            try:
+                self.assertEqual(fetch_visible_persons_notes(conn, 1), expected)
+                self.assertEqual(conn.execute('PRAGMA mmap_size').fetchone()[0], 1 << 20)
+                with self.assertRaises(sqlite3.OperationalError):
+                    conn.execute("UPDATE note SET content = 'x'")
+            finally:
+                conn.close()
+
+    def test_invalid_mode(self):
+        """Test that unknown modes and in-memory read-only databases are rejected."""
+        with self.assertRaises(ValueError):
+            get_connection(self.path, mode='append')
+        with self.assertRaises(ValueError):
+            get_connection(':memory:', mode='ro')
+
+    def test_snapshot_does_not_block_writer(self):
+        """Test that a report in progress does not hold locks on the live file."""
+        writer = sqlite3.connect(self.path, timeout=0)
+        for in_memory in (False, True):
+            with reporting_snapshot(self.path, in_memory=in_memory) as snapshot:
+                cursor = snapshot.execute('SELECT id FROM note')
+                cursor.fetchone()  # Report still reading
+                writer.execute("UPDATE note SET content = ? WHERE id = 1", (f'changed {in_memory}',))
+                writer.commit()
+                content = snapshot.execute('SELECT content FROM note WHERE id = 1').fetchone()[0]
+                self.assertNotEqual(content, f'changed {in_memory}')
+                with self.assertRaises(sqlite3.OperationalError):
+                    snapshot.execute("DELETE FROM note")
+        writer.close()
+
+    def test_snapshot_file_removed(self):
+        """Test that the temporary snapshot file is deleted afterwards."""
+        with reporting_snapshot(self.path) as snapshot:
+            snapshot_file = snapshot.execute('PRAGMA database_list').fetchone()[2]
+            self.assertTrue(os.path.exists(snapshot_file))
+        self.assertFalse(os.path.exists(snapshot_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
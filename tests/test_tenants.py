@@ -0,0 +1,198 @@
+"""Test multi-tenant mode: tenant inheritance, isolation guards and scoped queries."""
+import os
+import queue
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Ensure the demo_db module can be found
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from demo_db import (  # noqa: E402
+    ChangeFeed,
+    assign_person,
+    count_visible,
+    create_change_log,
+    create_note,
+    create_person_search,
+    create_schema,
+    create_visibility_counters,
+    enable_tenants,
+    explain_visible_query,
+    fetch_activity_feed,
+    fetch_visible_persons_notes,
+    fetch_visible_persons_with_notes,
+    get_connection,
+    get_users_with_access,
+    has_tenants,
+    insert_synthetic_data,
+    migrate_role_codes,
+    search_persons,
+    user_can_read,
+    verify_visibility_counts,
+)
+from db_fixtures import sample_database  # noqa: E402
+
+
+class TestTenants(unittest.TestCase):
+    """Test a sample database (tenant 1) with a second tenant added."""
+
+    def setUp(self):
+        """Enable tenants and add tenant 2 with an admin, a viewer and one note."""
+        self.conn = sample_database()
+        create_visibility_counters(self.conn)
+        enable_tenants(self.conn)
+        self.conn.executemany(
+            'INSERT INTO user (id, username, role, tenant_id) VALUES (?, ?, ?, 2)',
+            [(10, 'berta.admin', 'Admin'), (11, 'bob.viewer', 'Viewer')]
+        )
+        self.conn.execute(
+            "INSERT INTO person (id, vorname, nachname, email, created_by) "
+            "VALUES (100, 'Kurt', 'Kunde', 'kurt@example.com', 10)"
+        )
+        self.note_id = create_note(self.conn, 100, 10, 'Tenant 2 note')
+        assign_person(self.conn, 11, 100)
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.conn.close()
+
+    def tenant_of(self, table, where):
+        return self.conn.execute(f'SELECT tenant_id FROM {table} WHERE {where}').fetchone()[0]
+
+    def test_existing_rows_and_inheritance(self):
+        """Test that old rows get the default tenant and new rows inherit theirs."""
+        self.assertTrue(has_tenants(self.conn))
+        self.assertEqual(self.tenant_of('note', 'id = 1'), 1)
+        self.assertEqual(self.tenant_of('person', 'id = 100'), 2)
+        self.assertEqual(self.tenant_of('note', f'id = {self.note_id}'), 2)
+        self.assertEqual(self.tenant_of('user_person', 'user_id = 11'), 2)
+        enable_tenants(self.conn)  # Idempotent
+        self.assertEqual(self.tenant_of('person', 'id = 100'), 2)
+
+    def test_cross_tenant_references_fail(self):
+        """Test that no row can reference a row of another tenant."""
+        statements = [
+            'INSERT INTO user_person (user_id, person_id) VALUES (2, 100)',
+            'INSERT INTO note_assignment (note_id, user_id) VALUES (1, 11)',
+            "INSERT INTO note (content, created_by, person_id) VALUES ('x', 1, 100)",
+            f'UPDATE note SET person_id = 1 WHERE id = {self.note_id}',
+            'UPDATE person SET created_by = 1 WHERE id = 100',
+            "INSERT INTO person (vorname, nachname, email, created_by, tenant_id) "
+            "VALUES ('A', 'B', 'a@b.c', 1, 2)",
+            'UPDATE user SET tenant_id = 2 WHERE id = 2',
+        ]
+        for statement in statements:
+            with self.subTest(statement=statement):
+                with self.assertRaises(sqlite3.IntegrityError):
+                    self.conn.execute(statement)
+
+    def test_admins_see_their_tenant_only(self):
+        """Test the visibility queries for admins of both tenants."""
+        self.assertEqual({row.person_id for row in fetch_visible_persons_notes(self.conn, 1)},
+                         {1, 2, 3, 4, 5})
+        rows = fetch_visible_persons_notes(self.conn, 10)
+        self.assertEqual([(row.person_id, row.note_id) for row in rows], [(100, self.note_id)])
+        self.assertEqual([p['person_id'] for p in fetch_visible_persons_with_notes(self.conn, 10)],
+                         [100])
+        feed, _ = fetch_activity_feed(self.conn, 10)
+        self.assertEqual([row.note_id for row in feed], [self.note_id])
+        self.assertEqual(verify_visibility_counts(self.conn), [])
+        self.assertEqual(count_visible(self.conn, 10)['notes'], 1)
+
+    def test_scoped_requests(self):
+        """Test that a tenant_id argument rejects users and entities of other tenants."""
+        self.assertEqual(len(fetch_visible_persons_notes(self.conn, 11, tenant_id=2)), 1)
+        self.assertEqual(fetch_visible_persons_notes(self.conn, 11, tenant_id=1), [])
+        self.assertEqual(len(fetch_visible_persons_with_notes(self.conn, 11, tenant_id=2)), 1)
+        self.assertEqual(fetch_visible_persons_with_notes(self.conn, 11, tenant_id=1), [])
+        self.assertEqual(len(fetch_activity_feed(self.conn, 11, tenant_id=2)[0]), 1)
+        self.assertEqual(fetch_activity_feed(self.conn, 11, tenant_id=1), ([], None))
+        self.assertEqual(len(search_persons(self.conn, 11, 'kurt', tenant_id=2)), 1)
+        self.assertEqual(search_persons(self.conn, 11, 'kurt', tenant_id=1), [])
+        self.assertEqual(get_users_with_access(self.conn, 'note', self.note_id),
+                         ['berta.admin', 'bob.viewer'])
+        self.assertEqual(get_users_with_access(self.conn, 'note', self.note_id, tenant_id=1), [])
+        self.assertEqual(get_users_with_access(self.conn, 'person', 1, tenant_id=1),
+                         ['anna.schmitt'])
+        self.assertFalse(user_can_read(self.conn, 1, 'note', self.note_id))
+        self.assertTrue(user_can_read(self.conn, 10, 'note', self.note_id))
+
+    def test_search_stays_in_tenant(self):
+        """Test that admins only find persons of their own tenant."""
+        for indexed in (False, True):
+            if indexed:
+                self.assertTrue(create_person_search(self.conn))
+            with self.subTest(indexed=indexed):
+                self.assertEqual([p['person_id'] for p in search_persons(self.conn, 10, 'example')],
+                                 [100])
+                self.assertEqual(search_persons(self.conn, 1, 'kurt'), [])
+                self.assertEqual(len(search_persons(self.conn, 1, 'example')), 5)
+
+    def test_change_feed_stays_in_tenant(self):
+        """Test that tenant fills are not logged and admins get their tenant's events."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'tenants.db')
+            conn = sample_database(target=path)
+            create_change_log(conn)
+            enable_tenants(conn)
+            conn.execute("INSERT INTO user (id, username, role, tenant_id) "
+                         "VALUES (10, 'berta.admin', 'Admin', 2)")
+            conn.execute("INSERT INTO person (id, vorname, nachname, email, created_by) "
+                         "VALUES (100, 'Kurt', 'Kunde', 'kurt@example.com', 10)")
+            conn.commit()
+            self.assertEqual(conn.execute(
+                "SELECT COUNT(*) FROM change_log WHERE kind = 'person_updated'").fetchone()[0], 0)
+            with ChangeFeed(path, poll_interval=0.01) as feed:
+                anna, berta = feed.subscribe(1), feed.subscribe(10)
+                note_id = create_note(conn, 100, 10, 'Tenant 2 note')
+                conn.commit()
+                self.assertEqual(berta.get(timeout=5).note_id, note_id)
+                with self.assertRaises(queue.Empty):
+                    anna.get(timeout=0.1)
+            conn.close()
+
+    def test_visibility_query_uses_tenant_index(self):
+        """Test that the visibility query reads only the tenant's index range."""
+        plan = ' '.join(explain_visible_query(self.conn, 10))
+        self.assertIn('idx_person_tenant', plan)
+
+    def test_role_migration_keeps_tenants(self):
+        """Test that rebuilding the user table keeps tenants and guards."""
+        migrate_role_codes(self.conn)
+        self.assertEqual(self.tenant_of('user', 'id = 10'), 2)
+        self.assertEqual(get_users_with_access(self.conn, 'person', 100),
+                         ['berta.admin', 'bob.viewer'])
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.conn.execute('INSERT INTO user_person (user_id, person_id) VALUES (2, 100)')
+
+    def test_synthetic_tenants(self):
+        """Test filling several tenants with generated data."""
+        conn = get_connection(':memory:')
+        create_schema(conn)
+        enable_tenants(conn)
+        for tenant_id in (1, 2, 3):
+            insert_synthetic_data(conn, users=5, persons=50, notes_per_person=2,
+                                  grants_per_user=10, seed=tenant_id, tenant_id=tenant_id)
+        self.assertEqual(conn.execute(
+            'SELECT COUNT(DISTINCT tenant_id) FROM note WHERE person_id BETWEEN 51 AND 100'
+        ).fetchone()[0], 1)
+        admin_of_tenant_2 = 6
+        rows = fetch_visible_persons_notes(conn, admin_of_tenant_2, tenant_id=2)
+        self.assertEqual({row.person_id for row in rows}, set(range(51, 101)))
+        conn.close()
+
+    def test_tenant_id_requires_tenant_mode(self):
+        """Test that tenant-scoped calls fail on single-tenant databases."""
+        conn = sample_database()
+        with self.assertRaises(ValueError):
+            fetch_visible_persons_notes(conn, 1, tenant_id=1)
+        with self.assertRaises(ValueError):
+            search_persons(conn, 1, 'example', tenant_id=1)
+        conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,15 +6,14 @@ from pathlib import Path
 # Ensure the demo_db module can be found
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from demo_db import get_connection, create_schema, insert_sample_data, run_uc4  # noqa: E402
+from demo_db import run_uc4  # noqa: E402
+from db_fixtures import sample_database  # noqa: E402
 
 
 
 class TestUseCase4(unittest.TestCase):
     def setUp(self):
-        self.conn = get_connection(':memory:')  # Use in-memory database for testing
-        create_schema(self.conn)
-        insert_sample_data(self.conn)
+        self.conn = sample_database()
 
     def tearDown(self):
         self.conn.close()
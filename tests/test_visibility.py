@@ -1,5 +1,6 @@
 import sys
 """Test visibility of persons and notes based on user roles."""
+import json
 import unittest
 from pathlib import Path
 
@@ -7,11 +8,10 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # noqa: E402
 
 from demo_db import (  # noqa: E402
-    get_connection,
-    create_schema,
-    insert_sample_data,
-    fetch_visible_persons_notes
+    fetch_visible_persons_notes,
+    VisibleRow
 )
+from db_fixtures import sample_database  # noqa: E402
 
 
 class TestVisibilityQuery(unittest.TestCase):
@@ -19,9 +19,7 @@ class TestVisibilityQuery(unittest.TestCase):
 
     def setUp(self):
         """Set up test database with sample data."""
-        self.conn = get_connection(":memory:")
-        create_schema(self.conn)
-        insert_sample_data(self.conn)
+        self.conn = sample_database()
 
     def tearDown(self):
         """Clean up after tests."""
@@ -40,6 +38,21 @@ class TestVisibilityQuery(unittest.TestCase):
         # The viewer can see 6 records in total (4 for Olaf, 1 for Max, 1 for Eva)
         self.assertEqual(len(visible_data), 6)
 
+    def test_rows_support_dict_access(self):
+        """Test that compact result rows stay compatible with dict access."""
+        row = fetch_visible_persons_notes(self.conn, 3)[0]
+        self.assertIsInstance(row, VisibleRow)
+        self.assertFalse(hasattr(row, '__dict__'))
+        self.assertEqual(row['vorname'], row.vorname)
+        self.assertEqual(row.get('missing', 'default'), 'default')
+        self.assertIn('note_id', row.keys())
+        self.assertNotIn('note_id', row)  # Membership tests values, like tuple
+        self.assertEqual(json.loads(json.dumps(row.as_dict()))['note_id'], row.note_id)
+        self.assertEqual(dict(row), row.as_dict())
+        self.assertEqual(dict(row)['email'], row['email'])
+        with self.assertRaises(KeyError):
+            row['missing']
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,145 @@
+"""Test the trigger-maintained per-user visibility counters."""
+import io
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# Ensure the demo_db module can be found
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from demo_db import (  # noqa: E402
+    get_connection,
+    create_schema,
+    create_visibility_counters,
+    insert_synthetic_data,
+    count_visible,
+    verify_visibility_counts,
+    archive_notes,
+    main,
+    migrate_role_codes,
+)
+from db_fixtures import sample_database  # noqa: E402
+
+
+class TestVisibilityCounts(unittest.TestCase):
+    """Test count_visible against the full visibility query."""
+
+    def setUp(self):
+        """Set up a sample database with counters enabled after the data."""
+        self.conn = sample_database()
+        create_visibility_counters(self.conn)
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.conn.close()
+
+    def assertCountsMatch(self):
+        self.assertEqual(verify_visibility_counts(self.conn), [])
+
+    def test_backfill_matches_query(self):
+        """Test that counters built from existing data match the query."""
+        self.assertCountsMatch()
+        self.assertEqual(count_visible(self.conn, 3), {'persons': 3, 'notes': 6, 'writable_notes': 4})
+
+    def test_unknown_user(self):
+        """Test that unknown users have no counts."""
+        self.assertIsNone(count_visible(self.conn, 99))
+
+    def test_counts_follow_grants(self):
+        """Test granting and revoking person and note access."""
+        self.conn.execute('INSERT INTO user_person (user_id, person_id) VALUES (2, 5)')
+        self.assertCountsMatch()
+        self.conn.execute('INSERT INTO note_assignment (user_id, note_id) VALUES (3, 10)')
+        self.assertCountsMatch()
+        self.conn.execute('DELETE FROM user_person WHERE user_id = 2')
+        self.assertCountsMatch()
+        self.conn.execute('DELETE FROM note_assignment')
+        self.assertCountsMatch()
+
+    def test_counts_follow_entity_changes(self):
+        """Test inserting, moving and deleting persons and notes."""
+        self.conn.execute(
+            "INSERT INTO person (id, vorname, nachname, email, created_by) "
+            "VALUES (50, 'Neu', 'Person', 'neu@example.com', 3)"
+        )
+        self.conn.execute("INSERT INTO note (content, created_by, person_id) VALUES ('x', 2, 50)")
+        self.assertCountsMatch()
+        self.conn.execute('UPDATE note SET person_id = 1 WHERE person_id = 50')
+        self.assertCountsMatch()
+        self.conn.execute('UPDATE person SET created_by = 2 WHERE id = 1')
+        self.assertCountsMatch()
+        self.conn.execute('DELETE FROM note WHERE person_id = 1')
+        self.conn.execute('DELETE FROM person WHERE id = 1')
+        self.assertCountsMatch()
+
+    def test_counts_include_archived_notes(self):
+        """Test that archived notes are still counted while the archive is attached."""
+        before = {user_id: count_visible(self.conn, user_id) for user_id in (1, 2, 3)}
+        self.conn.execute("UPDATE note SET created_at = '2000-01-01' WHERE id % 3 = 0")
+        self.assertGreater(archive_notes(self.conn, '2001-01-01', ':memory:'), 0)
+        self.assertCountsMatch()
+        self.conn.execute('INSERT INTO user_person (user_id, person_id) VALUES (3, 1)')
+        self.assertCountsMatch()
+        self.conn.execute('DELETE FROM user_person WHERE user_id = 3 AND person_id = 1')
+        self.assertCountsMatch()
+        self.assertEqual(archive_notes(self.conn, '2100-01-01'), 20 - 6)
+        self.assertEqual(count_visible(self.conn, 1)['notes'], 20)
+        self.assertEqual({user_id: count_visible(self.conn, user_id) for user_id in (1, 2, 3)},
+                         before)
+        self.assertCountsMatch()
+
+    def test_counters_survive_role_migration(self):
+        """Test that the user triggers are recreated by the role migration."""
+        migrate_role_codes(self.conn)
+        self.conn.execute('DELETE FROM user_person WHERE user_id = 3')
+        self.conn.execute('DELETE FROM note_assignment WHERE user_id = 3')
+        self.conn.execute("INSERT INTO user (username, role) VALUES ('temp', 3)")
+        self.conn.execute("INSERT INTO user_person (user_id, person_id) VALUES (4, 1)")
+        self.conn.execute('DELETE FROM user WHERE id = 4')
+        self.assertCountsMatch()
+        self.assertIsNone(self.conn.execute(
+            'SELECT 1 FROM visibility_counts WHERE user_id = 4').fetchone())
+
+    def test_synthetic_data(self):
+        """Test counters on generated data with many overlapping grants."""
+        conn = get_connection(':memory:')
+        create_schema(conn)
+        create_visibility_counters(conn)
+        insert_synthetic_data(conn, users=10, persons=200, notes_per_person=3,
+                              grants_per_user=30)
+        self.assertEqual(verify_visibility_counts(conn), [])
+        conn.close()
+
+    def test_demo_installs_counters(self):
+        """Test that a new demo database reads its final counts from the counters."""
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = str(Path(tmp) / 'showcase.db')
+            out = io.StringIO()
+            with redirect_stdout(out):
+                main(['--db', db_path, '--no-prompt'])
+            self.assertIn('clara.schulz can see 3 persons and 6 notes', out.getvalue())
+            conn = get_connection(db_path)
+            self.assertIsNotNone(conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'visibility_counts'").fetchone())
+            self.assertEqual(verify_visibility_counts(conn), [])
+            conn.close()
+
+    def test_demo_without_counters_uses_query(self):
+        """Test that an existing database without counters is counted by query."""
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = str(Path(tmp) / 'showcase.db')
+            sample_database(target=db_path).close()
+            out = io.StringIO()
+            with redirect_stdout(out):
+                main(['--db', db_path, '--no-prompt'])
+            self.assertIn('clara.schulz can see 3 persons and 6 notes', out.getvalue())
+            conn = get_connection(db_path)
+            self.assertIsNone(conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'visibility_counts'").fetchone())
+            conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+"""Test the group-commit write queue."""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+# Ensure the demo_db module can be found
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from demo_db import (  # noqa: E402
+    WriteQueue,
+    create_note,
+    get_connection,
+    get_note_revisions,
+    update_note_content,
+)
+from db_fixtures import sample_database  # noqa: E402
+
+
+class TestWriteQueue(unittest.TestCase):
+    """Test batching, per-request failures and lock handling."""
+
+    def setUp(self):
+        """Set up a sample database file shared by the writer and the tests."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'queue.db')
+        sample_database(target=self.path).close()
+        self.conn = get_connection(self.path)
+
+    def tearDown(self):
+        """Clean up after tests."""
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def test_results_are_committed(self):
+        """Test that futures resolve to the results of committed writes."""
+        with WriteQueue(self.path) as writes:
+            updated = writes.submit(update_note_content, 1, 'Queued update', edited_by=2)
+            note_id = writes.submit(create_note, 1, 2, 'Queued note').result(timeout=5)
+            self.assertTrue(updated.result(timeout=5))
+        self.assertEqual(self.conn.execute(
+            'SELECT content FROM note WHERE id = 1').fetchone()[0], 'Queued update')
+        self.assertEqual(self.conn.execute(
+            'SELECT content FROM note WHERE id = ?', (note_id,)).fetchone()[0], 'Queued note')
+        self.assertEqual(len(get_note_revisions(self.conn, 1)), 2)
+
+    def test_failed_request_does_not_affect_batch(self):
+        """Test that a failing request is rolled back on its own."""
+        def failing(conn):
+            conn.execute("UPDATE note SET content = 'partial' WHERE id = 2")
+            conn.execute("INSERT INTO user (username, role) VALUES ('anna.schmitt', 'Admin')")
+        
+        with WriteQueue(self.path, max_delay=0.05) as writes:
+            futures = [writes.submit(update_note_content, 1, 'Before'),
+                       writes.submit(failing),
+                       writes.submit(update_note_content, 3, 'After')]
+            self.assertTrue(futures[0].result(timeout=5))
+            with self.assertRaises(sqlite3.IntegrityError):
+                futures[1].result(timeout=5)
+            self.assertTrue(futures[2].result(timeout=5))
+            self.assertEqual(writes.batches, 1)
+        contents = dict(self.conn.execute('SELECT id, content FROM note WHERE id IN (1, 2, 3)'))
+        self.assertEqual(contents[1], 'Before')
+        self.assertNotEqual(contents[2], 'partial')
+        self.assertEqual(contents[3], 'After')
+
+    def test_concurrent_producers_share_commits(self):
+        """Test that writes from several threads are grouped into fewer transactions."""
+        writes = WriteQueue(self.path, max_delay=0.005)
+        
+        def producer(offset):
+            futures = [writes.submit(create_note, 1, 2, f'queued {offset + i}') for i in range(50)]
+            for future in futures:
+                future.result(timeout=10)
+        
+        threads = [threading.Thread(target=producer, args=(n * 50,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writes.close()
+        self.assertEqual(writes.requests, 200)
+        self.assertLess(writes.batches, 200)
+        self.assertEqual(self.conn.execute(
+            "SELECT COUNT(*) FROM note WHERE content LIKE 'queued %'").fetchone()[0], 200)
+        with self.assertRaises(RuntimeError):
+            writes.submit(create_note, 1, 2, 'too late')
+
+    def test_waits_for_other_writers(self):
+        """Test that a lock held by another connection delays but does not fail writes."""
+        blocker = get_connection(self.path, check_same_thread=False)
+        blocker.execute('BEGIN IMMEDIATE')
+        timer = threading.Timer(0.2, blocker.commit)
+        timer.start()
+        with WriteQueue(self.path, busy_timeout=0.05, retries=6, backoff=0.02) as writes:
+            self.assertTrue(writes.submit(update_note_content, 1, 'After lock').result(timeout=5))
+        timer.join()
+        blocker.close()
+
+    def test_gives_up_when_locked(self):
+        """Test that the batch fails once busy_timeout and all retries are exhausted."""
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            with WriteQueue(self.path, busy_timeout=0.01, retries=1, backoff=0.01) as writes:
+                future = writes.submit(update_note_content, 1, 'Never')
+                with self.assertRaises(sqlite3.OperationalError):
+                    future.result(timeout=5)
+        finally:
+            self.conn.rollback()
+
+
+if __name__ == '__main__':
+    unittest.main()